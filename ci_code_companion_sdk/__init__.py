@@ -429,6 +429,18 @@ class CICodeCompanionSDK:
         
         return await self.ai_service.generate_tests(file_path, content, test_type)
     
+    async def batch_generate_tests(self, source_dir: str, output_dir: Optional[str] = None, **kwargs) -> List[TestGenerationResult]:
+        """Generate tests for every source file in a directory."""
+        self.logger.info(f"🧪 SDK METHOD: batch_generate_tests() called for {source_dir}")
+        
+        if not self.ai_service:
+            self.logger.error("❌ SDK ERROR: AI service not initialized")
+            raise ConfigurationError("AI service not initialized")
+        
+        self.logger.info(f"🔄 SDK ROUTING: Delegating to StreamlinedAIService.batch_generate_tests()")
+        
+        return await self.ai_service.batch_generate_tests(source_dir, output_dir, **kwargs)
+    
     async def optimize_code(self, file_path: str, content: str, **kwargs) -> OptimizationResult:
         """Optimize code in a file."""
         self.logger.info(f"⚡ SDK METHOD: optimize_code() called for {file_path}")
@@ -16,20 +16,18 @@ Features:
 """
 
 import re
-import asyncio
 import logging
-from typing import Dict, List, Any, Optional, Type, Set, Callable
+from typing import Dict, List, Any, Optional, Type, Set
 from pathlib import Path
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from concurrent.futures import ThreadPoolExecutor
 import importlib
 import inspect
-from datetime import datetime, timedelta
+from datetime import datetime
 import threading
 
 from ..core.config import SDKConfig
 from ..core.exceptions import AgentError, ConfigurationError
 from .base_agent import BaseAgent, AgentCapability
-from ..models.analysis_model import AnalysisResult
 
 
 class AgentManager:
@@ -52,6 +50,8 @@ class AgentManager:
         self.agents: Dict[str, BaseAgent] = {}
         self.agent_classes: Dict[str, Type[BaseAgent]] = {}
         self.detection_patterns: Dict[str, Dict[str, Any]] = {}
+        # Compiled content patterns per agent type, with the source patterns they came from
+        self._content_pattern_cache: Dict[str, tuple] = {}
         self.agent_stats: Dict[str, Dict[str, Any]] = {}
         self.agent_locks: Dict[str, threading.Lock] = {}
         
@@ -262,6 +262,7 @@ class AgentManager:
         """
         file_ext = Path(file_path).suffix.lower()
         confidence_scores = {}
+        content_lower = content.lower() if content else ''
         
         for agent_type, patterns in self.detection_patterns.items():
             confidence = 0.0
@@ -271,11 +272,11 @@ class AgentManager:
                 confidence += 30.0
             
             # Check content patterns
-            content_patterns = patterns.get('content_patterns', [])
+            content_patterns = self._compiled_content_patterns(agent_type, patterns)
             if content:
                 pattern_matches = 0
                 for pattern in content_patterns:
-                    if re.search(pattern, content, re.IGNORECASE | re.MULTILINE):
+                    if pattern.search(content):
                         pattern_matches += 1
                 
                 if content_patterns:
@@ -287,7 +288,7 @@ class AgentManager:
             if content and frameworks:
                 framework_matches = 0
                 for framework in frameworks:
-                    if framework.lower() in content.lower():
+                    if framework.lower() in content_lower:
                         framework_matches += 1
                 
                 if frameworks:
@@ -308,6 +309,24 @@ class AgentManager:
         
         return best_agent[0]
     
+    def _compiled_content_patterns(self, agent_type: str, patterns: Dict[str, Any]) -> List[re.Pattern]:
+        """
+        Get an agent's content patterns compiled, compiling them once per pattern set.
+        
+        Args:
+            agent_type: Agent type the patterns belong to
+            patterns: Detection patterns of the agent
+            
+        Returns:
+            Compiled case-insensitive, multiline content patterns
+        """
+        source = tuple(patterns.get('content_patterns', ()))
+        cached = self._content_pattern_cache.get(agent_type)
+        if cached is None or cached[0] != source:
+            cached = (source, [re.compile(pattern, re.IGNORECASE | re.MULTILINE) for pattern in source])
+            self._content_pattern_cache[agent_type] = cached
+        return cached[1]
+    
     def get_applicable_agents(self, file_path: str, content: str) -> List[str]:
         """
         Get all agents that could potentially analyze the given file.
@@ -332,8 +351,8 @@ class AgentManager:
             
             # Check if any content patterns match
             elif content and patterns.get('content_patterns'):
-                for pattern in patterns['content_patterns']:
-                    if re.search(pattern, content, re.IGNORECASE | re.MULTILINE):
+                for pattern in self._compiled_content_patterns(agent_type, patterns):
+                    if pattern.search(content):
                         is_applicable = True
                         break
             
@@ -6,13 +6,11 @@ It provides a common interface, capability definitions, and shared functionality
 for all agent implementations in the SDK.
 """
 
-import asyncio
 import logging
 from abc import ABC, abstractmethod
 from enum import Enum
 from typing import Dict, List, Any, Optional
 from datetime import datetime
-import json
 
 
 class AgentCapability(Enum):
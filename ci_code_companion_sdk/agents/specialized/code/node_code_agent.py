@@ -10,7 +10,6 @@ import re
 import json
 import os
 from typing import Dict, List, Any, Optional
-from datetime import datetime
 
 from ...base_agent import BaseAgent, AgentCapability
 
@@ -21,10 +20,11 @@ class NodeCodeAgent(BaseAgent):
     Focuses on Express.js, APIs, middleware, async patterns, and performance.
     """
     
-    def __init__(self, config: Dict[str, Any], logger, prompt_loader=None):
-        """Initialize NodeCodeAgent with optional PromptLoader"""
+    def __init__(self, config: Dict[str, Any], logger, prompt_loader=None, vertex_client=None):
+        """Initialize NodeCodeAgent with optional PromptLoader and shared Vertex AI client"""
         super().__init__(config, logger)
         self.prompt_loader = prompt_loader
+        self.vertex_client = vertex_client
     
     def _initialize(self):
         """Initialize Node Code Agent with specialized configuration"""
@@ -775,19 +775,21 @@ class NodeCodeAgent(BaseAgent):
         """Generate response using PromptLoader and enhanced context via Vertex AI."""
         
         try:
-            # Import here to avoid circular imports
-            from ....integrations.vertex_ai_client import VertexAIClient
-            
-            # Initialize Vertex AI client (reuse from service if available)
-            # Use config.get() method to properly read from environment variables
-            project_id = self.config.get('project_id') if hasattr(self.config, 'get') else os.getenv('GCP_PROJECT_ID')
-            region = self.config.get('region', 'us-central1') if hasattr(self.config, 'get') else 'us-central1'
-            
-            vertex_client = VertexAIClient(
-                project_id=project_id,
-                location=region,
-                model_name=None,  # Will read from GEMINI_MODEL env var
-            )
+            # Reuse the service's Vertex AI client; only create (once) when running standalone
+            if self.vertex_client is None:
+                # Import here to avoid circular imports
+                from ....integrations.vertex_ai_client import VertexAIClient
+                
+                # Use config.get() method to properly read from environment variables
+                project_id = self.config.get('project_id') if hasattr(self.config, 'get') else os.getenv('GCP_PROJECT_ID')
+                region = self.config.get('region', 'us-central1') if hasattr(self.config, 'get') else 'us-central1'
+                
+                self.vertex_client = VertexAIClient(
+                    project_id=project_id,
+                    location=region,
+                    model_name=None,  # Will read from GEMINI_MODEL env var
+                )
+            vertex_client = self.vertex_client
             
             self.logger.info(f"🤖 NODE CHAT: Using Vertex AI with model: {vertex_client.model_name}")
             self.logger.info(f"📏 NODE CHAT: Enhanced prompt length: {len(enhanced_prompt)} characters")
@@ -10,9 +10,16 @@ import re
 import ast
 import os
 from typing import Dict, List, Any, Optional
-from datetime import datetime
 
 from ...base_agent import BaseAgent, AgentCapability
+from ....core.utils import parse_python_source
+
+# Line-level anti-pattern checks, compiled once instead of per line
+RANGE_LEN_RE = re.compile(r'range\s*\(\s*len\s*\(')
+MUTABLE_DEFAULT_RE = re.compile(r'def\s+\w+\s*\([^)]*=\s*(?:\[\]|\{\})')
+BARE_EXCEPT_RE = re.compile(r'except\s*:')
+DJANGO_UNPREFETCHED_FILTER_RE = re.compile(r'\.objects\.filter\([^)]*\)\.(?!prefetch_related|select_related)')
+LIST_COMPREHENSION_RE = re.compile(r'\[.*for.*in.*\]')
 
 
 class PythonCodeAgent(BaseAgent):
@@ -21,10 +28,11 @@ class PythonCodeAgent(BaseAgent):
     Focuses on Python syntax, patterns, performance, and framework best practices.
     """
     
-    def __init__(self, config: Dict[str, Any], logger, prompt_loader=None):
-        """Initialize PythonCodeAgent with optional PromptLoader"""
+    def __init__(self, config: Dict[str, Any], logger, prompt_loader=None, vertex_client=None):
+        """Initialize PythonCodeAgent with optional PromptLoader and shared Vertex AI client"""
         super().__init__(config, logger)
         self.prompt_loader = prompt_loader
+        self.vertex_client = vertex_client
     
     def _initialize(self):
         """Initialize Python Code Agent with specialized configuration"""
@@ -56,6 +64,9 @@ class PythonCodeAgent(BaseAgent):
             'file_operations': r'open\s*\([^)]*\)(?!\s*as|\s*with)',
             'exception_bare': r'except\s*:'
         }
+        self._performance_check_res = {
+            name: re.compile(pattern, re.IGNORECASE) for name, pattern in self.performance_checks.items()
+        }
         
         # Framework-specific patterns
         self.framework_patterns = {
@@ -155,10 +166,10 @@ class PythonCodeAgent(BaseAgent):
         }
         
         # Parse with AST for more accurate analysis
-        try:
-            tree = ast.parse(content)
+        tree = parse_python_source(content)
+        if tree is not None:
             metadata.update(self._analyze_ast(tree))
-        except SyntaxError:
+        else:
             # Fall back to regex if AST parsing fails
             metadata.update(self._analyze_with_regex(content))
         
@@ -302,22 +313,22 @@ class PythonCodeAgent(BaseAgent):
         """Check for overly long functions"""
         issues = []
         
-        try:
-            tree = ast.parse(content)
-            for node in ast.walk(tree):
-                if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
-                    func_lines = node.end_lineno - node.lineno + 1
-                    if func_lines > 50:
-                        issues.append(self.create_issue(
-                            'function_complexity',
-                            'medium',
-                            'Long function detected',
-                            f'Function "{node.name}" has {func_lines} lines. Consider breaking it into smaller functions.',
-                            line_number=node.lineno,
-                            suggestion='Extract common logic into separate functions'
-                        ))
-        except:
-            pass  # Skip if AST parsing fails
+        tree = parse_python_source(content)
+        if tree is None:
+            return issues  # Skip if AST parsing fails
+        
+        for node in ast.walk(tree):
+            if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
+                func_lines = node.end_lineno - node.lineno + 1
+                if func_lines > 50:
+                    issues.append(self.create_issue(
+                        'function_complexity',
+                        'medium',
+                        'Long function detected',
+                        f'Function "{node.name}" has {func_lines} lines. Consider breaking it into smaller functions.',
+                        line_number=node.lineno,
+                        suggestion='Extract common logic into separate functions'
+                    ))
         
         return issues
     
@@ -325,22 +336,22 @@ class PythonCodeAgent(BaseAgent):
         """Check for overly complex classes"""
         issues = []
         
-        try:
-            tree = ast.parse(content)
-            for node in ast.walk(tree):
-                if isinstance(node, ast.ClassDef):
-                    methods = [n for n in node.body if isinstance(n, (ast.FunctionDef, ast.AsyncFunctionDef))]
-                    if len(methods) > 20:
-                        issues.append(self.create_issue(
-                            'class_complexity',
-                            'medium',
-                            'Complex class detected',
-                            f'Class "{node.name}" has {len(methods)} methods. Consider breaking it into smaller classes.',
-                            line_number=node.lineno,
-                            suggestion='Apply Single Responsibility Principle and extract related methods'
-                        ))
-        except:
-            pass
+        tree = parse_python_source(content)
+        if tree is None:
+            return issues  # Skip if AST parsing fails
+        
+        for node in ast.walk(tree):
+            if isinstance(node, ast.ClassDef):
+                methods = [n for n in node.body if isinstance(n, (ast.FunctionDef, ast.AsyncFunctionDef))]
+                if len(methods) > 20:
+                    issues.append(self.create_issue(
+                        'class_complexity',
+                        'medium',
+                        'Complex class detected',
+                        f'Class "{node.name}" has {len(methods)} methods. Consider breaking it into smaller classes.',
+                        line_number=node.lineno,
+                        suggestion='Apply Single Responsibility Principle and extract related methods'
+                    ))
         
         return issues
     
@@ -348,22 +359,22 @@ class PythonCodeAgent(BaseAgent):
         """Check for missing docstrings"""
         issues = []
         
-        try:
-            tree = ast.parse(content)
-            for node in ast.walk(tree):
-                if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
-                    if not ast.get_docstring(node):
-                        node_type = 'function' if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)) else 'class'
-                        issues.append(self.create_issue(
-                            'documentation',
-                            'low',
-                            f'Missing docstring for {node_type}',
-                            f'{node_type.title()} "{node.name}" lacks documentation',
-                            line_number=node.lineno,
-                            suggestion=f'Add docstring explaining {node_type} purpose and parameters'
-                        ))
-        except:
-            pass
+        tree = parse_python_source(content)
+        if tree is None:
+            return issues  # Skip if AST parsing fails
+        
+        for node in ast.walk(tree):
+            if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+                if not ast.get_docstring(node):
+                    node_type = 'function' if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)) else 'class'
+                    issues.append(self.create_issue(
+                        'documentation',
+                        'low',
+                        f'Missing docstring for {node_type}',
+                        f'{node_type.title()} "{node.name}" lacks documentation',
+                        line_number=node.lineno,
+                        suggestion=f'Add docstring explaining {node_type} purpose and parameters'
+                    ))
         
         return issues
     
@@ -374,7 +385,7 @@ class PythonCodeAgent(BaseAgent):
         
         for i, line in enumerate(lines, 1):
             # Check for range(len()) anti-pattern
-            if re.search(r'range\s*\(\s*len\s*\(', line):
+            if RANGE_LEN_RE.search(line):
                 issues.append(self.create_issue(
                     'python_antipattern',
                     'medium',
@@ -385,7 +396,7 @@ class PythonCodeAgent(BaseAgent):
                 ))
             
             # Check for mutable default arguments
-            if re.search(r'def\s+\w+\s*\([^)]*=\s*(?:\[\]|\{\})', line):
+            if MUTABLE_DEFAULT_RE.search(line):
                 issues.append(self.create_issue(
                     'python_antipattern',
                     'high',
@@ -396,7 +407,7 @@ class PythonCodeAgent(BaseAgent):
                 ))
             
             # Check for bare except clauses
-            if re.search(r'except\s*:', line):
+            if BARE_EXCEPT_RE.search(line):
                 issues.append(self.create_issue(
                     'error_handling',
                     'high',
@@ -413,9 +424,9 @@ class PythonCodeAgent(BaseAgent):
         issues = []
         lines = content.split('\n')
         
-        for pattern_name, pattern in self.performance_checks.items():
+        for pattern_name, pattern in self._performance_check_res.items():
             for i, line in enumerate(lines, 1):
-                if re.search(pattern, line, re.IGNORECASE):
+                if pattern.search(line):
                     severity, title, description, suggestion = self._get_performance_issue_info(pattern_name)
                     issues.append(self.create_issue(
                         'performance',
@@ -469,7 +480,11 @@ class PythonCodeAgent(BaseAgent):
         issues = []
         lines = content.split('\n')
         
-        # Check for try blocks without finally or proper cleanup
+        # Check for try blocks without finally or proper cleanup. Whether the
+        # file's first try block opens a file does not change per line, so it
+        # is located once instead of three times per line
+        first_try = content.find('try:')
+        first_try_opens_file = 'open(' in content[first_try:content.find('\n', first_try + 100)]
         in_try_block = False
         has_finally = False
         try_line = 0
@@ -484,7 +499,7 @@ class PythonCodeAgent(BaseAgent):
             elif stripped.startswith('finally:') and in_try_block:
                 has_finally = True
             elif stripped.startswith(('def ', 'class ', 'if ', 'for ', 'while ')) and in_try_block:
-                if not has_finally and 'open(' in content[content.find('try:'):content.find('\n', content.find('try:') + 100)]:
+                if not has_finally and first_try_opens_file:
                     issues.append(self.create_issue(
                         'error_handling',
                         'medium',
@@ -528,7 +543,7 @@ class PythonCodeAgent(BaseAgent):
         
         # Check for N+1 queries
         for i, line in enumerate(lines, 1):
-            if re.search(r'\.objects\.filter\([^)]*\)\.(?!prefetch_related|select_related)', line):
+            if DJANGO_UNPREFETCHED_FILTER_RE.search(line):
                 if any('for' in lines[j] for j in range(max(0, i-3), min(len(lines), i+3))):
                     issues.append(self.create_issue(
                         'django_performance',
@@ -588,7 +603,7 @@ class PythonCodeAgent(BaseAgent):
             ))
         
         # Suggest generator expressions for large datasets
-        if re.search(r'\[.*for.*in.*\]', content) and 'len(' in content:
+        if LIST_COMPREHENSION_RE.search(content) and 'len(' in content:
             suggestions.append(self.create_suggestion(
                 'memory_optimization',
                 'Consider generator expressions',
@@ -682,30 +697,29 @@ class PythonCodeAgent(BaseAgent):
     
     def _calculate_docstring_coverage(self, content: str) -> float:
         """Calculate percentage of functions/classes with docstrings"""
-        try:
-            tree = ast.parse(content)
-            total_definitions = 0
-            documented_definitions = 0
-            
-            for node in ast.walk(tree):
-                if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
-                    total_definitions += 1
-                    if ast.get_docstring(node):
-                        documented_definitions += 1
-            
-            return (documented_definitions / total_definitions * 100) if total_definitions > 0 else 100.0
-        except:
+        tree = parse_python_source(content)
+        if tree is None:
             return 0.0
+        
+        total_definitions = 0
+        documented_definitions = 0
+        
+        for node in ast.walk(tree):
+            if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+                total_definitions += 1
+                if ast.get_docstring(node):
+                    documented_definitions += 1
+        
+        return (documented_definitions / total_definitions * 100) if total_definitions > 0 else 100.0
     
     def _calculate_confidence(self, content: str, issues: List, suggestions: List) -> float:
         """Calculate confidence score based on analysis completeness"""
         base_confidence = 0.8
         
         # Boost confidence for successful AST parsing
-        try:
-            ast.parse(content)
+        if parse_python_source(content) is not None:
             base_confidence += 0.1
-        except:
+        else:
             base_confidence -= 0.2
         
         # Adjust based on code size
@@ -781,19 +795,21 @@ class PythonCodeAgent(BaseAgent):
         """Generate response using PromptLoader and enhanced context via Vertex AI."""
         
         try:
-            # Import here to avoid circular imports
-            from ....integrations.vertex_ai_client import VertexAIClient
-            
-            # Initialize Vertex AI client (reuse from service if available)
-            # Use config.get() method to properly read from environment variables
-            project_id = self.config.get('project_id') if hasattr(self.config, 'get') else os.getenv('GCP_PROJECT_ID')
-            region = self.config.get('region', 'us-central1') if hasattr(self.config, 'get') else 'us-central1'
-            
-            vertex_client = VertexAIClient(
-                project_id=project_id,
-                location=region,
-                model_name=None,  # Will read from GEMINI_MODEL env var
-            )
+            # Reuse the service's Vertex AI client; only create (once) when running standalone
+            if self.vertex_client is None:
+                # Import here to avoid circular imports
+                from ....integrations.vertex_ai_client import VertexAIClient
+                
+                # Use config.get() method to properly read from environment variables
+                project_id = self.config.get('project_id') if hasattr(self.config, 'get') else os.getenv('GCP_PROJECT_ID')
+                region = self.config.get('region', 'us-central1') if hasattr(self.config, 'get') else 'us-central1'
+                
+                self.vertex_client = VertexAIClient(
+                    project_id=project_id,
+                    location=region,
+                    model_name=None,  # Will read from GEMINI_MODEL env var
+                )
+            vertex_client = self.vertex_client
             
             self.logger.info(f"🤖 PYTHON CHAT: Using Vertex AI with model: {vertex_client.model_name}")
             self.logger.info(f"📏 PYTHON CHAT: Enhanced prompt length: {len(enhanced_prompt)} characters")
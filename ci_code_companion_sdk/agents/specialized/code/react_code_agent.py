@@ -10,7 +10,7 @@ Enhanced with Cursor-style prompting and Gemini 2.5 Pro optimization.
 
 import re
 import ast
-from typing import Dict, List, Any, Optional
+from typing import Dict, List, Any
 from datetime import datetime
 import os
 
@@ -25,10 +25,11 @@ class ReactCodeAgent(BaseAgent):
     Enhanced with PromptLoader integration for Cursor-style functionality.
     """
     
-    def __init__(self, config: Dict[str, Any], logger, prompt_loader=None):
-        """Initialize ReactCodeAgent with optional PromptLoader"""
+    def __init__(self, config: Dict[str, Any], logger, prompt_loader=None, vertex_client=None):
+        """Initialize ReactCodeAgent with optional PromptLoader and shared Vertex AI client"""
         super().__init__(config, logger)
         self.prompt_loader = prompt_loader
+        self.vertex_client = vertex_client
         self.conversation_history = []
         self.codebase_index = {}
     
@@ -643,10 +644,13 @@ class ReactCodeAgent(BaseAgent):
                 suggestion='Create separate files for each component'
             ))
         
-        # Check for proper component naming
+        # Check for proper component naming. A line is likely a component when
+        # JSX follows its first occurrence; compare against the last '<' rather
+        # than slicing the rest of the file for every line
+        last_tag = content.rfind('<')
         for i, line in enumerate(lines, 1):
             func_match = re.search(r'(?:const|function)\s+([a-z][a-zA-Z0-9]*)', line)
-            if func_match and '<' in content[content.find(line):]:  # Likely a component
+            if func_match and content.find(line) <= last_tag:  # Likely a component
                 component_name = func_match.group(1)
                 issues.append(self.create_issue(
                     'naming_convention',
@@ -1106,19 +1110,21 @@ class ReactCodeAgent(BaseAgent):
         """Generate response using PromptLoader and enhanced context via Vertex AI."""
         
         try:
-            # Import here to avoid circular imports
-            from ....integrations.vertex_ai_client import VertexAIClient
-            
-            # Initialize Vertex AI client (reuse from service if available)
-            # Use config.get() method to properly read from environment variables
-            project_id = self.config.get('project_id') if hasattr(self.config, 'get') else os.getenv('GCP_PROJECT_ID')
-            region = self.config.get('region', 'us-central1') if hasattr(self.config, 'get') else 'us-central1'
-            
-            vertex_client = VertexAIClient(
-                project_id=project_id,
-                location=region,
-                model_name=None,  # Will read from GEMINI_MODEL env var
-            )
+            # Reuse the service's Vertex AI client; only create (once) when running standalone
+            if self.vertex_client is None:
+                # Import here to avoid circular imports
+                from ....integrations.vertex_ai_client import VertexAIClient
+                
+                # Use config.get() method to properly read from environment variables
+                project_id = self.config.get('project_id') if hasattr(self.config, 'get') else os.getenv('GCP_PROJECT_ID')
+                region = self.config.get('region', 'us-central1') if hasattr(self.config, 'get') else 'us-central1'
+                
+                self.vertex_client = VertexAIClient(
+                    project_id=project_id,
+                    location=region,
+                    model_name=None,  # Will read from GEMINI_MODEL env var
+                )
+            vertex_client = self.vertex_client
             
             self.logger.info(f"🤖 REACT CHAT: Using Vertex AI with model: {vertex_client.model_name}")
             self.logger.info(f"📏 REACT CHAT: Enhanced prompt length: {len(enhanced_prompt)} characters")
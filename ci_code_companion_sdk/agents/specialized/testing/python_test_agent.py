@@ -12,6 +12,10 @@ from typing import Dict, List, Any, Optional
 from datetime import datetime
 
 from ...base_agent import BaseAgent, AgentCapability
+from ....core.utils import parse_python_source
+
+# Test function header, compiled once instead of per line
+TEST_FUNCTION_DEF_RE = re.compile(r'\s*def\s+(test_\w+)')
 
 
 class PythonTestAgent(BaseAgent):
@@ -182,10 +186,10 @@ class PythonTestAgent(BaseAgent):
             metadata['test_framework'] = 'nose'
         
         # Extract test functions and classes using AST
-        try:
-            tree = ast.parse(content)
+        tree = parse_python_source(content)
+        if tree is not None:
             metadata.update(self._extract_ast_metadata(tree, content))
-        except SyntaxError:
+        else:
             # Fall back to regex if AST parsing fails
             metadata.update(self._extract_regex_metadata(content))
         
@@ -668,25 +672,25 @@ class PythonTestAgent(BaseAgent):
     def _extract_test_functions(self, content: str) -> Dict[str, str]:
         """Extract individual test functions for analysis"""
         test_functions = {}
+        lines = content.split('\n')
         
-        try:
-            tree = ast.parse(content)
+        tree = parse_python_source(content)
+        if tree is not None:
             for node in ast.walk(tree):
                 if isinstance(node, ast.FunctionDef) and node.name.startswith('test_'):
-                    func_lines = content.split('\n')[node.lineno-1:node.end_lineno]
-                    test_functions[node.name] = '\n'.join(func_lines)
-        except:
+                    test_functions[node.name] = '\n'.join(lines[node.lineno-1:node.end_lineno])
+        else:
             # Fall back to regex
-            lines = content.split('\n')
             current_func = None
             current_lines = []
             indent_level = 0
             
             for line in lines:
-                if re.match(r'\s*def\s+test_\w+', line):
+                header = TEST_FUNCTION_DEF_RE.match(line)
+                if header:
                     if current_func:
                         test_functions[current_func] = '\n'.join(current_lines)
-                    current_func = re.search(r'def\s+(test_\w+)', line).group(1)
+                    current_func = header.group(1)
                     current_lines = [line]
                     indent_level = len(line) - len(line.lstrip())
                 elif current_func:
@@ -752,8 +756,8 @@ class PythonTestAgent(BaseAgent):
         """Extract function information from source code"""
         functions = []
         
-        try:
-            tree = ast.parse(content)
+        tree = parse_python_source(content)
+        if tree is not None:
             for node in ast.walk(tree):
                 if isinstance(node, ast.FunctionDef) and not node.name.startswith('_'):
                     func_info = {
@@ -764,7 +768,7 @@ class PythonTestAgent(BaseAgent):
                         'line_number': node.lineno
                     }
                     functions.append(func_info)
-        except:
+        else:
             # Fall back to regex
             func_matches = re.findall(r'def\s+([a-zA-Z_][a-zA-Z0-9_]*)\s*\([^)]*\)', content)
             functions = [{'name': name, 'args': [], 'returns': False, 'docstring': None} for name in func_matches]
@@ -775,8 +779,8 @@ class PythonTestAgent(BaseAgent):
         """Extract class information from source code"""
         classes = []
         
-        try:
-            tree = ast.parse(content)
+        tree = parse_python_source(content)
+        if tree is not None:
             for node in ast.walk(tree):
                 if isinstance(node, ast.ClassDef):
                     methods = [n.name for n in node.body if isinstance(n, ast.FunctionDef)]
@@ -787,7 +791,7 @@ class PythonTestAgent(BaseAgent):
                         'line_number': node.lineno
                     }
                     classes.append(class_info)
-        except:
+        else:
             # Fall back to regex
             class_matches = re.findall(r'class\s+([A-Z][a-zA-Z0-9_]*)', content)
             classes = [{'name': name, 'methods': [], 'docstring': None} for name in class_matches]
@@ -56,6 +56,7 @@ class SDKConfig:
     agent_config: Dict[str, Any] = field(default_factory=dict)
     default_agent: str = field(default_factory=lambda: os.getenv('DEFAULT_AGENT', 'general'))
     parallel_agent_execution: bool = field(default_factory=lambda: os.getenv('PARALLEL_AGENTS', 'true').lower() == 'true')
+    fuzzy_suggestion_dedup: bool = field(default_factory=lambda: os.getenv('FUZZY_SUGGESTION_DEDUP', 'true').lower() == 'true')
     agent_memory_limit: int = field(default_factory=lambda: int(os.getenv('AGENT_MEMORY_LIMIT', str(512*1024*1024))))
     
     # Security Configuration
@@ -118,6 +119,7 @@ class SDKConfig:
         self.agent_config = {}
         self.default_agent = os.getenv('DEFAULT_AGENT', 'general')
         self.parallel_agent_execution = os.getenv('PARALLEL_AGENTS', 'true').lower() == 'true'
+        self.fuzzy_suggestion_dedup = os.getenv('FUZZY_SUGGESTION_DEDUP', 'true').lower() == 'true'
         self.agent_memory_limit = int(os.getenv('AGENT_MEMORY_LIMIT', str(512*1024*1024)))
         
         # Security Configuration
@@ -20,10 +20,12 @@ import logging
 import threading
 from concurrent.futures import ThreadPoolExecutor, as_completed
 from typing import Dict, List, Any, Optional, Union, Callable
+from collections import defaultdict
 from datetime import datetime
 import uuid
 
 from .config import SDKConfig
+from .utils import NearDuplicateIndex
 from .exceptions import (
     CICodeCompanionError, 
     AnalysisError, 
@@ -400,16 +402,22 @@ class CICodeCompanionEngine:
             }
         }
         
-        # Aggregate issues and suggestions
+        # Aggregate issues and suggestions. Issues are keyed by a tuple of
+        # their fields, which reuses each description's cached hash instead of
+        # copying it into a joined key string. Agents word the same suggestion
+        # differently, so suggestions are deduplicated by near-duplicate
+        # description per type (exact description with fuzzy_suggestion_dedup
+        # off), the same policy the direct analysis path applies.
         seen_issues = set()
-        seen_suggestions = set()
+        fuzzy_dedup = self.config.fuzzy_suggestion_dedup
+        seen_suggestions = defaultdict(lambda: NearDuplicateIndex(fuzzy=fuzzy_dedup))
         total_confidence = 0.0
         total_execution_time = 0.0
         
         for agent_type, result in results.items():
             # Process issues
             for issue in result.get('issues', []):
-                issue_key = f"{issue.get('type', '')}:{issue.get('line_number', 0)}:{issue.get('description', '')}"
+                issue_key = (issue.get('type', ''), issue.get('line_number', 0), issue.get('description', ''))
                 if issue_key not in seen_issues:
                     issue['source_agent'] = agent_type
                     aggregated['issues'].append(issue)
@@ -417,11 +425,9 @@ class CICodeCompanionEngine:
             
             # Process suggestions
             for suggestion in result.get('suggestions', []):
-                suggestion_key = f"{suggestion.get('type', '')}:{suggestion.get('description', '')}"
-                if suggestion_key not in seen_suggestions:
+                if seen_suggestions[suggestion.get('type', '')].add(str(suggestion.get('description', ''))):
                     suggestion['source_agent'] = agent_type
                     aggregated['suggestions'].append(suggestion)
-                    seen_suggestions.add(suggestion_key)
             
             # Aggregate metrics
             for metric_name, metric_value in result.get('metrics', {}).items():
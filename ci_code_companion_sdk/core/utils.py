@@ -6,13 +6,41 @@ file type detection, language identification, framework detection, and
 various helper functions for file processing and validation.
 """
 
+import ast
+import asyncio
+import concurrent.futures
+import fnmatch
 import hashlib
+import io
 import mimetypes
+import os
 import re
+import threading
+import tokenize
+from functools import lru_cache
 from pathlib import Path
-from typing import Dict, List, Optional, Set, Any
+from collections import OrderedDict, defaultdict
+from typing import Dict, List, Optional, Set, Any, Tuple
 import logging
 
+try:
+    from tree_sitter_languages import get_parser as get_tree_sitter_parser
+    TREE_SITTER_AVAILABLE = True
+except ImportError:
+    TREE_SITTER_AVAILABLE = False
+
+try:
+    from datasketch import MinHash, MinHashLSH
+    DATASKETCH_AVAILABLE = True
+except ImportError:
+    DATASKETCH_AVAILABLE = False
+
+try:
+    from rapidfuzz import fuzz
+    RAPIDFUZZ_AVAILABLE = True
+except ImportError:
+    RAPIDFUZZ_AVAILABLE = False
+
 
 # File extension to language mapping
 LANGUAGE_MAPPINGS = {
@@ -222,6 +250,52 @@ def calculate_file_hash(content: str, algorithm: str = 'sha256') -> str:
     return hash_obj.hexdigest()
 
 
+def normalize_code(content: str, language: Optional[str] = None, keep_lines: bool = False) -> str:
+    """
+    Normalize source code so that comment and whitespace-only edits compare equal.
+    
+    Python is tokenized so comments are dropped while indentation structure is
+    kept; other languages have their whitespace collapsed.
+    
+    With keep_lines, code on different lines never compares equal, so results
+    that refer to line numbers (e.g. analysis findings) stay valid for every
+    content with the same normalized form. Edits within a line, such as
+    trailing comments or spacing, still compare equal.
+    
+    Args:
+        content: Source code to normalize
+        language: Programming language of the content
+        keep_lines: Keep the line each piece of code is on
+        
+    Returns:
+        Normalized code string
+    """
+    if language == 'python':
+        skipped = {tokenize.COMMENT, tokenize.NL, tokenize.ENCODING, tokenize.ENDMARKER}
+        try:
+            tokens = []
+            for token in tokenize.generate_tokens(io.StringIO(content).readline):
+                if token.type in skipped:
+                    continue
+                if token.type == tokenize.INDENT:
+                    tokens.append('<INDENT>')
+                elif token.type == tokenize.DEDENT:
+                    tokens.append('<DEDENT>')
+                elif token.type == tokenize.NEWLINE:
+                    tokens.append('\n')
+                elif keep_lines:
+                    tokens.append(f"{token.start[0]}:{token.string}")
+                else:
+                    tokens.append(token.string)
+            return ' '.join(tokens)
+        except (tokenize.TokenError, IndentationError, SyntaxError):
+            pass
+    
+    if keep_lines:
+        return '\n'.join(' '.join(line.split()) for line in content.splitlines())
+    return ' '.join(content.split())
+
+
 def format_file_size(size_bytes: int) -> str:
     """
     Format file size in human-readable format.
@@ -308,6 +382,83 @@ def validate_file_path(file_path: str, allowed_extensions: Optional[Set[str]] =
     return True
 
 
+def compile_glob_patterns(patterns: List[str]) -> Optional[re.Pattern]:
+    """
+    Compile glob patterns into a single regex so each path is tested once.
+    
+    Args:
+        patterns: Glob patterns (e.g. 'test_*.py')
+        
+    Returns:
+        Compiled regex matching any of the patterns, or None if there are none
+    """
+    if not patterns:
+        return None
+    return re.compile('|'.join(fnmatch.translate(pattern) for pattern in patterns))
+
+
+def walk_source_files(
+    root: str,
+    patterns: List[str],
+    exclude_patterns: Optional[List[str]] = None,
+    blocked_dirs: Optional[Set[str]] = None
+) -> List[str]:
+    """
+    Find files under root matching the include globs, pruning blocked directories.
+    
+    Uses os.scandir, whose entries carry their file type from the directory
+    listing, and skips blocked directories (node_modules, .git, ...) without
+    listing their contents at all. Patterns without a '/' are matched against
+    the file name, patterns with one against the path relative to root.
+    
+    Args:
+        root: Directory to walk
+        patterns: Glob patterns of files to include
+        exclude_patterns: Glob patterns of files to skip
+        blocked_dirs: Directory names whose subtrees are skipped
+        
+    Returns:
+        Sorted list of matching file paths
+    """
+    exclude_patterns = exclude_patterns or []
+    blocked_dirs = blocked_dirs or set()
+    
+    include_name_re = compile_glob_patterns([p for p in patterns if '/' not in p])
+    include_path_re = compile_glob_patterns([p for p in patterns if '/' in p])
+    exclude_name_re = compile_glob_patterns([p for p in exclude_patterns if '/' not in p])
+    exclude_path_re = compile_glob_patterns([p for p in exclude_patterns if '/' in p])
+    
+    matches = []
+    stack = [(root, '')]
+    
+    while stack:
+        directory, relative_dir = stack.pop()
+        try:
+            with os.scandir(directory) as entries:
+                for entry in entries:
+                    relative_path = f"{relative_dir}{entry.name}"
+                    if entry.is_dir(follow_symlinks=False):
+                        if entry.name not in blocked_dirs:
+                            stack.append((entry.path, f"{relative_path}/"))
+                        continue
+                    
+                    if not entry.is_file():
+                        continue
+                    if not ((include_name_re and include_name_re.match(entry.name)) or
+                            (include_path_re and include_path_re.match(relative_path))):
+                        continue
+                    if exclude_name_re and exclude_name_re.match(entry.name):
+                        continue
+                    if exclude_path_re and exclude_path_re.match(relative_path):
+                        continue
+                    matches.append(entry.path)
+        except OSError:
+            # Unreadable or vanished directory; rglob skips these as well
+            continue
+    
+    return sorted(matches)
+
+
 def get_file_mime_type(file_path: str) -> Optional[str]:
     """
     Get MIME type of a file.
@@ -421,6 +572,449 @@ def extract_imports(content: str, language: str) -> List[str]:
     return list(set(imports))  # Remove duplicates
 
 
+def _is_trivial_body(body: List[ast.stmt]) -> bool:
+    """Whether a function body is empty or a single pass/return/raise/... statement"""
+    if body and isinstance(body[0], ast.Expr) and isinstance(getattr(body[0], 'value', None), ast.Constant) \
+            and isinstance(body[0].value.value, str):
+        body = body[1:]  # docstring
+    if len(body) > 1:
+        return False
+    if not body:
+        return True
+    
+    statement = body[0]
+    if isinstance(statement, ast.Expr):
+        return isinstance(statement.value, ast.Constant) and statement.value.value is Ellipsis
+    return isinstance(statement, (ast.Pass, ast.Return, ast.Raise))
+
+
+class _PythonDefinitionCollector(ast.NodeVisitor):
+    """
+    Collect test targets and imports without descending into function bodies.
+    
+    ast.walk yields every descendant, including the body of each function it
+    has already emitted; this visitor stops at functions, so nested helpers
+    and their statements are never visited.
+    """
+    
+    def __init__(self, lines: List[str]):
+        self.lines = lines
+        self.functions: List[Dict[str, Any]] = []
+        self.imports: Set[str] = set()
+    
+    def _function_info(self, node: ast.AST, class_name: Optional[str]) -> Dict[str, Any]:
+        return {
+            'name': node.name,
+            'qualified_name': f"{class_name}.{node.name}" if class_name else node.name,
+            'class_name': class_name,
+            'line_number': node.lineno,
+            'source': ''.join(self.lines[node.lineno - 1:getattr(node, 'end_lineno', None) or node.lineno]),
+            # Canonical dump without positions: stable across comment and
+            # formatting changes, different whenever the code itself changes
+            'ast_key': hashlib.blake2b(ast.dump(node, annotate_fields=False).encode('utf-8'), digest_size=16).hexdigest(),
+            'trivial': _is_trivial_body(node.body)
+        }
+    
+    def visit_Import(self, node: ast.Import):
+        self.imports.update(alias.name for alias in node.names)
+    
+    def visit_ImportFrom(self, node: ast.ImportFrom):
+        if node.module and not node.level:
+            self.imports.add(node.module)
+    
+    def visit_FunctionDef(self, node: ast.AST):
+        # Nested helpers are exercised through their enclosing function
+        if node.col_offset == 0 and not node.name.startswith('_'):
+            self.functions.append(self._function_info(node, None))
+    
+    visit_AsyncFunctionDef = visit_FunctionDef
+    
+    def visit_ClassDef(self, node: ast.ClassDef):
+        for child in node.body:
+            if isinstance(child, (ast.FunctionDef, ast.AsyncFunctionDef)):
+                if child.name.startswith('_') and child.name != '__init__':
+                    continue
+                self.functions.append(self._function_info(child, node.name))
+            else:
+                # Nested classes and class-level imports
+                self.visit(child)
+
+
+# Created on first use; None once creating it has failed
+_python_parser = None
+_python_parser_failed = False
+
+
+def _get_python_parser():
+    """Create the tree-sitter Python parser once per process, or None if it cannot be built"""
+    global _python_parser, _python_parser_failed
+    if _python_parser is None and TREE_SITTER_AVAILABLE and not _python_parser_failed:
+        try:
+            _python_parser = get_tree_sitter_parser('python')
+        except Exception as e:
+            # tree_sitter_languages' bundled grammars need tree-sitter < 0.22
+            _python_parser_failed = True
+            logging.getLogger(__name__).warning(f"tree-sitter Python parser unavailable, using ast: {e}")
+    return _python_parser
+
+
+def _extract_python_definitions_tree_sitter(parser, content: str) -> Tuple[List[Dict[str, Any]], List[str]]:
+    """
+    Tree-sitter implementation of extract_python_definitions.
+    
+    Parsing happens in native code, which is much faster than ast.parse on
+    large files. Since there is no ast.dump here, ast_key hashes the
+    comment-free token stream of the function instead.
+    """
+    content_bytes = content.encode('utf-8')
+    tree = parser.parse(content_bytes)
+    if tree.root_node.has_error:
+        # Match ast.parse, which rejects files with syntax errors
+        return [], []
+    
+    lines = content.splitlines(keepends=True)
+    functions = []
+    imports = set()
+    
+    def text_of(node) -> str:
+        return content_bytes[node.start_byte:node.end_byte].decode('utf-8')
+    
+    def is_trivial_body(body) -> bool:
+        statements = [child for child in body.named_children if child.type != 'comment']
+        if statements and statements[0].type == 'expression_statement' \
+                and statements[0].named_children and statements[0].named_children[0].type == 'string':
+            statements = statements[1:]  # docstring
+        if len(statements) > 1:
+            return False
+        if not statements:
+            return True
+        
+        statement = statements[0]
+        if statement.type == 'expression_statement':
+            return text_of(statement).strip() == '...'
+        return statement.type in ('pass_statement', 'return_statement', 'raise_statement')
+    
+    def function_info(node, class_name: Optional[str]) -> Dict[str, Any]:
+        name = text_of(node.child_by_field_name('name'))
+        source = ''.join(lines[node.start_point[0]:node.end_point[0] + 1])
+        return {
+            'name': name,
+            'qualified_name': f"{class_name}.{name}" if class_name else name,
+            'class_name': class_name,
+            'line_number': node.start_point[0] + 1,
+            'source': source,
+            'ast_key': hashlib.blake2b(normalize_code(source, 'python').encode('utf-8'), digest_size=16).hexdigest(),
+            'trivial': is_trivial_body(node.child_by_field_name('body'))
+        }
+    
+    def visit(node):
+        if node.type == 'decorated_definition':
+            node = node.child_by_field_name('definition')
+        
+        if node.type == 'import_statement':
+            for name in node.children_by_field_name('name'):
+                if name.type == 'aliased_import':
+                    name = name.child_by_field_name('name')
+                imports.add(text_of(name))
+        
+        elif node.type == 'import_from_statement':
+            module = node.child_by_field_name('module_name')
+            if module is not None and module.type == 'dotted_name':
+                imports.add(text_of(module))
+        
+        elif node.type == 'function_definition':
+            # Nested helpers are exercised through their enclosing function
+            name = text_of(node.child_by_field_name('name'))
+            if node.start_point[1] == 0 and not name.startswith('_'):
+                functions.append(function_info(node, None))
+        
+        elif node.type == 'class_definition':
+            class_name = text_of(node.child_by_field_name('name'))
+            for child in node.child_by_field_name('body').named_children:
+                definition = child.child_by_field_name('definition') if child.type == 'decorated_definition' else child
+                if definition.type == 'function_definition':
+                    name = text_of(definition.child_by_field_name('name'))
+                    if name.startswith('_') and name != '__init__':
+                        continue
+                    functions.append(function_info(definition, class_name))
+                else:
+                    # Nested classes and class-level imports
+                    visit(child)
+        
+        else:
+            for child in node.named_children:
+                visit(child)
+    
+    visit(tree.root_node)
+    
+    return sorted(functions, key=lambda func: func['line_number']), sorted(imports)
+
+
+@lru_cache(maxsize=32)
+def parse_python_source(content: str) -> Optional[ast.Module]:
+    """
+    Parse Python source into an AST, memoized on the source text.
+    
+    Agents run several independent AST checks over the same file and chat turns
+    re-analyze files already seen, so the parser runs once per distinct source.
+    
+    The returned tree is the same object for every caller with the same source,
+    so callers must treat it as read-only: no NodeTransformer, no added
+    attributes, no edits to node lists. Copy it (copy.deepcopy) before changing it.
+    
+    Args:
+        content: Python source code
+        
+    Returns:
+        The module AST, or None if the content cannot be parsed (including
+        input nested too deeply for the parser)
+    """
+    try:
+        return compile(content, '<source>', 'exec', ast.PyCF_ONLY_AST)
+    except (SyntaxError, ValueError, RecursionError, MemoryError):
+        return None
+
+
+def extract_python_definitions(content: str) -> Tuple[List[Dict[str, Any]], List[str]]:
+    """
+    Extract public functions, methods and imports from Python code in a single pass.
+    
+    Uses the tree-sitter Python grammar when tree_sitter_languages is
+    installed and its parser can be built, and the ast module otherwise.
+    
+    Args:
+        content: Python source code
+        
+    Returns:
+        Tuple of (functions, imports). Functions are dictionaries with name,
+        qualified_name, class_name, line_number, source, ast_key and trivial
+        (body is empty or a single pass/return/raise). Both lists are empty
+        if the content cannot be parsed.
+    """
+    parser = _get_python_parser()
+    if parser is not None:
+        return _extract_python_definitions_tree_sitter(parser, content)
+    
+    tree = parse_python_source(content)
+    if tree is None:
+        return [], []
+    
+    # Split once and slice per node; ast.get_source_segment re-splits the
+    # whole source on every call
+    collector = _PythonDefinitionCollector(content.splitlines(keepends=True))
+    collector.visit(tree)
+    
+    return sorted(collector.functions, key=lambda func: func['line_number']), sorted(collector.imports)
+
+
+def analyze_source_file(file_path: str) -> Dict[str, Any]:
+    """
+    Read a source file and extract its test targets.
+    
+    Module-level so it can run in a ProcessPoolExecutor worker.
+    
+    Args:
+        file_path: Path to the source file
+        
+    Returns:
+        Dictionary with content, language, functions and imports
+    """
+    with open(file_path, 'r', encoding='utf-8') as f:
+        content = f.read()
+    
+    language = get_file_language(file_path)
+    if language == 'python':
+        functions, imports = extract_python_definitions(content)
+    else:
+        functions, imports = [], extract_imports(content, language) if language else []
+    
+    return {
+        'content': content,
+        'language': language,
+        'functions': functions,
+        'imports': imports
+    }
+
+
+class LRUCache(OrderedDict):
+    """
+    Dict that keeps at most maxsize entries, evicting the least recently used.
+    
+    Lookups through get() and item access count as use. Safe to share between
+    threads.
+    """
+    
+    def __init__(self, maxsize: int = 4096):
+        super().__init__()
+        self.maxsize = maxsize
+        self._lock = threading.RLock()
+    
+    def __getitem__(self, key):
+        with self._lock:
+            value = super().__getitem__(key)
+            self.move_to_end(key)
+            return value
+    
+    def get(self, key, default=None):
+        with self._lock:
+            if key not in self:
+                return default
+            return self[key]
+    
+    def __setitem__(self, key, value):
+        with self._lock:
+            super().__setitem__(key, value)
+            self.move_to_end(key)
+            while len(self) > self.maxsize:
+                self.popitem(last=False)
+
+
+def _shingles(text: str, size: int = 5) -> Set[str]:
+    """Character n-grams of text, case-folded with whitespace collapsed"""
+    text = ' '.join(text.casefold().split())
+    if len(text) <= size:
+        return {text} if text else set()
+    return {text[i:i + size] for i in range(len(text) - size + 1)}
+
+
+if hasattr(int, 'bit_count'):
+    def _popcount(value: int) -> int:
+        """Number of set bits in a non-negative integer"""
+        return value.bit_count()
+else:  # Python < 3.10
+    def _popcount(value: int) -> int:
+        """Number of set bits in a non-negative integer"""
+        return bin(value).count('1')
+
+
+def simhash64(text: str, shingle_size: int = 5) -> int:
+    """
+    Compute a 64-bit SimHash of text; similar texts differ in few bits.
+    
+    Args:
+        text: Text to fingerprint
+        shingle_size: Length of the character n-grams hashed
+        
+    Returns:
+        64-bit fingerprint
+    """
+    shingles = _shingles(text, shingle_size)
+    # Each shingle hash as a row of 64 '0'/'1' characters, most significant bit
+    # first; a bit is set when more than half of the rows have it set. Counting
+    # per column with str.count keeps the per-bit work out of Python loops.
+    rows = [
+        format(int.from_bytes(hashlib.blake2b(shingle.encode('utf-8'), digest_size=8).digest(), 'big'), '064b')
+        for shingle in shingles
+    ]
+    
+    fingerprint = 0
+    for column in zip(*rows):
+        fingerprint = fingerprint << 1 | (2 * ''.join(column).count('1') > len(shingles))
+    return fingerprint
+
+
+class NearDuplicateIndex:
+    """
+    Index that recognizes near-duplicate texts in roughly constant time per insert.
+    
+    Uses MinHash LSH over character 5-grams when datasketch is installed.
+    Otherwise texts are fingerprinted with SimHash and bucketed on eight 8-bit
+    bands: two fingerprints within max_distance (< 8) bits of each other must
+    agree on at least one band, so only those buckets have to be compared.
+    About 7 differing bits corresponds to a 5-gram Jaccard similarity of 0.85
+    on suggestion-sized texts. Exact repeats (after case folding and whitespace
+    collapsing) are rejected from a set before any fingerprint is computed.
+    
+    Both sketches are approximate. With rapidfuzz installed, a candidate they
+    report is only taken as a duplicate if its normalized edit similarity
+    (fuzz.ratio) also reaches threshold, so short texts that merely share
+    vocabulary are kept.
+    
+    With fuzzy=False only the exact repeat check runs, so callers can switch
+    near-duplicate matching off without a second code path.
+    """
+    
+    BANDS = 8
+    BAND_BITS = 8
+    
+    def __init__(self, threshold: float = 0.85, max_distance: int = 7, num_perm: int = 64, fuzzy: bool = True):
+        self.threshold = threshold
+        self.num_perm = num_perm
+        self.max_distance = max_distance
+        self.fuzzy = fuzzy
+        self._count = 0
+        self._seen = set()
+        # Normalized text of each indexed entry, by insertion number
+        self._texts: List[str] = []
+        self._fingerprints: List[int] = []
+        if fuzzy and DATASKETCH_AVAILABLE:
+            self._lsh = MinHashLSH(threshold=threshold, num_perm=num_perm)
+        elif fuzzy:
+            self._buckets = [defaultdict(list) for _ in range(self.BANDS)]
+    
+    def add(self, text: str) -> bool:
+        """
+        Add text unless a near-duplicate is already indexed.
+        
+        Args:
+            text: Text to add
+            
+        Returns:
+            True if text was added, False if it is a near-duplicate
+        """
+        normalized = ' '.join(text.casefold().split())
+        if normalized in self._seen:
+            return False
+        self._seen.add(normalized)
+        if not self.fuzzy:
+            return True
+        
+        if DATASKETCH_AVAILABLE:
+            minhash = MinHash(num_perm=self.num_perm)
+            for shingle in _shingles(text):
+                minhash.update(shingle.encode('utf-8'))
+            if any(self._confirm(normalized, int(key)) for key in self._lsh.query(minhash)):
+                return False
+            self._lsh.insert(str(self._count), minhash)
+            self._texts.append(normalized)
+            self._count += 1
+            return True
+        
+        fingerprint = simhash64(text)
+        mask = (1 << self.BAND_BITS) - 1
+        bands = [(fingerprint >> (band * self.BAND_BITS)) & mask for band in range(self.BANDS)]
+        
+        # A close fingerprint usually shares several bands; compare it only once
+        compared = set()
+        for band, value in enumerate(bands):
+            for other in self._buckets[band].get(value, ()):
+                if other in compared:
+                    continue
+                if _popcount(fingerprint ^ self._fingerprints[other]) <= self.max_distance and self._confirm(normalized, other):
+                    return False
+                compared.add(other)
+        
+        for band, value in enumerate(bands):
+            self._buckets[band][value].append(self._count)
+        self._fingerprints.append(fingerprint)
+        self._texts.append(normalized)
+        self._count += 1
+        return True
+    
+    def _confirm(self, normalized: str, other: int) -> bool:
+        """Check a sketch candidate against the indexed text, when rapidfuzz is available"""
+        if not RAPIDFUZZ_AVAILABLE:
+            return True
+        
+        indexed = self._texts[other]
+        cutoff = self.threshold * 100
+        # fuzz.ratio is at most 200 * shorter / combined length; skip the edit
+        # distance when the lengths alone rule the pair out
+        if 200 * min(len(normalized), len(indexed)) < cutoff * (len(normalized) + len(indexed)):
+            return False
+        return fuzz.ratio(normalized, indexed, score_cutoff=cutoff) >= cutoff
+
+
 def count_lines_of_code(content: str, language: str) -> Dict[str, int]:
     """
     Count different types of lines in code.
@@ -530,6 +1124,59 @@ def calculate_complexity_score(content: str, language: str) -> float:
     return min(complexity, 10.0)  # Cap at 10.0
 
 
+# Event loop shared by all synchronous callers of the SDK (e.g. Flask views).
+# The Vertex AI async client binds to the loop it first runs on, so every call
+# in the process is driven from this one long-lived loop rather than a fresh
+# loop per request or per worker thread.
+_ai_loop: Optional[asyncio.AbstractEventLoop] = None
+_ai_loop_lock = threading.Lock()
+
+# Longest a synchronous caller waits for an SDK call before giving up on it
+AI_TASK_TIMEOUT = 300.0
+
+
+def get_ai_loop() -> asyncio.AbstractEventLoop:
+    """
+    Return the process-wide SDK event loop, starting it on first use.
+    
+    The loop runs on a daemon thread. It is created lazily so that a server
+    which forks workers after import starts one loop in each worker.
+    
+    Returns:
+        Running event loop owned by this module
+    """
+    global _ai_loop
+    if _ai_loop is None:
+        with _ai_loop_lock:
+            if _ai_loop is None:
+                loop = asyncio.new_event_loop()
+                threading.Thread(target=loop.run_forever, name='ai-service-loop', daemon=True).start()
+                _ai_loop = loop
+    return _ai_loop
+
+
+def run_ai_task(coro, timeout: Optional[float] = AI_TASK_TIMEOUT) -> Any:
+    """
+    Run a coroutine on the process-wide SDK event loop and wait for its result.
+    
+    Args:
+        coro: Coroutine calling into the SDK
+        timeout: Seconds to wait before the coroutine is cancelled (None waits indefinitely)
+        
+    Returns:
+        The coroutine's result
+        
+    Raises:
+        TimeoutError: If the coroutine did not finish within timeout
+    """
+    future = asyncio.run_coroutine_threadsafe(coro, get_ai_loop())
+    try:
+        return future.result(timeout)
+    except concurrent.futures.TimeoutError:
+        future.cancel()
+        raise TimeoutError(f"SDK call did not finish within {timeout} seconds")
+
+
 def setup_logging(name: str, level: str = 'INFO') -> logging.Logger:
     """
     Setup logger with consistent formatting.
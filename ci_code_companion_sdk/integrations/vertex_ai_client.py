@@ -6,22 +6,288 @@ specifically optimized for Gemini 2.5 Pro and enhanced prompting.
 """
 
 import os
+import asyncio
 import logging
-from typing import Dict, List, Any, Optional
+import hashlib
+import importlib.util
+import sqlite3
+import threading
+import time
+from collections import OrderedDict, deque
+from functools import lru_cache
+from typing import Dict, List, Any, Optional, Tuple, Callable, TYPE_CHECKING
 import json
-from datetime import datetime
+import random
+import re
+from datetime import datetime, timedelta
 
+# The vertexai package pulls in most of google-cloud-aiplatform and takes seconds
+# to import, so only its presence is checked here; _lazy_vertex() imports it
+# when the first client is created.
 try:
-    import vertexai
-    from vertexai.generative_models import GenerativeModel, Part
+    from google.api_core import exceptions as google_exceptions
+    if importlib.util.find_spec('vertexai') is None:
+        raise ImportError("vertexai is not installed")
     VERTEX_AI_AVAILABLE = True
+    # Transient failures worth retrying: quota (429), internal (500), unavailable (503),
+    # deadline (504). InvalidArgument, PermissionDenied and the like are permanent.
+    RETRYABLE_ERRORS = (
+        asyncio.TimeoutError,
+        google_exceptions.ResourceExhausted,
+        google_exceptions.InternalServerError,
+        google_exceptions.ServiceUnavailable,
+        google_exceptions.DeadlineExceeded
+    )
+    QUOTA_ERRORS = (google_exceptions.ResourceExhausted,)
 except ImportError:
+    RETRYABLE_ERRORS = (asyncio.TimeoutError,)
+    QUOTA_ERRORS = ()
     VERTEX_AI_AVAILABLE = False
     logging.warning("Vertex AI SDK not available. Install with: pip install google-cloud-aiplatform")
 
+if TYPE_CHECKING:
+    from vertexai.generative_models import GenerativeModel, GenerationConfig
+
+vertexai = None
+GenerativeModel = None
+GenerationConfig = None
+
+
+def _lazy_vertex():
+    """Import the Vertex AI SDK on first use"""
+    global vertexai, GenerativeModel, GenerationConfig
+    if GenerativeModel is None:
+        import vertexai as vertexai_module
+        from vertexai.generative_models import (
+            GenerativeModel as generative_model_class,
+            GenerationConfig as generation_config_class
+        )
+        vertexai, GenerativeModel, GenerationConfig = vertexai_module, generative_model_class, generation_config_class
+
+
+@lru_cache(maxsize=16)
+def _build_generation_config(items: Tuple[Tuple[str, Any], ...]) -> 'GenerationConfig':
+    return GenerationConfig(**dict(items))
+
+
+def _sdk_generation_config(config: Dict[str, Any]):
+    """
+    Return the SDK GenerationConfig for a generation config dict.
+    
+    Given a plain dict, the SDK builds a new GenerationConfig protobuf for every
+    request. The configs used here are a few fixed dicts, so each distinct one
+    is converted once and the object is shared by all requests and retries.
+    Configs with unhashable values (e.g. stop sequence lists) are passed through.
+    """
+    try:
+        return _build_generation_config(tuple(config.items()))
+    except TypeError:
+        return config
+
+try:
+    from prometheus_client import Counter
+    RESPONSE_CACHE_HITS = Counter(
+        'vertex_ai_response_cache_hits_total',
+        'Vertex AI generations served from the in-process response cache'
+    )
+    PROMETHEUS_AVAILABLE = True
+except ImportError:
+    RESPONSE_CACHE_HITS = None
+    PROMETHEUS_AVAILABLE = False
+
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+try:
+    import tiktoken
+    TIKTOKEN_AVAILABLE = True
+except ImportError:
+    TIKTOKEN_AVAILABLE = False
+
+# Loaded on first use; None once loading has failed
+_token_encoding = None
+_token_encoding_failed = False
+
+
+def _get_token_encoding():
+    """Load the cl100k_base encoding once, as a local proxy for Gemini's tokenizer"""
+    global _token_encoding, _token_encoding_failed
+    if _token_encoding is None and TIKTOKEN_AVAILABLE and not _token_encoding_failed:
+        try:
+            _token_encoding = tiktoken.get_encoding("cl100k_base")
+        except Exception as e:
+            # The encoding file is downloaded on first use and may be unreachable
+            _token_encoding_failed = True
+            logging.getLogger(__name__).warning(f"tiktoken encoding unavailable, estimating tokens from length: {e}")
+    return _token_encoding
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Estimate token count locally, without a CountTokens request.
+    
+    Uses tiktoken's cl100k_base encoding when installed, which tracks code
+    far better than a character ratio; falls back to 1 token ≈ 4 characters,
+    rounded up so that summing over short pieces does not undercount.
+    """
+    encoding = _get_token_encoding()
+    if encoding is not None:
+        return len(encoding.encode(text, disallowed_special=()))
+    return (len(text) + 3) // 4
+
+# Gemini 2.5 Pro has approximately 1M tokens context window. Local token
+# estimates are approximate, so requests are refused above 90% of it rather
+# than sent to fail (or run into MAX_TOKENS) after a full upload.
+CONTEXT_WINDOW_TOKENS = 1_000_000
+PROMPT_TOKEN_BUDGET = int(CONTEXT_WINDOW_TOKENS * 0.9)
+
+# Upper bound for a single retry backoff, in seconds
+RETRY_MAX_DELAY = 30
+
+# Fenced JSON block in a model response. The body is stripped afterwards rather
+# than with \s* around a lazy group, which backtracks quadratically on long
+# whitespace runs in an unclosed block.
+JSON_BLOCK_RE = re.compile(r'```json(.*?)```', re.DOTALL)
+
+# Generation configs are built once and shared by every request; treat them as read-only.
+# Lower temperature for code analysis precision; output is capped so a runaway
+# generation cannot stall the request or inflate cost.
+ANALYSIS_GENERATION_CONFIG = {
+    "max_output_tokens": 8192,
+    "temperature": 0.1,
+    "top_p": 0.8,
+    "top_k": 40
+}
+
+# Slightly higher temperature for conversational tone
+CHAT_GENERATION_CONFIG = {
+    "max_output_tokens": 8192,
+    "temperature": 0.2,
+    "top_p": 0.9
+}
+
+SUGGESTION_GENERATION_CONFIG = {
+    "max_output_tokens": 2048,
+    "temperature": 0.1,
+    "top_p": 0.8
+}
+
+# A brief reply is enough to prove the model responds
+HEALTH_CHECK_GENERATION_CONFIG = {
+    "max_output_tokens": 16,
+    "temperature": 0
+}
+
+# Seconds a health check result is reused; liveness probes poll far more often
+# than model availability changes, and each live check is a billed request
+HEALTH_CHECK_TTL = 30
+
 # Import configuration error for better error handling
 from ..core.exceptions import ConfigurationError
 
+class RateLimiter:
+    """
+    Client-side RPM/TPM limiter with AIMD concurrency control.
+    
+    Requests and estimated tokens are tracked over a sliding 60 second window
+    so callers wait before the quota is hit instead of collecting 429s. The
+    number of concurrent requests is halved whenever the service reports
+    quota exhaustion and grows by 0.1 after each request that completes
+    within the target latency.
+    
+    State is guarded by a thread lock and each waiter is woken on its own
+    event loop, so one limiter can be shared by callers on different threads
+    and loops.
+    """
+    
+    WINDOW_SECONDS = 60.0
+    
+    def __init__(
+        self,
+        requests_per_minute: int = 60,
+        tokens_per_minute: int = 100_000,
+        max_concurrency: int = 8,
+        target_latency: float = 2.0
+    ):
+        self.requests_per_minute = requests_per_minute
+        self.tokens_per_minute = tokens_per_minute
+        self.max_concurrency = max_concurrency
+        self.concurrency = float(max_concurrency)
+        self.target_latency = target_latency
+        
+        self.in_flight = 0
+        self.window = deque()  # (timestamp, tokens) per request
+        self.tokens_in_window = 0
+        self._lock = threading.Lock()
+        self._waiters: List[Tuple[asyncio.AbstractEventLoop, asyncio.Future]] = []
+    
+    def _expire(self, now: float):
+        """Drop requests that have left the sliding window"""
+        while self.window and now - self.window[0][0] >= self.WINDOW_SECONDS:
+            _, tokens = self.window.popleft()
+            self.tokens_in_window -= tokens
+    
+    def _has_capacity(self, tokens: int) -> bool:
+        if self.in_flight >= int(self.concurrency):
+            return False
+        if len(self.window) >= self.requests_per_minute:
+            return False
+        # A single oversized request is still let through on an empty window
+        return not self.window or self.tokens_in_window + tokens <= self.tokens_per_minute
+    
+    async def acquire(self, tokens: int):
+        """Wait until a request with the estimated token count fits the limits"""
+        loop = asyncio.get_running_loop()
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._expire(now)
+                if self._has_capacity(tokens):
+                    self.in_flight += 1
+                    self.window.append((now, tokens))
+                    self.tokens_in_window += tokens
+                    return
+                
+                waiter = (loop, loop.create_future())
+                self._waiters.append(waiter)
+                # Wake on release, or when the oldest request leaves the window
+                timeout = self.WINDOW_SECONDS - (now - self.window[0][0]) if self.window else None
+            
+            try:
+                await asyncio.wait_for(waiter[1], timeout=timeout)
+            except asyncio.TimeoutError:
+                pass
+            finally:
+                with self._lock:
+                    if waiter in self._waiters:
+                        self._waiters.remove(waiter)
+    
+    async def release(self, latency: float, throttled: bool = False):
+        """Release a request slot and adapt concurrency (AIMD)"""
+        with self._lock:
+            self.in_flight -= 1
+            if throttled:
+                self.concurrency = max(1.0, self.concurrency / 2)
+            elif latency <= self.target_latency:
+                self.concurrency = min(float(self.max_concurrency), self.concurrency + 0.1)
+            waiters, self._waiters = self._waiters, []
+        
+        for loop, future in waiters:
+            try:
+                loop.call_soon_threadsafe(_wake_waiter, future)
+            except RuntimeError:
+                # The waiter's loop has already closed
+                pass
+
+
+def _wake_waiter(future: asyncio.Future):
+    if not future.done():
+        future.set_result(None)
+
+
 class VertexAIClient:
     """
     Enhanced Vertex AI client optimized for Gemini 2.5 Pro and enhanced prompting.
@@ -30,6 +296,7 @@ class VertexAIClient:
     - Support for Gemini 2.5 Pro with 1M token context window
     - Integration with PromptLoader for enhanced prompting
     - Optimized response generation
+    - Exact-match response cache for repeated prompts, optionally persisted to disk
     - Performance monitoring
     """
     
@@ -38,7 +305,17 @@ class VertexAIClient:
         project_id: str, 
         location: str = "us-central1",
         model_name: Optional[str] = None,
-        credentials_path: Optional[str] = None
+        credentials_path: Optional[str] = None,
+        cache_enabled: bool = True,
+        cache_ttl: int = 3600,
+        cache_max_entries: int = 4096,
+        cache_path: Optional[str] = None,
+        max_concurrency: int = 8,
+        requests_per_minute: int = 60,
+        tokens_per_minute: int = 100_000,
+        request_timeout: float = 120.0,
+        max_retries: int = 3,
+        context_cache_ttl: int = 3600
     ):
         """
         Initialize the Vertex AI client with model from environment configuration.
@@ -48,14 +325,59 @@ class VertexAIClient:
             location: Vertex AI location (default: us-central1)
             model_name: Model to use (reads from GEMINI_MODEL env var if None)
             credentials_path: Optional path to service account JSON (if not using env var)
+            cache_enabled: Serve identical prompts from the in-process response cache
+            cache_ttl: Seconds a cached response stays valid
+            cache_max_entries: Maximum cached responses before least recently used are evicted
+            cache_path: SQLite file that persists cached responses across runs
+                (reads from VERTEX_AI_CACHE_PATH env var if None; disabled if unset)
+            max_concurrency: Maximum in-flight Vertex AI requests across concurrent callers
+            requests_per_minute: Client-side request quota per minute
+            tokens_per_minute: Client-side input token quota per minute
+            request_timeout: Seconds to wait for a single Vertex AI request
+            max_retries: Attempts per request on quota, availability and timeout errors
+            context_cache_ttl: Seconds a static prompt prefix stays registered with Gemini context caching
         """
         if not VERTEX_AI_AVAILABLE:
             raise ImportError("Vertex AI SDK not available. Install with: pip install google-cloud-aiplatform")
+        _lazy_vertex()
         
         self.project_id = project_id
         self.location = location
         self.logger = logging.getLogger(__name__)
         
+        # Bound in-flight requests so concurrent batch work stays within RPM/TPM quotas
+        self.rate_limiter = RateLimiter(
+            requests_per_minute=requests_per_minute,
+            tokens_per_minute=tokens_per_minute,
+            max_concurrency=max_concurrency
+        )
+        self.request_timeout = request_timeout
+        self.max_retries = max(1, max_retries)
+        
+        # L0 exact-match response cache keyed by model, generation config and prompt
+        self.cache_enabled = cache_enabled
+        self.cache_ttl = cache_ttl
+        self.cache_max_entries = cache_max_entries
+        self.response_cache: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        # Request threads share the client, so the LRU is only touched under this lock
+        self._memory_cache_lock = threading.Lock()
+        self.cache_stats = {'hits': 0, 'misses': 0, 'disk_hits': 0}
+        
+        # Persistent tier behind the in-memory LRU so repeat CI runs skip the network
+        self.cache_path = cache_path or os.getenv('VERTEX_AI_CACHE_PATH')
+        self._cache_lock = threading.Lock()
+        self._cache_db = self._open_persistent_cache(self.cache_path) if cache_enabled and self.cache_path else None
+        
+        # Models bound to a static instruction prefix, registered once with Gemini
+        # context caching so repeated requests do not resend it
+        self.context_cache_ttl = context_cache_ttl
+        self._prefix_models: Dict[str, Tuple['GenerativeModel', float]] = {}
+        self._prefix_lock = asyncio.Lock()
+        
+        # Last health check result and when it was taken
+        self._health_status: Optional[Dict[str, Any]] = None
+        self._health_checked_at = 0.0
+        
         # Read model name from environment - no fallbacks
         if model_name is None:
             model_name = os.getenv('GEMINI_MODEL')
@@ -77,13 +399,19 @@ class VertexAIClient:
             os.environ['GOOGLE_APPLICATION_CREDENTIALS'] = credentials_path
             self.logger.info(f"Using provided credentials file: {credentials_path}")
         elif os.getenv('GOOGLE_APPLICATION_CREDENTIALS'):
-            self.logger.info(f"Using GOOGLE_APPLICATION_CREDENTIALS: {os.getenv('GOOGLE_APPLICATION_CREDENTIALS')}")
+            credentials_path = os.getenv('GOOGLE_APPLICATION_CREDENTIALS')
+            self.logger.info(f"Using GOOGLE_APPLICATION_CREDENTIALS: {credentials_path}")
         else:
             self.logger.info("No explicit credentials path provided, relying on default authentication")
         
         try:
-            # Initialize Vertex AI
-            vertexai.init(project=project_id, location=location)
+            # Initialize Vertex AI with the service account loaded up front, so the
+            # SDK does not run application default credential discovery
+            vertexai.init(
+                project=project_id,
+                location=location,
+                credentials=self._load_service_account_credentials(credentials_path)
+            )
             self.logger.info(f"Vertex AI initialized with project: {project_id}, location: {location}")
             
             # Initialize the specified model directly
@@ -91,12 +419,7 @@ class VertexAIClient:
             self.logger.info(f"Successfully initialized model: {model_name}")
             
             # Set generation config optimized for code analysis
-            self.generation_config = {
-                "max_output_tokens": 8192,
-                "temperature": 0.1,  # Lower temperature for code analysis
-                "top_p": 0.8,
-                "top_k": 40
-            }
+            self.generation_config = dict(ANALYSIS_GENERATION_CONFIG)
             
             self.logger.info(f"VertexAI client initialized successfully with {self.model_name}")
             
@@ -114,7 +437,35 @@ class VertexAIClient:
                 inner_exception=e
             )
     
-    def _initialize_model_with_fallbacks(self, requested_model: str) -> GenerativeModel:
+    def _load_service_account_credentials(self, credentials_path: Optional[str]):
+        """
+        Load explicit service account credentials from a key file.
+        
+        Without explicit credentials vertexai.init falls back to google.auth.default(),
+        which probes gcloud configuration and the GCE metadata server and can block
+        for several seconds on machines outside Google Cloud.
+        
+        Args:
+            credentials_path: Path to a service account JSON key file
+            
+        Returns:
+            Service account credentials, or None to use default authentication
+        """
+        if not credentials_path or not os.path.exists(credentials_path):
+            return None
+        
+        try:
+            from google.oauth2 import service_account
+            return service_account.Credentials.from_service_account_file(
+                credentials_path,
+                scopes=['https://www.googleapis.com/auth/cloud-platform']
+            )
+        except Exception as e:
+            # Not a service account key (e.g. authorized user credentials); let the SDK resolve it
+            self.logger.debug(f"Could not load service account credentials from {credentials_path}: {str(e)}")
+            return None
+    
+    def _initialize_model_with_fallbacks(self, requested_model: str) -> 'GenerativeModel':
         """
         DEPRECATED: This method is no longer used. Model is initialized directly.
         Kept for backward compatibility but will be removed.
@@ -138,7 +489,18 @@ class VertexAIClient:
                 return False, f"No candidates in {operation_name} response", {"finish_reason": "NO_CANDIDATES"}
             
             candidate = response.candidates[0]
+            # The SDK reports finish reasons as enums; compare them by name
             finish_reason = getattr(candidate, 'finish_reason', None)
+            finish_reason = getattr(finish_reason, 'name', finish_reason)
+            
+            # Fast path: a normally finished single-part response, read directly
+            if finish_reason in (None, "STOP"):
+                try:
+                    parts = candidate.content.parts
+                    if len(parts) == 1 and parts[0].text:
+                        return True, parts[0].text, {"finish_reason": finish_reason or "STOP"}
+                except (AttributeError, IndexError, ValueError):
+                    pass  # fall back to the defensive path below
             
             # Handle different finish reasons
             if finish_reason == "MAX_TOKENS":
@@ -159,9 +521,13 @@ class VertexAIClient:
             elif finish_reason == "OTHER":
                 return False, f"{operation_name} stopped for unknown reasons.", {"finish_reason": "OTHER"}
             
-            # Normal completion
-            if hasattr(response, 'text') and response.text:
-                return True, response.text, {"finish_reason": finish_reason or "STOP"}
+            # Normal completion; response.text joins all parts on every access
+            try:
+                text = response.text
+            except (AttributeError, ValueError):
+                text = None
+            if text:
+                return True, text, {"finish_reason": finish_reason or "STOP"}
             
             # Try alternative text extraction
             if hasattr(candidate, 'content') and hasattr(candidate.content, 'parts') and candidate.content.parts:
@@ -175,10 +541,457 @@ class VertexAIClient:
             self.logger.error(f"Error handling {operation_name} response: {e}")
             return False, f"Error processing {operation_name} response: {str(e)}", {"error": str(e)}
 
+    def _open_persistent_cache(self, cache_path: str) -> Optional[sqlite3.Connection]:
+        """Open (and create if needed) the SQLite response cache"""
+        try:
+            cache_dir = os.path.dirname(cache_path)
+            if cache_dir:
+                os.makedirs(cache_dir, exist_ok=True)
+            
+            connection = sqlite3.connect(cache_path, check_same_thread=False)
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS response_cache ("
+                "cache_key TEXT PRIMARY KEY, text TEXT NOT NULL, "
+                "metadata TEXT NOT NULL, timestamp REAL NOT NULL)"
+            )
+            # Expired rows are never read again; drop them so the file stops growing
+            connection.execute(
+                "DELETE FROM response_cache WHERE timestamp < ?",
+                (time.time() - self.cache_ttl,)
+            )
+            connection.commit()
+            self.logger.info(f"Using persistent response cache: {cache_path}")
+            return connection
+        except sqlite3.Error as e:
+            self.logger.warning(f"Persistent response cache unavailable ({cache_path}): {e}")
+            return None
+    
+    def _response_cache_key(
+        self,
+        prompt: str,
+        generation_config: Dict[str, Any],
+        static_prefix: Optional[str] = None
+    ) -> str:
+        """
+        Generate cache key from model, generation config, static prefix and prompt.
+        
+        The parts are fed to the hash one by one rather than joined first, so
+        the prompt and the (large) static prefix are not copied into a combined
+        string on every request.
+        """
+        if ORJSON_AVAILABLE:
+            config_key = orjson.dumps(generation_config, option=orjson.OPT_SORT_KEYS)
+        else:
+            config_key = json.dumps(generation_config, sort_keys=True).encode('utf-8')
+        
+        key = hashlib.sha256(f"{self.model_name}:".encode('utf-8'))
+        key.update(config_key)
+        key.update(b":")
+        key.update(prompt.encode('utf-8'))
+        if static_prefix:
+            key.update(b":")
+            key.update(static_prefix.encode('utf-8'))
+        return key.hexdigest()
+    
+    def _get_cached_response(self, cache_key: str) -> Optional[Dict[str, Any]]:
+        """Return a cached response if present and not expired"""
+        with self._memory_cache_lock:
+            entry = self.response_cache.get(cache_key)
+            if entry is not None:
+                if time.time() - entry['timestamp'] >= self.cache_ttl:
+                    del self.response_cache[cache_key]
+                    return None
+                self.response_cache.move_to_end(cache_key)
+                return entry
+        
+        return self._get_persisted_response(cache_key)
+    
+    def _remember_response(self, cache_key: str, entry: Dict[str, Any]):
+        """Put an entry in the in-memory LRU, evicting the least recently used when full"""
+        with self._memory_cache_lock:
+            self.response_cache[cache_key] = entry
+            self.response_cache.move_to_end(cache_key)
+            while len(self.response_cache) > self.cache_max_entries:
+                self.response_cache.popitem(last=False)
+    
+    def _get_persisted_response(self, cache_key: str) -> Optional[Dict[str, Any]]:
+        """Look up the persistent tier and promote hits into memory"""
+        if self._cache_db is None:
+            return None
+        
+        try:
+            with self._cache_lock:
+                row = self._cache_db.execute(
+                    "SELECT text, metadata, timestamp FROM response_cache WHERE cache_key = ?",
+                    (cache_key,)
+                ).fetchone()
+        except sqlite3.Error as e:
+            self.logger.warning(f"Persistent response cache read failed: {e}")
+            return None
+        
+        if row is None or time.time() - row[2] >= self.cache_ttl:
+            return None
+        
+        entry = {'text': row[0], 'metadata': orjson.loads(row[1]) if ORJSON_AVAILABLE else json.loads(row[1]), 'timestamp': row[2]}
+        self._remember_response(cache_key, entry)
+        self.cache_stats['disk_hits'] += 1
+        return entry
+    
+    def _store_cached_response(self, cache_key: str, text: str, metadata: Dict[str, Any]):
+        """Store a response, evicting the least recently used entries when full"""
+        timestamp = time.time()
+        self._remember_response(cache_key, {
+            'text': text,
+            'metadata': metadata,
+            'timestamp': timestamp
+        })
+        
+        if self._cache_db is not None:
+            try:
+                with self._cache_lock:
+                    self._cache_db.execute(
+                        "INSERT OR REPLACE INTO response_cache VALUES (?, ?, ?, ?)",
+                        (cache_key, text, orjson.dumps(metadata).decode('utf-8') if ORJSON_AVAILABLE else json.dumps(metadata),
+                         timestamp)
+                    )
+                    self._cache_db.commit()
+            except sqlite3.Error as e:
+                self.logger.warning(f"Persistent response cache write failed: {e}")
+    
+    async def _generate_content(
+        self,
+        prompt: str,
+        generation_config: Dict[str, Any],
+        operation_name: str = "generation",
+        static_prefix: Optional[str] = None,
+        on_text: Optional[Callable[[str], None]] = None,
+        prompt_tokens: Optional[int] = None,
+        use_cache: bool = True
+    ) -> Tuple[bool, str, Dict[str, Any]]:
+        """
+        Generate content through the response cache.
+        
+        Identical prompts recur across CI runs, so complete responses are cached
+        by exact match and a hit skips the Vertex AI request entirely. Partial
+        and failed responses are never cached, and neither are creative calls
+        (temperature above 0.3) where varied output is expected.
+        
+        Misses use the async API under the rate limiter, so concurrent callers
+        overlap their network waits instead of blocking the event loop. A
+        prompt that cannot fit the context window together with its output
+        budget fails immediately, without a request.
+        
+        Args:
+            prompt: Prompt text (the variable part when static_prefix is given)
+            generation_config: Generation configuration for the request
+            operation_name: Name of the operation for logging
+            static_prefix: Invariant instructions sent through a context-cached model
+            on_text: Called with each piece of text as it is generated; the
+                response is streamed when given (a cache hit is passed in one piece)
+            prompt_tokens: Token estimate of prompt if the caller already has one
+            use_cache: Read and write the response cache for this request
+            
+        Returns:
+            Tuple of (success: bool, text: str, metadata: dict)
+        """
+        cache_key = None
+        if use_cache and self.cache_enabled and generation_config.get('temperature', 0) <= 0.3:
+            cache_key = self._response_cache_key(prompt, generation_config, static_prefix)
+            cached = self._get_cached_response(cache_key)
+            if cached is not None:
+                self.cache_stats['hits'] += 1
+                if PROMETHEUS_AVAILABLE:
+                    RESPONSE_CACHE_HITS.inc()
+                self.logger.debug(f"{operation_name} served from response cache")
+                if on_text:
+                    on_text(cached['text'])
+                return True, cached['text'], {**cached['metadata'], 'cache_hit': True}
+            self.cache_stats['misses'] += 1
+        
+        if prompt_tokens is None:
+            prompt_tokens = self._estimate_tokens(prompt)
+        if prompt_tokens + generation_config.get('max_output_tokens', 0) > PROMPT_TOKEN_BUDGET:
+            self.logger.warning(f"{operation_name} prompt of ~{prompt_tokens} tokens exceeds the context budget, not sending")
+            return False, (
+                f"{operation_name} prompt of ~{prompt_tokens} tokens is too large for the model's context window. "
+                "Split the input into smaller parts."
+            ), {"finish_reason": "PROMPT_TOO_LARGE"}
+        
+        model = await self._get_prefix_model(static_prefix) if static_prefix else self.model
+        if on_text:
+            success, text, metadata = await self._stream_with_retries(
+                prompt, generation_config, operation_name, model, on_text, prompt_tokens
+            )
+        else:
+            response = await self._send_with_retries(prompt, generation_config, operation_name, model, prompt_tokens)
+            success, text, metadata = self._handle_response_safely(response, operation_name)
+        
+        if cache_key and success and not metadata.get('partial'):
+            self._store_cached_response(cache_key, text, metadata)
+        
+        return success, text, metadata
+    
+    async def _send_with_retries(
+        self,
+        prompt: str,
+        generation_config: Dict[str, Any],
+        operation_name: str,
+        model: Optional['GenerativeModel'] = None,
+        prompt_tokens: Optional[int] = None
+    ):
+        """Send a request with a timeout, retrying transient failures with exponential backoff"""
+        model = model or self.model
+        tokens = prompt_tokens if prompt_tokens is not None else self._estimate_tokens(prompt)
+        
+        for attempt in range(1, self.max_retries + 1):
+            await self.rate_limiter.acquire(tokens)
+            start = time.monotonic()
+            error = None
+            try:
+                return await asyncio.wait_for(
+                    model.generate_content_async(prompt, generation_config=_sdk_generation_config(generation_config)),
+                    timeout=self.request_timeout
+                )
+            except RETRYABLE_ERRORS as e:
+                error = e
+                if attempt == self.max_retries:
+                    raise
+            finally:
+                await self.rate_limiter.release(
+                    time.monotonic() - start,
+                    throttled=isinstance(error, QUOTA_ERRORS)
+                )
+            
+            delay = self._retry_delay(attempt)
+            self.logger.warning(
+                f"{operation_name} attempt {attempt}/{self.max_retries} failed "
+                f"({type(error).__name__}), retrying in {delay:.1f}s"
+            )
+            await asyncio.sleep(delay)
+    
+    def _retry_delay(self, attempt: int) -> float:
+        """
+        Backoff before retry number attempt: exponential with full jitter.
+        
+        Concurrent requests failing on the same outage would otherwise retry in
+        lockstep and hit the service together again; a random delay between 1s
+        and the exponential ceiling spreads them out.
+        """
+        return max(1.0, random.uniform(0, min(RETRY_MAX_DELAY, 2 ** attempt)))
+    
+    async def _stream_with_retries(
+        self,
+        prompt: str,
+        generation_config: Dict[str, Any],
+        operation_name: str,
+        model: 'GenerativeModel',
+        on_text: Callable[[str], None],
+        prompt_tokens: Optional[int] = None
+    ) -> Tuple[bool, str, Dict[str, Any]]:
+        """
+        Stream a response, passing each text piece to on_text as it arrives.
+        
+        Transient failures are retried like _send_with_retries, but only before
+        the first piece was delivered; after that a retry would repeat text
+        the caller has already consumed. The request timeout covers the whole
+        stream, not just opening it, so a stalled stream cannot hang the caller.
+        """
+        tokens = prompt_tokens if prompt_tokens is not None else self._estimate_tokens(prompt)
+        
+        async def consume_stream():
+            nonlocal finish_reason
+            responses = await model.generate_content_async(
+                prompt, generation_config=_sdk_generation_config(generation_config), stream=True
+            )
+            async for chunk in responses:
+                if chunk.candidates:
+                    finish_reason = chunk.candidates[0].finish_reason or finish_reason
+                try:
+                    text = chunk.text
+                except (ValueError, AttributeError):
+                    # Chunks without text parts, e.g. the final finish_reason chunk
+                    continue
+                if text:
+                    parts.append(text)
+                    on_text(text)
+        
+        for attempt in range(1, self.max_retries + 1):
+            await self.rate_limiter.acquire(tokens)
+            start = time.monotonic()
+            error = None
+            parts = []
+            finish_reason = None
+            try:
+                await asyncio.wait_for(consume_stream(), timeout=self.request_timeout)
+                break
+            except RETRYABLE_ERRORS as e:
+                error = e
+                if parts or attempt == self.max_retries:
+                    raise
+            finally:
+                await self.rate_limiter.release(
+                    time.monotonic() - start,
+                    throttled=isinstance(error, QUOTA_ERRORS)
+                )
+            
+            delay = self._retry_delay(attempt)
+            self.logger.warning(
+                f"{operation_name} stream attempt {attempt}/{self.max_retries} failed "
+                f"({type(error).__name__}), retrying in {delay:.1f}s"
+            )
+            await asyncio.sleep(delay)
+        
+        text = ''.join(parts)
+        finish_reason = getattr(finish_reason, 'name', finish_reason)
+        
+        if finish_reason in ["SAFETY", "RECITATION"]:
+            return False, f"{operation_name} blocked by safety filters. Try rephrasing your request.", {"finish_reason": finish_reason}
+        if not text.strip():
+            return False, f"No text content in {operation_name} response", {"finish_reason": finish_reason or "NO_TEXT"}
+        if finish_reason == "MAX_TOKENS":
+            self.logger.warning(f"{operation_name} hit MAX_TOKENS but got partial response")
+            return True, text, {"finish_reason": "MAX_TOKENS", "partial": True}
+        return True, text, {"finish_reason": finish_reason or "STOP"}
+    
+    async def _get_prefix_model(self, static_prefix: str) -> 'GenerativeModel':
+        """
+        Get a model with the static prefix registered as cached content.
+        
+        The prefix is uploaded once per TTL and later requests only send their
+        variable part, cutting input tokens and time to first token. Context
+        caching has a minimum token count and is not offered for every model,
+        so when registration fails the prefix is bound as a system instruction
+        instead.
+        
+        Models are keyed by the prefix text itself (its hash is computed once
+        per string object), and a live entry is returned without taking the
+        lock, so the parts of a large analysis share one model at no per-request
+        cost.
+        """
+        entry = self._prefix_models.get(static_prefix)
+        if entry and time.monotonic() < entry[1]:
+            return entry[0]
+        
+        async with self._prefix_lock:
+            # Another request may have registered the prefix while we waited
+            entry = self._prefix_models.get(static_prefix)
+            if entry and time.monotonic() < entry[1]:
+                return entry[0]
+            
+            try:
+                from vertexai.preview import caching
+                from vertexai.preview.generative_models import GenerativeModel as PreviewGenerativeModel
+                
+                cached_content = await asyncio.to_thread(
+                    caching.CachedContent.create,
+                    model_name=self.model_name,
+                    system_instruction=static_prefix,
+                    ttl=timedelta(seconds=self.context_cache_ttl)
+                )
+                model = PreviewGenerativeModel.from_cached_content(cached_content=cached_content)
+                # Refresh shortly before Gemini expires the cached content
+                expires_at = time.monotonic() + max(0, self.context_cache_ttl - 60)
+                self.logger.info(f"Registered static prompt prefix as cached content: {cached_content.name}")
+            except Exception as e:
+                self.logger.debug(f"Context caching unavailable, using system instruction: {e}")
+                model = GenerativeModel(self.model_name, system_instruction=static_prefix)
+                expires_at = float('inf')
+            
+            self._prefix_models[static_prefix] = (model, expires_at)
+            return model
+    
+    async def generate_with_static_prefix(
+        self,
+        static_prefix: str,
+        prompt: str,
+        operation_name: str = "generation",
+        on_text: Optional[Callable[[str], None]] = None,
+        prompt_tokens: Optional[int] = None,
+        use_cache: bool = True,
+        max_output_tokens: Optional[int] = None
+    ) -> Dict[str, Any]:
+        """
+        Generate content for a prompt that shares invariant instructions with other requests.
+        
+        Unlike analyze_with_enhanced_prompt, the prompt is not wrapped in the
+        Gemini analysis instructions; the static prefix is sent once through
+        context caching and each request carries only its variable part.
+        
+        Args:
+            static_prefix: Instructions identical across requests
+            prompt: Request-specific prompt text
+            operation_name: Name of the operation for logging
+            on_text: Called with each piece of text as it is generated; the
+                response is streamed when given
+            prompt_tokens: Token estimate of prompt if the caller already has one
+            use_cache: Serve and store this request through the response cache
+            max_output_tokens: Output cap for this request instead of the configured one
+            
+        Returns:
+            Generation result with text and metadata
+        """
+        try:
+            start_time = datetime.now()
+            if prompt_tokens is None:
+                prompt_tokens = self._estimate_tokens(prompt)
+            
+            generation_config = self.generation_config
+            if max_output_tokens:
+                generation_config = {**generation_config, "max_output_tokens": max_output_tokens}
+            
+            success, text, response_metadata = await self._generate_content(
+                prompt, generation_config, operation_name,
+                static_prefix=static_prefix, on_text=on_text, prompt_tokens=prompt_tokens,
+                use_cache=use_cache
+            )
+            
+            processing_time = (datetime.now() - start_time).total_seconds()
+            
+            result = {
+                'success': success,
+                'text': text,
+                'metadata': {
+                    'model_used': self.model_name,
+                    'processing_time_seconds': processing_time,
+                    'prompt_tokens': prompt_tokens,
+                    'finish_reason': response_metadata.get('finish_reason', 'STOP' if success else 'UNKNOWN'),
+                    'partial_response': response_metadata.get('partial', False),
+                    'cache_hit': response_metadata.get('cache_hit', False)
+                }
+            }
+            if not success:
+                result['error'] = text
+            return result
+            
+        except Exception as e:
+            self.logger.error(f"Error in {operation_name}: {str(e)}")
+            return {
+                'success': False,
+                'error': str(e),
+                'text': f"{operation_name} failed: {str(e)}",
+                'metadata': {
+                    'model_used': self.model_name,
+                    'error_occurred': True
+                }
+            }
+    
+    def clear_cache(self):
+        """Clear the response cache"""
+        with self._memory_cache_lock:
+            self.response_cache.clear()
+        if self._cache_db is not None:
+            with self._cache_lock:
+                self._cache_db.execute("DELETE FROM response_cache")
+                self._cache_db.commit()
+        self.logger.info("Response cache cleared")
+    
     async def analyze_with_enhanced_prompt(
         self, 
         enhanced_prompt: str, 
-        context: Dict[str, Any]
+        context: Dict[str, Any],
+        on_text: Optional[Callable[[str], None]] = None,
+        use_cache: bool = True,
+        max_output_tokens: Optional[int] = None
     ) -> Dict[str, Any]:
         """
         Analyze code using enhanced prompts optimized for Gemini 2.5 Pro's massive context window.
@@ -186,6 +999,12 @@ class VertexAIClient:
         Args:
             enhanced_prompt: Complete enhanced prompt from PromptLoader
             context: Context information for analysis
+            on_text: Optional callback receiving the response text as it streams in,
+                so callers can start parsing before generation finishes
+            use_cache: Serve and store this request through the response cache;
+                pass False to force a fresh analysis
+            max_output_tokens: Output cap for this request instead of the
+                analysis default
             
         Returns:
             Analysis results with metadata
@@ -199,27 +1018,26 @@ class VertexAIClient:
             # Calculate optimal token allocation based on prompt size
             prompt_tokens = self._estimate_tokens(gemini_prompt)
             
-            # Use the model's full capacity without artificial restrictions
-            analysis_config = {
-                "temperature": 0.1,  # Lower for code analysis precision
-                "top_p": 0.8,
-                "top_k": 40
-            }
-            
             self.logger.info(f"Using full model capacity for {prompt_tokens} prompt tokens (1M+ context window)")
             
+            generation_config = ANALYSIS_GENERATION_CONFIG
+            if max_output_tokens:
+                generation_config = {**generation_config, "max_output_tokens": max_output_tokens}
+            
             # Generate response
-            response = self.model.generate_content(
-                gemini_prompt,
-                generation_config=analysis_config
+            success, analysis_text, response_metadata = await self._generate_content(
+                gemini_prompt, generation_config, "analysis", on_text=on_text,
+                prompt_tokens=prompt_tokens, use_cache=use_cache
             )
             
             processing_time = (datetime.now() - start_time).total_seconds()
             
-            # Handle response safely
-            success, analysis_text, response_metadata = self._handle_response_safely(response, "analysis")
-            
             if success:
+                # Count each text once; the metrics below all derive from these
+                enhanced_tokens = self._estimate_tokens(enhanced_prompt)
+                response_tokens = self._estimate_tokens(analysis_text)
+                context_usage = self._calculate_context_usage(enhanced_prompt, enhanced_tokens)
+                
                 return {
                     'success': True,
                     'text': analysis_text,
@@ -229,17 +1047,20 @@ class VertexAIClient:
                         'prompt_length': len(enhanced_prompt),
                         'prompt_tokens': prompt_tokens,
                         'response_length': len(analysis_text),
-                        'context_window_usage': self._calculate_context_usage(enhanced_prompt),
+                        'context_window_usage': context_usage,
                         'gemini_2_5_pro_optimized': True,
                         'full_context_window_used': True,
                         'finish_reason': response_metadata.get('finish_reason', 'STOP'),
-                        'partial_response': response_metadata.get('partial', False)
+                        'partial_response': response_metadata.get('partial', False),
+                        'cache_hit': response_metadata.get('cache_hit', False)
                     },
                     'performance_metrics': {
-                        'tokens_processed': self._estimate_tokens(enhanced_prompt + analysis_text),
-                        'efficiency_score': self._calculate_efficiency_score(enhanced_prompt, analysis_text),
+                        'tokens_processed': enhanced_tokens + response_tokens,
+                        'efficiency_score': self._calculate_efficiency_score(
+                            enhanced_prompt, analysis_text, enhanced_tokens, response_tokens
+                        ),
                         'response_time_ms': processing_time * 1000,
-                        'context_utilization': self._calculate_context_usage(enhanced_prompt)
+                        'context_utilization': context_usage
                     }
                 }
             else:
@@ -295,24 +1116,14 @@ class VertexAIClient:
             # Calculate optimal token allocation for chat
             prompt_tokens = self._estimate_tokens(chat_prompt)
             
-            # Use full model capacity for conversational responses
-            chat_config = {
-                "temperature": 0.2,  # Slightly higher for conversational tone
-                "top_p": 0.9
-            }
-            
             self.logger.info(f"Chat using full model capacity for {prompt_tokens} prompt tokens (1M+ context window)")
             
-            response = self.model.generate_content(
-                chat_prompt,
-                generation_config=chat_config
+            success, response_text, response_metadata = await self._generate_content(
+                chat_prompt, CHAT_GENERATION_CONFIG, "chat", prompt_tokens=prompt_tokens
             )
             
             processing_time = (datetime.now() - start_time).total_seconds()
             
-            # Handle response safely
-            success, response_text, response_metadata = self._handle_response_safely(response, "chat")
-            
             self.logger.info(f"🔍 CHAT RESPONSE DEBUG: success={success}")
             self.logger.info(f"🔍 CHAT RESPONSE DEBUG: response_text='{response_text[:200]}{'...' if len(response_text) > 200 else ''}'" if response_text else "🔍 CHAT RESPONSE DEBUG: response_text is empty/None")
             self.logger.info(f"🔍 CHAT RESPONSE DEBUG: response_metadata={response_metadata}")
@@ -327,7 +1138,7 @@ class VertexAIClient:
                         'chat_mode': True,
                         'conversation_length': len(conversation_history),
                         'prompt_tokens': prompt_tokens,
-                        'context_window_usage': self._calculate_context_usage(chat_prompt),
+                        'context_window_usage': self._calculate_context_usage(chat_prompt, prompt_tokens),
                         'gemini_2_5_pro_optimized': True,
                         'full_context_window_used': True,
                         'finish_reason': response_metadata.get('finish_reason', 'STOP'),
@@ -378,20 +1189,12 @@ class VertexAIClient:
         try:
             suggestion_prompt = self._build_suggestion_prompt(enhanced_prompt, context)
             
-            # Use suggestion-optimized config
-            suggestion_config = {
-                "max_output_tokens": 2048,
-                "temperature": 0.1,
-                "top_p": 0.8
-            }
-            
-            response = self.model.generate_content(
-                suggestion_prompt,
-                generation_config=suggestion_config
+            success, response_text, _ = await self._generate_content(
+                suggestion_prompt, SUGGESTION_GENERATION_CONFIG, "suggestions"
             )
             
             # Parse suggestions from response
-            suggestions = self._parse_suggestions(response.text if response.text else "")
+            suggestions = self._parse_suggestions(response_text if success else "")
             
             return suggestions
             
@@ -493,16 +1296,15 @@ Please provide intelligent code completion suggestions in the following JSON for
         
         try:
             # Try to extract JSON from response
-            if '```json' in response_text:
-                json_start = response_text.find('```json') + 7
-                json_end = response_text.find('```', json_start)
-                json_text = response_text[json_start:json_end].strip()
-                suggestions = json.loads(json_text)
+            json_block = JSON_BLOCK_RE.search(response_text)
+            if json_block:
+                json_text = json_block.group(1).strip()
+                suggestions = orjson.loads(json_text) if ORJSON_AVAILABLE else json.loads(json_text)
             else:
                 # Fallback: create suggestions from text analysis
                 suggestions = self._create_fallback_suggestions(response_text)
                 
-        except json.JSONDecodeError:
+        except json.JSONDecodeError:  # orjson.JSONDecodeError is a subclass
             # Fallback to simple text-based suggestions
             suggestions = self._create_fallback_suggestions(response_text)
         
@@ -532,12 +1334,11 @@ Please provide intelligent code completion suggestions in the following JSON for
         
         return suggestions
     
-    def _calculate_context_usage(self, prompt: str) -> float:
+    def _calculate_context_usage(self, prompt: str, estimated_tokens: Optional[int] = None) -> float:
         """Calculate what percentage of the 1M+ context window is being used"""
-        estimated_tokens = self._estimate_tokens(prompt)
-        # Gemini 2.5 Pro has approximately 1M tokens context window
-        context_window_size = 1_000_000
-        usage = estimated_tokens / context_window_size
+        if estimated_tokens is None:
+            estimated_tokens = self._estimate_tokens(prompt)
+        usage = estimated_tokens / CONTEXT_WINDOW_TOKENS
         
         # Log context usage for optimization
         if usage > 0.8:
@@ -550,13 +1351,21 @@ Please provide intelligent code completion suggestions in the following JSON for
         return min(1.0, usage)
     
     def _estimate_tokens(self, text: str) -> int:
-        """Estimate token count (rough approximation: 1 token ≈ 4 characters)"""
-        return len(text) // 4
+        """Estimate token count locally (see estimate_tokens)"""
+        return estimate_tokens(text)
     
-    def _calculate_efficiency_score(self, prompt: str, response: str) -> float:
+    def _calculate_efficiency_score(
+        self,
+        prompt: str,
+        response: str,
+        prompt_tokens: Optional[int] = None,
+        response_tokens: Optional[int] = None
+    ) -> float:
         """Calculate efficiency score based on prompt/response ratio"""
-        prompt_tokens = self._estimate_tokens(prompt)
-        response_tokens = self._estimate_tokens(response)
+        if prompt_tokens is None:
+            prompt_tokens = self._estimate_tokens(prompt)
+        if response_tokens is None:
+            response_tokens = self._estimate_tokens(response)
         
         if prompt_tokens == 0:
             return 0.0
@@ -576,18 +1385,23 @@ Please provide intelligent code completion suggestions in the following JSON for
         """
         Check if the Vertex AI service is accessible and responding.
         
+        Results are reused for HEALTH_CHECK_TTL seconds.
+        
         Returns:
             Health status with connection details
         """
+        now = time.monotonic()
+        if self._health_status is None or now - self._health_checked_at >= HEALTH_CHECK_TTL:
+            self._health_status = self._run_health_check()
+            self._health_checked_at = now
+        return dict(self._health_status)
+    
+    def _run_health_check(self) -> Dict[str, Any]:
+        """Send a short test prompt to the model and report the outcome"""
         try:
-            # Simple test without restrictive token limits - let the model use its full capacity
-            test_config = {
-                "temperature": 0
-            }
-            
             test_response = self.model.generate_content(
                 "Hello, please respond briefly.",  # Simple test message
-                generation_config=test_config
+                generation_config=_sdk_generation_config(HEALTH_CHECK_GENERATION_CONFIG)
             )
             
             # Handle response safely
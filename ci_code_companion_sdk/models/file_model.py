@@ -10,9 +10,81 @@ from typing import Dict, List, Optional, Any, Set
 from pathlib import Path
 from datetime import datetime
 import os
+import re
 import hashlib
 
 
+# Keywords used to guess the language of files without a known extension,
+# matched in a single pass over the content
+CONTENT_LANGUAGE_RE = re.compile(
+    r'(?P<python>import |def |class )|(?P<javascript>function |const |let )'
+    r'|(?P<java>public class(?! ))'
+)
+
+# Lookup tables used per file, built once at import time
+EXTENSION_LANGUAGES = {
+    '.py': 'python',
+    '.js': 'javascript',
+    '.jsx': 'javascript',
+    '.ts': 'typescript',
+    '.tsx': 'typescript',
+    '.java': 'java',
+    '.cpp': 'cpp',
+    '.c': 'c',
+    '.cs': 'csharp',
+    '.php': 'php',
+    '.rb': 'ruby',
+    '.go': 'go',
+    '.rs': 'rust',
+    '.kt': 'kotlin',
+    '.scala': 'scala',
+    '.swift': 'swift',
+    '.dart': 'dart',
+    '.sql': 'sql',
+    '.html': 'html',
+    '.css': 'css',
+    '.scss': 'scss',
+    '.sass': 'sass',
+    '.less': 'less',
+    '.json': 'json',
+    '.yaml': 'yaml',
+    '.yml': 'yaml',
+    '.xml': 'xml',
+    '.md': 'markdown',
+    '.sh': 'bash',
+    '.bat': 'batch',
+    '.ps1': 'powershell'
+}
+
+FRAMEWORK_PATTERNS = {
+    'python': {
+        'django': ('from django', 'import django', 'Django'),
+        'flask': ('from flask', 'import flask', 'Flask'),
+        'fastapi': ('from fastapi', 'import fastapi', 'FastAPI'),
+        'pytest': ('import pytest', 'def test_'),
+        'unittest': ('import unittest', 'class Test')
+    },
+    'javascript': {
+        'react': ('import React', 'from "react"', 'React.', 'jsx'),
+        'vue': ('import Vue', 'from "vue"', 'Vue.'),
+        'angular': ('import { Component }', '@Component', 'angular'),
+        'express': ('const express', 'require("express")', 'app.get'),
+        'jest': ('describe(', 'it(', 'test(', 'expect(')
+    },
+    'typescript': {
+        'react': ('import React', 'from "react"', 'React.', 'tsx'),
+        'angular': ('import { Component }', '@Component', 'angular'),
+        'nest': ('@Injectable', '@Controller', 'nest')
+    }
+}
+
+COMPLEXITY_KEYWORDS = {
+    'python': ('if', 'elif', 'for', 'while', 'except', 'and', 'or'),
+    'javascript': ('if', 'for', 'while', 'switch', 'catch', '&&', '||'),
+    'typescript': ('if', 'for', 'while', 'switch', 'catch', '&&', '||')
+}
+
+
 @dataclass
 class FileInfo:
     """
@@ -123,50 +195,22 @@ class FileInfo:
     @staticmethod
     def _detect_language(extension: str, content: str) -> Optional[str]:
         """Detect programming language from file extension and content."""
-        language_map = {
-            '.py': 'python',
-            '.js': 'javascript',
-            '.jsx': 'javascript',
-            '.ts': 'typescript',
-            '.tsx': 'typescript',
-            '.java': 'java',
-            '.cpp': 'cpp',
-            '.c': 'c',
-            '.cs': 'csharp',
-            '.php': 'php',
-            '.rb': 'ruby',
-            '.go': 'go',
-            '.rs': 'rust',
-            '.kt': 'kotlin',
-            '.scala': 'scala',
-            '.swift': 'swift',
-            '.dart': 'dart',
-            '.sql': 'sql',
-            '.html': 'html',
-            '.css': 'css',
-            '.scss': 'scss',
-            '.sass': 'sass',
-            '.less': 'less',
-            '.json': 'json',
-            '.yaml': 'yaml',
-            '.yml': 'yaml',
-            '.xml': 'xml',
-            '.md': 'markdown',
-            '.sh': 'bash',
-            '.bat': 'batch',
-            '.ps1': 'powershell'
-        }
-        
         # First try extension-based detection
-        if extension in language_map:
-            return language_map[extension]
-        
-        # Content-based detection for files without extension
-        if 'import ' in content or 'def ' in content or 'class ' in content:
-            return 'python'
-        elif 'function ' in content or 'const ' in content or 'let ' in content:
+        language = EXTENSION_LANGUAGES.get(extension)
+        if language:
+            return language
+        
+        # Content-based detection for files without extension; Python
+        # keywords take precedence wherever they appear, then JavaScript
+        found = set()
+        for match in CONTENT_LANGUAGE_RE.finditer(content):
+            if match.lastgroup == 'python':
+                return 'python'
+            found.add(match.lastgroup)
+        
+        if 'javascript' in found:
             return 'javascript'
-        elif 'public class' in content or 'import java' in content:
+        elif 'java' in found:
             return 'java'
         
         return None
@@ -177,30 +221,8 @@ class FileInfo:
         if not language:
             return None
         
-        framework_patterns = {
-            'python': {
-                'django': ['from django', 'import django', 'Django'],
-                'flask': ['from flask', 'import flask', 'Flask'],
-                'fastapi': ['from fastapi', 'import fastapi', 'FastAPI'],
-                'pytest': ['import pytest', 'def test_'],
-                'unittest': ['import unittest', 'class Test']
-            },
-            'javascript': {
-                'react': ['import React', 'from "react"', 'React.', 'jsx'],
-                'vue': ['import Vue', 'from "vue"', 'Vue.'],
-                'angular': ['import { Component }', '@Component', 'angular'],
-                'express': ['const express', 'require("express")', 'app.get'],
-                'jest': ['describe(', 'it(', 'test(', 'expect(']
-            },
-            'typescript': {
-                'react': ['import React', 'from "react"', 'React.', 'tsx'],
-                'angular': ['import { Component }', '@Component', 'angular'],
-                'nest': ['@Injectable', '@Controller', 'nest']
-            }
-        }
-        
-        if language in framework_patterns:
-            for framework, patterns in framework_patterns[language].items():
+        if language in FRAMEWORK_PATTERNS:
+            for framework, patterns in FRAMEWORK_PATTERNS[language].items():
                 if any(pattern in content for pattern in patterns):
                     return framework
         
@@ -212,13 +234,7 @@ class FileInfo:
         if not content or not language:
             return 0.0
         
-        complexity_keywords = {
-            'python': ['if', 'elif', 'for', 'while', 'except', 'and', 'or'],
-            'javascript': ['if', 'for', 'while', 'switch', 'catch', '&&', '||'],
-            'typescript': ['if', 'for', 'while', 'switch', 'catch', '&&', '||']
-        }
-        
-        keywords = complexity_keywords.get(language, [])
+        keywords = COMPLEXITY_KEYWORDS.get(language, ())
         if not keywords:
             return 0.0
         
@@ -5,20 +5,433 @@ This module provides a direct interface to AI models and agents for code analysi
 Integrates with the specialized agent system while eliminating unnecessary abstraction layers.
 """
 
+import ast
 import asyncio
 import logging
-from typing import Dict, List, Any, Optional
+import re
+import sys
+import time
+import weakref
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+import json
+from typing import Dict, List, Any, Optional, Tuple, Callable, Union
 from datetime import datetime
 
-from ..integrations.vertex_ai_client import VertexAIClient
-from ..agents.agent_manager import AgentManager
+try:
+    import aiofiles
+    AIOFILES_AVAILABLE = True
+except ImportError:
+    AIOFILES_AVAILABLE = False
+
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+try:
+    import xxhash
+    XXHASH_AVAILABLE = True
+except ImportError:
+    XXHASH_AVAILABLE = False
+
+try:
+    import msgspec
+    MSGSPEC_AVAILABLE = True
+except ImportError:
+    MSGSPEC_AVAILABLE = False
+
+try:
+    import ahocorasick
+    AHOCORASICK_AVAILABLE = True
+except ImportError:
+    AHOCORASICK_AVAILABLE = False
+
+from ..integrations.vertex_ai_client import VertexAIClient, estimate_tokens
 from ..agents.specialized.code.react_code_agent import ReactCodeAgent
 from ..agents.specialized.code.python_code_agent import PythonCodeAgent
 from ..agents.specialized.code.node_code_agent import NodeCodeAgent
 from ..core.config import SDKConfig
 from ..core.prompt_loader import PromptLoader
+from ..core.utils import (
+    calculate_file_hash, get_file_language, normalize_code, LRUCache,
+    extract_python_definitions, analyze_source_file, walk_source_files,
+    parse_python_source, NearDuplicateIndex
+)
 from ..core.exceptions import AnalysisError, ConfigurationError
-from ..models.analysis_model import AnalysisResult, TestGenerationResult, OptimizationResult
+from ..models.analysis_model import (
+    AnalysisResult, TestGenerationResult, OptimizationResult, IssueSeverity, IssueType
+)
+
+# Single-scan JSON extraction from model responses
+JSON_DECODER = json.JSONDecoder()
+JSON_START_RE = re.compile(r'[{\[]')
+
+# Values accepted from the model without going through Enum lookup failures.
+# Accepted values are interned so every finding shares one string per value
+# instead of holding its own copy decoded from the response.
+VALID_ISSUE_SEVERITIES = frozenset(severity.value for severity in IssueSeverity)
+VALID_ISSUE_TYPES = frozenset(sys.intern(issue_type.value) for issue_type in IssueType)
+SUGGESTION_LEVELS = frozenset(map(sys.intern, ('low', 'medium', 'high')))
+
+# Keywords used to classify findings whose category is missing or not an
+# IssueType, in priority order. One alternation scans the text once for all of
+# them; the matching group's name is the category.
+ISSUE_CATEGORY_KEYWORDS = {
+    'security': ('security', 'injection', 'vulnerab', 'attack', 'xss', 'csrf', 'secret', 'password'),
+    'performance': ('performance', 'slow', 'efficien', 'optimiz', 'latency', 'memory'),
+    'logic_error': ('bug', 'error', 'exception', 'crash', 'incorrect'),
+}
+ISSUE_CATEGORY_RE = re.compile('|'.join(
+    f"(?P<{category}>\\b(?:{'|'.join(keywords)}))"
+    for category, keywords in ISSUE_CATEGORY_KEYWORDS.items()
+))
+
+# With pyahocorasick installed the same table is compiled into one automaton,
+# so scanning cost no longer grows with the number of keywords.
+if AHOCORASICK_AVAILABLE:
+    ISSUE_CATEGORY_AUTOMATON = ahocorasick.Automaton()
+    for _category, _keywords in ISSUE_CATEGORY_KEYWORDS.items():
+        for _keyword in _keywords:
+            ISSUE_CATEGORY_AUTOMATON.add_word(_keyword, (_category, len(_keyword)))
+    ISSUE_CATEGORY_AUTOMATON.make_automaton()
+else:
+    ISSUE_CATEGORY_AUTOMATON = None
+
+# Shape of one finding line in an analysis response. Unknown keys are allowed;
+# fields present with the wrong type reject the finding.
+FINDING_FIELD_TYPES = {
+    'kind': (str,),
+    'title': (str,),
+    'description': (str,),
+    'category': (str,),
+    'severity': (str,),
+    'suggestion': (str,),
+    'fix_code': (str,),
+    'suggested_code': (str,),
+    'impact': (str,),
+    'effort': (str,),
+    'line_number': (int, str),
+}
+
+
+def _compile_finding_validator(field_types: Dict[str, Tuple[type, ...]]) -> Callable[[Any], bool]:
+    """
+    Generate a type check for findings with one unrolled test per field.
+
+    The schema is fixed, so the per-field loop, the table lookups and the
+    bool-is-not-int special case are all resolved here rather than per finding.
+
+    Args:
+        field_types: Allowed types for each optional field
+
+    Returns:
+        Function returning True if a value is a dict whose listed fields are
+        absent, None or of an allowed type
+    """
+    namespace = {}
+    lines = [
+        'def validate_finding(finding):',
+        '    if not isinstance(finding, dict):',
+        '        return False',
+    ]
+    for index, (field, types) in enumerate(field_types.items()):
+        namespace[f'types_{index}'] = types
+        # bool is a subclass of int but never a usable line number
+        bool_check = 'value.__class__ is bool or ' if int in types else ''
+        lines += [
+            f'    value = finding.get({field!r})',
+            f'    if value is not None and ({bool_check}not isinstance(value, types_{index})):',
+            '        return False',
+        ]
+    lines.append('    return True')
+    exec('\n'.join(lines), namespace)
+    return namespace['validate_finding']
+
+
+_validate_finding_fields = _compile_finding_validator(FINDING_FIELD_TYPES)
+
+if MSGSPEC_AVAILABLE:
+    class AnalysisFinding(msgspec.Struct):
+        kind: Optional[str] = None
+        title: Optional[str] = None
+        description: Optional[str] = None
+        category: Optional[str] = None
+        severity: Optional[str] = None
+        suggestion: Optional[str] = None
+        fix_code: Optional[str] = None
+        suggested_code: Optional[str] = None
+        impact: Optional[str] = None
+        effort: Optional[str] = None
+        line_number: Union[int, str, None] = None
+
+
+def filter_valid_findings(findings: List[Any]) -> List[Dict[str, Any]]:
+    """
+    Keep the findings that match the analysis response schema.
+
+    With msgspec the whole list is validated in one call; only when that
+    fails are the findings checked one at a time to drop the bad ones.
+
+    Args:
+        findings: Objects decoded from a response
+
+    Returns:
+        Findings that are mappings whose known fields have usable types, in order
+    """
+    if MSGSPEC_AVAILABLE:
+        try:
+            msgspec.convert(findings, List[AnalysisFinding])
+            return list(findings)
+        except msgspec.ValidationError:
+            pass
+        valid = []
+        for finding in findings:
+            try:
+                msgspec.convert(finding, AnalysisFinding)
+            except msgspec.ValidationError:
+                continue
+            valid.append(finding)
+        return valid
+
+    return [finding for finding in findings if _validate_finding_fields(finding)]
+
+
+def is_valid_finding(finding: Any) -> bool:
+    """
+    Check a decoded finding against the analysis response schema.
+
+    Args:
+        finding: Object decoded from one response line
+
+    Returns:
+        True if the finding is a mapping whose known fields have usable types
+    """
+    return bool(filter_valid_findings([finding]))
+
+
+def infer_issue_category(text: str) -> Optional[str]:
+    """
+    Infer an IssueType value from free-form finding text.
+
+    Args:
+        text: Lowercased finding title and description
+
+    Returns:
+        Category of the first keyword found at a word start, or None
+    """
+    if ISSUE_CATEGORY_AUTOMATON is None:
+        match = ISSUE_CATEGORY_RE.search(text)
+        return match.lastgroup if match else None
+
+    for end, (category, length) in ISSUE_CATEGORY_AUTOMATON.iter(text):
+        start = end - length + 1
+        if start == 0 or not (text[start - 1].isalnum() or text[start - 1] == '_'):
+            return category
+    return None
+
+
+def _resolve_future(future: asyncio.Future, result: Any = None, exception: Optional[BaseException] = None):
+    """
+    Resolve a future on the event loop it belongs to.
+    
+    Futures are not thread-safe; setting one from another thread can leave its
+    waiter asleep, so the result is handed to the owning loop.
+    
+    Args:
+        future: Future to resolve; ignored if already done or cancelled
+        result: Result to set when no exception is given
+        exception: Exception to set instead of a result
+    """
+    def resolve():
+        if future.done():
+            return
+        if exception is not None:
+            future.set_exception(exception)
+        else:
+            future.set_result(result)
+    
+    try:
+        future.get_loop().call_soon_threadsafe(resolve)
+    except RuntimeError:
+        # The waiter's loop has already closed
+        pass
+
+
+def is_truncated_response(response: Dict[str, Any]) -> bool:
+    """
+    Check whether an analysis response was cut off at the output token limit.
+    
+    Such responses succeed with the findings generated so far, so they are
+    never cached: a cache hit would replay the missing findings as well.
+    
+    Args:
+        response: Analysis response from the Vertex AI client
+        
+    Returns:
+        True if the response is partial or stopped at MAX_TOKENS
+    """
+    metadata = response.get('metadata', {})
+    return bool(metadata.get('partial_response')) or metadata.get('finish_reason') == 'MAX_TOKENS'
+
+# Patterns applied to every batched test response and existing test file
+EXISTING_TEST_RE = re.compile(r'^\s*(?:async\s+)?def test_(\w+)', re.MULTILINE)
+# One match per generated test block: the name, then the code after an optional
+# opening ``` fence, up to its END marker, the next BEGIN marker or the end of
+# text. Every terminator is a fixed-width test, so the lazy scan stays linear.
+BATCH_TEST_BLOCK_RE = re.compile(
+    r'=====BEGIN ([\w.]+)=====\s*(?:```(?:python)?[ \t]*\n)?'
+    r'(.*?)(?:=====END \1=====|(?======BEGIN [\w.]+=====)|\Z)',
+    re.DOTALL
+)
+
+# Instructions shared by every batched test generation request. Sent as a
+# static prefix so Gemini context caching can reuse it across requests.
+BATCH_TEST_INSTRUCTIONS = """You generate pytest tests for Python functions.
+
+For every function you are given, write tests covering normal behaviour, edge cases and error handling,
+mocking external dependencies. Do not repeat import statements.
+
+Return each function's tests in its own block, exactly in this format:
+=====BEGIN <function name>=====
+<test code>
+=====END <function name>=====
+"""
+
+# Prompt templates for direct AI operations. Kept at module level so each call
+# only fills in its slots instead of rebuilding the whole prompt text. Analysis
+# prompts are split around the code: only the short header is formatted and
+# the code is joined in between, without passing through str.format.
+ANALYSIS_FINDINGS_FORMAT = """
+Please provide:
+1. Code quality issues with severity levels
+2. Security vulnerabilities if any
+3. Performance optimization opportunities
+4. Best practice recommendations
+5. Specific line-by-line suggestions
+
+Report every finding as one JSON object per line, with no surrounding array or prose:
+{"kind": "issue", "title": "...", "description": "...", "severity": "critical|high|medium|low|info", "category": "security|performance|maintainability|style|logic_error|best_practice", "line_number": 1, "suggestion": "...", "fix_code": "..."}
+{"kind": "suggestion", "title": "...", "description": "...", "impact": "low|medium|high", "effort": "low|medium|high", "line_number": 1, "suggested_code": "..."}
+"""
+
+ANALYSIS_PROMPT_HEADER = """
+Analyze the following {file_ext} code for {analysis_type} issues:
+
+File: {file_path}
+Code:
+```{file_ext}
+"""
+
+ANALYSIS_PROMPT_FOOTER = """
+```
+""" + ANALYSIS_FINDINGS_FORMAT
+
+# Instructions shared by every part of a large-file analysis. Sent as a static
+# prefix so they are cached server-side and each part carries only its code.
+CHUNK_ANALYSIS_INSTRUCTIONS = """You review one part of a larger source file at a time.
+Report code quality, security, performance and best practice problems found in that part only.
+Line numbers start at 1 on the first line of the part.
+A part may open with lines repeated from the end of the previous part, as context.
+
+Output one JSON object per finding, one per line, with no surrounding array or prose:
+{"kind": "issue", "title": "...", "description": "...", "severity": "critical|high|medium|low|info", "category": "security|performance|maintainability|style|logic_error|best_practice", "line_number": 1, "suggestion": "...", "fix_code": "..."}
+{"kind": "suggestion", "title": "...", "description": "...", "impact": "low|medium|high", "effort": "low|medium|high", "line_number": 1, "suggested_code": "..."}
+"""
+
+CHUNK_ANALYSIS_PROMPT_HEADER = """{analysis_type} analysis of {file_path}, part {index}/{total}:
+```{file_ext}
+"""
+
+CHUNK_ANALYSIS_PROMPT_FOOTER = """
+```
+"""
+
+# Small files analyzed around the same time are coalesced into one request;
+# findings are tagged with the file's number so they can be split back up.
+BATCH_ANALYSIS_INSTRUCTIONS = """You review several source files in one request.
+Report code quality, security, performance and best practice problems in each file.
+Line numbers are relative to each file, starting at 1.
+
+Output one JSON object per finding, one per line, with no surrounding array or prose.
+Set "file" to the number of the file the finding belongs to:
+{"file": 1, "kind": "issue", "title": "...", "description": "...", "severity": "critical|high|medium|low|info", "category": "security|performance|maintainability|style|logic_error|best_practice", "line_number": 1, "suggestion": "...", "fix_code": "..."}
+{"file": 1, "kind": "suggestion", "title": "...", "description": "...", "impact": "low|medium|high", "effort": "low|medium|high", "line_number": 1, "suggested_code": "..."}
+"""
+
+BATCH_ANALYSIS_FILE_TEMPLATE = """### FILE {index}: {file_path} ({analysis_type} analysis)
+```{file_ext}
+{content}
+```"""
+
+TEST_PROMPT_TEMPLATE = """
+Generate {test_type} tests for the following {file_ext} code:
+
+File: {file_path}
+Code:
+```{file_ext}
+{content}
+```
+
+Please generate:
+1. Comprehensive test cases covering all functions/methods
+2. Edge case tests
+3. Error handling tests
+4. Mock data and setup code if needed
+5. Test assertions and expected outcomes
+
+Provide the complete test code that can be run immediately.
+"""
+
+BATCH_TEST_PROMPT_TEMPLATE = """
+Generate {test_type} tests for each of the following Python functions from {file_path}.
+
+Module imports: {imports}
+
+{sections}
+"""
+
+BATCH_TEST_FUNCTION_TEMPLATE = """### FUNCTION {qualified_name}
+```python
+{source}
+```"""
+
+OPTIMIZATION_PROMPT_TEMPLATE = """
+Optimize the following {file_ext} code for {optimization_type}:
+
+File: {file_path}
+Code:
+```{file_ext}
+{content}
+```
+
+Please provide:
+1. Optimized version of the code
+2. Explanation of changes made
+3. Performance improvements expected
+4. Any trade-offs or considerations
+5. Best practices applied
+
+Provide the complete optimized code that can be used as a direct replacement.
+"""
+
+CHAT_CONTEXT_TEMPLATE = """
+Context - File: {file_path}
+```{file_ext}
+{content}
+```
+"""
+
+CHAT_PROMPT_TEMPLATE = """
+You are an expert code assistant. Help the user with their question.
+
+{context_part}
+
+User Question: {message}
+
+Please provide a helpful, accurate response focused on code and development topics.
+"""
 
 
 class StreamlinedAIService:
@@ -44,6 +457,9 @@ class StreamlinedAIService:
                 project_id=config.get('project_id'),
                 location=config.get('region', 'us-central1'),
                 model_name=None,  # Will read from GEMINI_MODEL env var
+                cache_enabled=config.get('cache_enabled', True),
+                cache_ttl=config.get('cache_ttl', 3600),
+                max_retries=config.get('api_retries', 3)
             )
             self.logger.info(f"AI service initialized with model: {self.vertex_client.model_name}")
         except Exception as e:
@@ -58,6 +474,45 @@ class StreamlinedAIService:
                 inner_exception=e
             )
         
+        # Direct analysis results keyed by normalized code, so CI runs where a file
+        # only changed within lines (trailing comments, spacing) reuse the previous
+        # analysis. Line structure is part of the key, since findings carry line
+        # numbers. Both result caches keep the cache_max_entries most recently used.
+        self.cache_max_entries = config.get('cache_max_entries', 4096)
+        self.analysis_cache = LRUCache(self.cache_max_entries)
+        self.cache_ttl = config.get('cache_ttl', 3600)
+        
+        # Files with more estimated tokens than this are analyzed in parts, up to
+        # analysis_parallel_chunks requests in flight per file. A part-wise analysis
+        # returns what it has once the deadline (seconds) or the findings budget
+        # is reached; both are unlimited unless configured.
+        self.analysis_chunk_tokens = config.get('analysis_chunk_tokens', 15000)
+        self.analysis_parallel_chunks = max(1, config.get('analysis_max_parallel_chunks', config.get('max_workers', 4)))
+        # Each part after the first also carries this many tokens of the preceding
+        # code, so problems spanning a part boundary are still visible
+        self.analysis_chunk_overlap = config.get('analysis_chunk_overlap_tokens', 256)
+        self.analysis_deadline = config.get('analysis_deadline_seconds')
+        self.analysis_max_findings = config.get('analysis_max_findings')
+        # An analysis cut off by the output cap is retried once with this many
+        # output tokens; the input already fit, so splitting it would not help
+        self.analysis_retry_output_tokens = config.get('analysis_retry_output_tokens', 32768)
+        # Reworded repeats of a suggestion (e.g. from overlapping parts) are
+        # dropped; with this off only exact repeats are
+        self.fuzzy_suggestion_dedup = config.get('fuzzy_suggestion_dedup', True)
+        
+        # Files up to analysis_batch_chars arriving within the batch window are
+        # analyzed together in one request of up to analysis_batch_size files.
+        # Batches are kept per event loop, so callers on different loops never
+        # share a batch.
+        self.analysis_batch_size = config.get('analysis_batch_size', 8)
+        self.analysis_batch_chars = config.get('analysis_batch_chars', 8000)
+        self.analysis_batch_window = config.get('analysis_batch_window_ms', 50) / 1000
+        self._analysis_batches: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[str, Any]]" = weakref.WeakKeyDictionary()
+        
+        # Generated tests per function keyed by its AST, so functions that were
+        # only reformatted between commits are not sent to the model again
+        self.test_cache = LRUCache(self.cache_max_entries)
+        
         # Initialize specialized agents for chat and analysis
         self.agents = {}
         try:
@@ -71,17 +526,20 @@ class StreamlinedAIService:
             self.agents['react'] = ReactCodeAgent(
                 config=agent_config,
                 logger=self.logger.getChild('react_agent'),
-                prompt_loader=self.prompt_loader
+                prompt_loader=self.prompt_loader,
+                vertex_client=self.vertex_client
             )
             self.agents['python'] = PythonCodeAgent(
                 config=agent_config,
                 logger=self.logger.getChild('python_agent'),
-                prompt_loader=self.prompt_loader
+                prompt_loader=self.prompt_loader,
+                vertex_client=self.vertex_client
             )
             self.agents['node'] = NodeCodeAgent(
                 config=agent_config,
                 logger=self.logger.getChild('node_agent'),
-                prompt_loader=self.prompt_loader
+                prompt_loader=self.prompt_loader,
+                vertex_client=self.vertex_client
             )
             self.logger.info(f"✅ AGENTS INITIALIZED: Successfully initialized {len(self.agents)} specialized agents with PromptLoader")
         except Exception as e:
@@ -280,6 +738,107 @@ class StreamlinedAIService:
             self.logger.error(f"Test generation failed for {file_path}: {e}")
             raise AnalysisError(f"Failed to generate tests for {file_path}: {str(e)}")
     
+    async def batch_generate_tests(
+        self,
+        source_dir: str,
+        output_dir: Optional[str] = None,
+        patterns: Optional[List[str]] = None,
+        exclude_patterns: Optional[List[str]] = None,
+        test_type: str = "unit",
+        max_concurrent: Optional[int] = None
+    ) -> List[TestGenerationResult]:
+        """
+        Generate tests for every matching source file in a directory concurrently.
+        
+        Files are read and parsed in a process pool first, since AST extraction
+        is CPU-bound, and the model requests then run concurrently on the
+        precomputed functions.
+        
+        Args:
+            source_dir: Root directory to scan
+            output_dir: Directory to write test_<name>.py files to, mirroring each
+                file's directory under source_dir (not written if None)
+            patterns: Glob patterns of files to include (default: *.py)
+            exclude_patterns: Glob patterns of files to skip (default: existing test files)
+            test_type: Type of tests to generate
+            max_concurrent: Maximum files processed at once (default: max_workers)
+            
+        Returns:
+            List of TestGenerationResult objects, one per file
+        """
+        source_path = Path(source_dir)
+        patterns = patterns or ['*.py']
+        exclude_patterns = exclude_patterns or ['test_*.py', '*_test.py', 'conftest.py']
+        blocked_dirs = set(self.config.get('blocked_patterns', ['__pycache__', 'node_modules', '.git']))
+        
+        # Blocked directories are pruned without listing their contents
+        file_paths = [
+            Path(file_path)
+            for file_path in walk_source_files(str(source_path), patterns, exclude_patterns, blocked_dirs)
+        ]
+        
+        self.logger.info(f"🧪 BATCH TESTS: Generating tests for {len(file_paths)} files in {source_dir}")
+        
+        loop = asyncio.get_running_loop()
+        with ProcessPoolExecutor() as executor:
+            analyses = await asyncio.gather(
+                *[loop.run_in_executor(executor, analyze_source_file, str(file_path)) for file_path in file_paths],
+                return_exceptions=True
+            )
+        
+        max_concurrent = max_concurrent or self.config.get('max_workers', 4)
+        semaphore = asyncio.Semaphore(max_concurrent)
+        
+        async def generate_single_file(file_path: Path, analysis: Dict[str, Any]) -> TestGenerationResult:
+            if isinstance(analysis, Exception):
+                raise analysis
+            
+            async with semaphore:
+                relative_path = file_path.relative_to(source_path)
+                # Mirror the source layout so same-named files in different
+                # directories never write to the same test file
+                output_path = (
+                    Path(output_dir) / relative_path.parent / f"test_{file_path.stem}.py" if output_dir else None
+                )
+                relative_path = relative_path.as_posix()
+                
+                if analysis['functions']:
+                    # Streams tests into output_path batch by batch
+                    return await self.generate_tests_for_functions_batch(
+                        relative_path, analysis['functions'], analysis['imports'], test_type,
+                        output_path=str(output_path) if output_path else None
+                    )
+                
+                result = await self.generate_tests(relative_path, analysis['content'], test_type)
+                if output_path and result.test_code:
+                    output_path.parent.mkdir(parents=True, exist_ok=True)
+                    if AIOFILES_AVAILABLE:
+                        async with aiofiles.open(output_path, 'wb') as f:
+                            await f.write(result.test_code.encode('utf-8'))
+                    else:
+                        output_path.write_bytes(result.test_code.encode('utf-8'))
+                    result.test_file_path = str(output_path)
+                
+                return result
+        
+        tasks = [generate_single_file(file_path, analysis) for file_path, analysis in zip(file_paths, analyses)]
+        results = await asyncio.gather(*tasks, return_exceptions=True)
+        
+        processed_results = []
+        for file_path, result in zip(file_paths, results):
+            if isinstance(result, Exception):
+                self.logger.error(f"❌ BATCH TESTS: Failed for {file_path}: {result}")
+                processed_results.append(TestGenerationResult(
+                    file_path=str(file_path),
+                    test_type=test_type,
+                    success=False,
+                    error_message=str(result)
+                ))
+            else:
+                processed_results.append(result)
+        
+        return processed_results
+    
     async def optimize_code(
         self, 
         file_path: str, 
@@ -322,16 +881,490 @@ class StreamlinedAIService:
         self.logger.info(f"🤖 DIRECT AI: Starting direct AI analysis (no specialized agent available)")
         self.logger.info(f"🔧 DIRECT AI: Using Vertex AI model: {self.vertex_client.model_name}")
         
-        prompt = self._create_analysis_prompt(file_path, content, analysis_type)
+        language = get_file_language(file_path)
+        cache_key = calculate_file_hash(f"{analysis_type}:{language}:{normalize_code(content, language, keep_lines=True)}")
+        cached = self.analysis_cache.get(cache_key)
+        if cached and time.time() - cached['timestamp'] < self.cache_ttl:
+            self.logger.info(f"⚡ DIRECT AI: Reusing analysis of equivalent code (in-line comment/whitespace changes only)")
+            return self._parse_analysis_response(cached['response'], file_path)
         
-        response = await self.vertex_client.analyze_with_enhanced_prompt(
-            enhanced_prompt=prompt,
-            context={"file_path": file_path, "analysis_type": analysis_type}
-        )
+        # Tokens never outnumber characters, so short files skip the tokenizer
+        if len(content) > self.analysis_chunk_tokens and estimate_tokens(content) > self.analysis_chunk_tokens:
+            response = await self._analyze_large_input(file_path, content, analysis_type)
+        elif self.analysis_batch_size > 1 and len(content) <= self.analysis_batch_chars:
+            response = await self._batched_analysis(file_path, content, analysis_type)
+        else:
+            prompt = self._create_analysis_prompt(file_path, content, analysis_type)
+            response = await self._stream_analysis(
+                prompt, {"file_path": file_path, "analysis_type": analysis_type}
+            )
+        
+        # Truncated results and results with failed, skipped or truncated
+        # parts are incomplete and not worth reusing
+        metadata = response.get('metadata', {})
+        if (response.get('success') and not is_truncated_response(response)
+                and not metadata.get('failed_chunks') and not metadata.get('skipped_chunks')
+                and not metadata.get('truncated_chunks')):
+            self.analysis_cache[cache_key] = {
+                'response': response,
+                'timestamp': time.time()
+            }
         
         self.logger.info(f"✅ DIRECT AI: Direct AI analysis completed")
         return self._parse_analysis_response(response, file_path)
     
+    async def _stream_analysis(
+        self,
+        prompt: str,
+        context: Dict[str, Any],
+        static_prefix: Optional[str] = None,
+        prompt_tokens: Optional[int] = None
+    ) -> Dict[str, Any]:
+        """
+        Run an analysis prompt, parsing findings while the response is still streaming in.
+        
+        Findings are schema-checked as they are extracted, so validation
+        overlaps with generation instead of following it, and callers that
+        route findings by field (batched analysis) only see valid ones.
+        
+        A response that stops at MAX_TOKENS has lost every finding after the
+        cut. It is requested once more with analysis_retry_output_tokens as
+        the output cap, and the retry replaces it when it succeeds.
+        
+        Args:
+            prompt: Analysis prompt
+            context: Analysis context passed to the client
+            static_prefix: Invariant instructions to send through context caching
+                instead of wrapping the prompt in the full analysis instructions
+            prompt_tokens: Token estimate of prompt if already known (static
+                prefix requests only)
+            
+        Returns:
+            Client response with the parsed, validated findings added and
+            findings_validated set
+        """
+        async def request(max_output_tokens: Optional[int] = None) -> Dict[str, Any]:
+            findings = []
+            pending_text = ''
+            
+            def on_text(text: str):
+                nonlocal pending_text
+                pending_text += text
+                # Until a line or an object completes, rescanning the unfinished
+                # tail cannot produce anything new
+                if '\n' not in text and '}' not in text:
+                    return
+                objects, consumed = self._extract_json_objects(pending_text)
+                findings.extend(filter_valid_findings(objects))
+                pending_text = pending_text[consumed:]
+            
+            if static_prefix:
+                response = await self.vertex_client.generate_with_static_prefix(
+                    static_prefix, prompt, f"{context['analysis_type']} analysis",
+                    on_text=on_text, prompt_tokens=prompt_tokens, max_output_tokens=max_output_tokens
+                )
+            else:
+                response = await self.vertex_client.analyze_with_enhanced_prompt(
+                    enhanced_prompt=prompt,
+                    context=context,
+                    on_text=on_text,
+                    max_output_tokens=max_output_tokens
+                )
+            
+            # The last line has no trailing newline
+            findings.extend(filter_valid_findings(self._extract_json_objects(pending_text + '\n')[0]))
+            response['findings'] = findings
+            response['findings_validated'] = True
+            return response
+        
+        response = await request()
+        if response.get('metadata', {}).get('finish_reason') == 'MAX_TOKENS' and self.analysis_retry_output_tokens:
+            self.logger.warning(
+                f"⚠️ DIRECT AI: {context['analysis_type']} analysis hit the output limit after "
+                f"{len(response['findings'])} findings, retrying with {self.analysis_retry_output_tokens} output tokens"
+            )
+            retry = await request(self.analysis_retry_output_tokens)
+            if retry.get('success'):
+                response = retry
+        return response
+    
+    async def _batched_analysis(self, file_path: str, content: str, analysis_type: str) -> Dict[str, Any]:
+        """
+        Queue a small file for a coalesced analysis request and wait for its share.
+        
+        A file that arrives while no other analysis is pending or in flight is
+        sent at once. Files arriving during a burst start a short batch window;
+        the batch is sent when the window closes or analysis_batch_size files
+        are waiting, whichever comes first. Each request carries fixed overhead
+        (instructions, round trip, rate limit slot), so CI runs over many small
+        files send far fewer.
+        
+        Args:
+            file_path: Path of the file
+            content: File content
+            analysis_type: Type of analysis
+            
+        Returns:
+            Response for this file alone, with success, text, findings and metadata
+        """
+        loop = asyncio.get_running_loop()
+        state = self._analysis_batches.get(loop)
+        if state is None:
+            state = self._analysis_batches[loop] = {'files': [], 'timer': None, 'tasks': set()}
+        
+        future = loop.create_future()
+        state['files'].append((file_path, content, analysis_type, future))
+        
+        if len(state['files']) >= self.analysis_batch_size or (len(state['files']) == 1 and not state['tasks']):
+            self._flush_analysis_batch(state)
+        elif state['timer'] is None:
+            state['timer'] = loop.call_later(self.analysis_batch_window, self._flush_analysis_batch, state)
+        
+        return await future
+    
+    def _flush_analysis_batch(self, state: Dict[str, Any]):
+        """Send the small files waiting in one loop's batch as one analysis request."""
+        if state['timer'] is not None:
+            state['timer'].cancel()
+            state['timer'] = None
+        
+        # Files whose callers stopped waiting are not analyzed
+        batch = [entry for entry in state['files'] if not entry[3].cancelled()]
+        state['files'] = []
+        if batch:
+            # Keep a reference so the task is not garbage collected mid-flight
+            task = asyncio.ensure_future(self._run_analysis_batch(batch))
+            state['tasks'].add(task)
+            task.add_done_callback(state['tasks'].discard)
+    
+    async def _run_analysis_batch(self, batch: List[Tuple[str, str, str, asyncio.Future]]):
+        """Analyze a batch of small files in one request and resolve each file's future."""
+        try:
+            if len(batch) == 1:
+                file_path, content, analysis_type, future = batch[0]
+                prompt = self._create_analysis_prompt(file_path, content, analysis_type)
+                response = await self._stream_analysis(
+                    prompt, {"file_path": file_path, "analysis_type": analysis_type}
+                )
+                _resolve_future(future, result=response)
+                return
+            
+            sections = [
+                BATCH_ANALYSIS_FILE_TEMPLATE.format(
+                    index=index,
+                    file_path=file_path,
+                    analysis_type=analysis_type,
+                    file_ext=file_path.split('.')[-1] if '.' in file_path else 'unknown',
+                    content=content
+                )
+                for index, (file_path, content, analysis_type, _) in enumerate(batch, 1)
+            ]
+            self.logger.info(f"📦 DIRECT AI: Analyzing {len(batch)} small files in one request")
+            response = await self._stream_analysis(
+                '\n\n'.join(sections),
+                {"file_path": batch[0][0], "analysis_type": "batch"},
+                static_prefix=BATCH_ANALYSIS_INSTRUCTIONS
+            )
+            
+            findings_by_file = {index: [] for index in range(1, len(batch) + 1)}
+            for finding in response['findings']:
+                # Findings the model did not attribute to a file are dropped
+                if isinstance(finding.get('file'), int) and finding['file'] in findings_by_file:
+                    findings_by_file[finding['file']].append(finding)
+            
+            for index, (_, _, _, future) in enumerate(batch, 1):
+                findings = findings_by_file[index]
+                _resolve_future(future, result={
+                    'success': response.get('success', False),
+                    'text': '\n'.join(json.dumps(finding) for finding in findings),
+                    'error': response.get('error'),
+                    'findings': findings,
+                    'findings_validated': True,
+                    'metadata': {**response.get('metadata', {}), 'batched_files': len(batch)}
+                })
+        except Exception as e:
+            for _, _, _, future in batch:
+                _resolve_future(future, exception=e)
+    
+    async def _analyze_large_input(self, file_path: str, content: str, analysis_type: str) -> Dict[str, Any]:
+        """
+        Analyze a file too large for one request in parts, all requests in flight at once.
+        
+        The parts have no data dependency, so total latency is roughly that of
+        the slowest part instead of the sum. Concurrency is bounded by
+        analysis_max_parallel_chunks (max_workers unless set) and the client's
+        rate limiter; findings are merged in part order with line numbers
+        mapped back to the whole file. Parts still running when
+        analysis_deadline_seconds passes or analysis_max_findings is reached
+        are cancelled and counted as skipped.
+        
+        Each part after the first opens with up to analysis_chunk_overlap
+        tokens of the previous part's last lines as context; findings the model
+        places on those lines are dropped, since the previous part reports them.
+        
+        Each part's result is cached by its normalized code, so when a large
+        file changes only the parts that actually changed are sent again.
+        The analysis instructions go out once as a context-cached prefix
+        (CHUNK_ANALYSIS_INSTRUCTIONS); each request carries only its part.
+        
+        Args:
+            file_path: Path of the file
+            content: File content
+            analysis_type: Type of analysis
+            
+        Returns:
+            Combined response with success, text, findings and metadata
+        """
+        file_ext = file_path.split('.')[-1] if '.' in file_path else 'unknown'
+        language = get_file_language(file_path)
+        chunks = self._split_code_chunks(content, self.analysis_chunk_tokens, language, measure=estimate_tokens)
+        # Part sizes are known from splitting; only the short header is estimated, once
+        header_tokens = estimate_tokens(CHUNK_ANALYSIS_PROMPT_HEADER.format(
+            index=len(chunks), total=len(chunks), file_ext=file_ext,
+            analysis_type=analysis_type, file_path=file_path
+        ) + CHUNK_ANALYSIS_PROMPT_FOOTER)
+        overlaps = [('', 0, 0)] + [
+            self._chunk_overlap(chunk, self.analysis_chunk_overlap) for _, chunk, _ in chunks[:-1]
+        ]
+        cached_chunks = 0
+        semaphore = asyncio.Semaphore(self.analysis_parallel_chunks)
+        
+        self.logger.info(f"🧩 DIRECT AI: Analyzing {file_path} in {len(chunks)} parts")
+        
+        async def analyze_chunk(index: int, start_line: int, chunk: str, chunk_tokens: int) -> Dict[str, Any]:
+            nonlocal cached_chunks
+            context, context_tokens, context_lines = overlaps[index]
+            part = context + chunk
+            part_start = start_line - context_lines
+            cache_key = calculate_file_hash(f"chunk:{analysis_type}:{language}:{normalize_code(part, language, keep_lines=True)}")
+            cached = self.analysis_cache.get(cache_key)
+            
+            if cached and time.time() - cached['timestamp'] < self.cache_ttl:
+                cached_chunks += 1
+                response = cached['response']
+            else:
+                header = CHUNK_ANALYSIS_PROMPT_HEADER.format(
+                    index=index + 1, total=len(chunks), file_ext=file_ext,
+                    analysis_type=analysis_type, file_path=file_path
+                )
+                prompt = ''.join((header, part, CHUNK_ANALYSIS_PROMPT_FOOTER))
+                async with semaphore:
+                    response = await self._stream_analysis(
+                        prompt, {"file_path": file_path, "analysis_type": analysis_type, "chunk": index + 1},
+                        static_prefix=CHUNK_ANALYSIS_INSTRUCTIONS,
+                        prompt_tokens=header_tokens + context_tokens + chunk_tokens
+                    )
+                if response.get('success') and not is_truncated_response(response):
+                    # Findings stay relative to the part, wherever it lands next time
+                    self.analysis_cache[cache_key] = {
+                        'response': response,
+                        'timestamp': time.time()
+                    }
+            
+            findings = []
+            for finding in response['findings']:
+                line_number = finding.get('line_number')
+                if isinstance(line_number, int):
+                    line_number += part_start - 1
+                    if line_number < start_line:
+                        continue  # context line, reported by the previous part
+                    finding = {**finding, 'line_number': line_number}
+                findings.append(finding)
+            return {**response, 'findings': findings}
+        
+        # Parts report to a queue as they finish, so the deadline and findings
+        # budget are checked while the remaining parts are still in flight
+        queue = asyncio.Queue()
+        
+        async def produce(index: int, chunk: Tuple[int, str, int]):
+            try:
+                result = await analyze_chunk(index, *chunk)
+            except Exception as e:
+                result = e
+            queue.put_nowait((index, result))
+        
+        tasks = [asyncio.ensure_future(produce(index, chunk)) for index, chunk in enumerate(chunks)]
+        responses = {}
+        finding_count = 0
+        loop = asyncio.get_running_loop()
+        deadline = self.analysis_deadline and loop.time() + self.analysis_deadline
+        
+        try:
+            while len(responses) < len(chunks):
+                try:
+                    index, response = await asyncio.wait_for(
+                        queue.get(), deadline and deadline - loop.time()
+                    )
+                except asyncio.TimeoutError:
+                    self.logger.warning(
+                        f"⏱️ DIRECT AI: Deadline reached for {file_path}, returning {len(responses)}/{len(chunks)} parts"
+                    )
+                    break
+                responses[index] = response
+                
+                if not isinstance(response, Exception) and response.get('success'):
+                    finding_count += len(response['findings'])
+                    if self.analysis_max_findings and finding_count >= self.analysis_max_findings:
+                        self.logger.info(
+                            f"🛑 DIRECT AI: Findings budget reached for {file_path} after {len(responses)}/{len(chunks)} parts"
+                        )
+                        break
+        finally:
+            for task in tasks:
+                task.cancel()
+        
+        findings = []
+        texts = []
+        failed_chunks = 0
+        skipped_chunks = 0
+        truncated_chunks = 0
+        for index in range(len(chunks)):
+            if index not in responses:
+                skipped_chunks += 1
+                continue
+            response = responses[index]
+            if isinstance(response, Exception) or not response.get('success'):
+                failed_chunks += 1
+                error = response if isinstance(response, Exception) else response.get('error')
+                self.logger.warning(f"⚠️ DIRECT AI: Part {index + 1}/{len(chunks)} of {file_path} failed: {error}")
+                continue
+            truncated_chunks += is_truncated_response(response)
+            findings.extend(response['findings'])
+            texts.append(response.get('text', ''))
+        
+        success = bool(texts)
+        return {
+            'success': success,
+            'text': '\n'.join(texts),
+            'error': None if success else "No part of the analysis succeeded",
+            'findings': findings,
+            # Every part's findings come from _stream_analysis
+            'findings_validated': True,
+            'metadata': {
+                'model_used': self.vertex_client.model_name,
+                'chunks': len(chunks),
+                'cached_chunks': cached_chunks,
+                'failed_chunks': failed_chunks,
+                'skipped_chunks': skipped_chunks,
+                'truncated_chunks': truncated_chunks
+            }
+        }
+    
+    def _chunk_overlap(self, chunk: str, max_tokens: int) -> Tuple[str, int, int]:
+        """
+        Take the last whole lines of a part that fit in a token budget.
+        
+        Args:
+            chunk: Part text, ending in a newline
+            max_tokens: Token budget for the overlap (0 disables it)
+            
+        Returns:
+            Tuple of (text, estimated tokens, line count)
+        """
+        tail = []
+        tokens = 0
+        if max_tokens > 0:
+            for line in reversed(chunk.splitlines(keepends=True)):
+                line_tokens = estimate_tokens(line)
+                if tokens + line_tokens > max_tokens:
+                    break
+                tail.append(line)
+                tokens += line_tokens
+        return ''.join(reversed(tail)), tokens, len(tail)
+    
+    def _split_code_chunks(
+        self,
+        content: str,
+        chunk_size: int,
+        language: Optional[str] = None,
+        measure: Callable[[str], int] = len
+    ) -> List[Tuple[int, str, int]]:
+        """
+        Split code into parts of at most about chunk_size, on line boundaries.
+        
+        Each part ends at the strongest boundary available inside it: before
+        a top-level definition or statement, then before a method of a large
+        class (Python), then after a blank line, and only when there is none
+        of those on a plain line. Like a recursive separator split, a weaker
+        boundary is used only where the stronger ones leave a piece too large,
+        so the model does not see functions and strings cut in half.
+        
+        Args:
+            content: Code to split
+            chunk_size: Maximum part size, in the unit of measure
+            language: Language of the code, if known
+            measure: Size of a piece of text; characters by default, a token
+                estimate to size parts by what the model actually reads
+            
+        Returns:
+            List of (start_line, text, size) tuples, start_line being 1-based
+            and size the part's measured size
+        """
+        lines = content.splitlines(keepends=True)
+        # Measured once per line; a part's size is the sum over its lines
+        line_sizes = [measure(line) for line in lines]
+        boundaries = self._chunk_boundaries(content, lines, language)
+        tiers = max(boundaries.values(), default=0) + 1
+        chunks = []
+        start_line = 1
+        current_size = 0
+        # Latest boundary seen in the current part, per tier (0 is strongest)
+        split_lines = [None] * tiers
+        
+        for line_number, line in enumerate(lines, 1):
+            while line_number > start_line and current_size + line_sizes[line_number - 1] > chunk_size:
+                end_line = next((split for split in split_lines if split), line_number)
+                part_size = sum(line_sizes[start_line - 1:end_line - 1])
+                chunks.append((start_line, ''.join(lines[start_line - 1:end_line - 1]), part_size))
+                current_size -= part_size
+                start_line = end_line
+                split_lines = [split if split and split > end_line else None for split in split_lines]
+            if line_number > start_line and line_number in boundaries:
+                split_lines[boundaries[line_number]] = line_number
+            current_size += line_sizes[line_number - 1]
+        
+        if start_line <= len(lines):
+            chunks.append((start_line, ''.join(lines[start_line - 1:]), current_size))
+        return chunks
+    
+    def _chunk_boundaries(self, content: str, lines: List[str], language: Optional[str]) -> Dict[int, int]:
+        """
+        Find the lines a part of the code may preferably start at.
+        
+        Returns:
+            Mapping of 1-based line number to boundary tier, 0 being the
+            strongest: top-level statements and class members for Python;
+            unindented lines after a blank line, then any line after a blank
+            line, otherwise
+        """
+        blank_after = [
+            line_number for line_number in range(2, len(lines) + 1)
+            if not lines[line_number - 2].strip()
+        ]
+        
+        if language == 'python':
+            tree = parse_python_source(content)
+            if tree is not None:
+                boundaries = dict.fromkeys(blank_after, 2)
+                members = [
+                    child for node in ast.walk(tree) if isinstance(node, ast.ClassDef)
+                    for child in node.body
+                    if isinstance(child, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef))
+                ]
+                for tier, nodes in ((1, members), (0, tree.body)):
+                    for node in nodes:
+                        line_number = min([node.lineno] + [d.lineno for d in getattr(node, 'decorator_list', [])])
+                        # Keep leading comments with the definition they describe
+                        while line_number > 1 and lines[line_number - 2].lstrip().startswith('#'):
+                            line_number -= 1
+                        boundaries[line_number] = tier
+                return boundaries
+        
+        return {
+            line_number: 1 if lines[line_number - 1][:1].isspace() else 0
+            for line_number in blank_after
+        }
+    
     async def _direct_ai_chat(self, message: str, file_path: Optional[str], content: Optional[str], conversation_history: Optional[List[Dict[str, str]]]) -> str:
         """Direct AI chat for general queries."""
         self.logger.info(f"🤖 DIRECT AI CHAT: Starting direct AI chat (no specialized agent available)")
@@ -347,8 +1380,10 @@ class StreamlinedAIService:
                 conversation_history=conversation_history or []
             )
             
-            self.logger.info(f"🔍 VERTEX AI RESPONSE DEBUG: Full response: {response}")
-            self.logger.info(f"🔍 VERTEX AI RESPONSE KEYS: Available keys: {list(response.keys()) if isinstance(response, dict) else 'Not a dict'}")
+            # repr of the full response (metadata included) is only built when it will be emitted
+            if self.logger.isEnabledFor(logging.DEBUG):
+                self.logger.debug(f"🔍 VERTEX AI RESPONSE DEBUG: Full response: {response}")
+                self.logger.debug(f"🔍 VERTEX AI RESPONSE KEYS: Available keys: {list(response.keys()) if isinstance(response, dict) else 'Not a dict'}")
             
             # Check different possible response formats
             if isinstance(response, dict):
@@ -387,6 +1422,13 @@ class StreamlinedAIService:
     
     async def _direct_ai_test_generation(self, file_path: str, content: str, test_type: str) -> TestGenerationResult:
         """Direct AI test generation."""
+        if get_file_language(file_path) == 'python':
+            functions, imports = extract_python_definitions(content)
+            if functions:
+                return await self.generate_tests_for_functions_batch(
+                    file_path, functions, imports, test_type
+                )
+        
         prompt = self._create_test_prompt(file_path, content, test_type)
         
         response = await self.vertex_client.analyze_with_enhanced_prompt(
@@ -396,6 +1438,213 @@ class StreamlinedAIService:
         
         return self._parse_test_response(response, file_path, test_type)
     
+    async def generate_tests_for_functions_batch(
+        self,
+        file_path: str,
+        functions: List[Dict[str, Any]],
+        imports: List[str],
+        test_type: str = "unit",
+        batch_size: int = 5,
+        output_path: Optional[str] = None
+    ) -> TestGenerationResult:
+        """
+        Generate tests for several functions per model request.
+        
+        Functions are marshalled into one prompt per batch with explicit
+        delimiters and the response is split back per function, so a file with
+        N functions costs N / batch_size round-trips instead of N. Keep
+        batch_size small enough that a batch's tests fit in one response.
+        
+        Trivial functions (a single pass/return/raise) are skipped, and so are
+        functions that already have a test_<name> in an existing output file;
+        new tests are appended to that file instead of replacing it.
+        
+        Tests are cached per function by ast_key; cached functions are emitted
+        first and only the remaining ones are sent to the model. All batch
+        requests are started at once (the client's rate limiter bounds how
+        many are in flight) and their results are consumed in order.
+        
+        With output_path, each batch's tests are streamed to the file as soon
+        as they arrive instead of being joined into one string, and test_code
+        is left empty (test_cases still carry the code per function). Writes
+        go through aiofiles when installed so they do not stall the event loop
+        while other files' requests are in flight.
+        
+        Args:
+            file_path: Path of the source file
+            functions: Functions from extract_python_definitions
+            imports: Modules imported by the source file
+            test_type: Type of tests to generate
+            batch_size: Functions per model request
+            output_path: Test file to stream generated tests into
+            
+        Returns:
+            TestGenerationResult with one test case per function
+        """
+        import uuid
+        
+        start_time = time.time()
+        test_cases = []
+        failed_batches = 0
+        batch_tasks = []
+        
+        def test_cache_key(func: Dict[str, Any]) -> Optional[str]:
+            if not func.get('ast_key'):
+                return None
+            return f"test:{func['ast_key']}:{func['qualified_name']}:{test_type}:pytest"
+        
+        module_name = file_path[:-3].replace('/', '.') if file_path.endswith('.py') else file_path
+        header = f'"""{test_type.capitalize()} tests for {module_name}"""\n\nimport pytest\nfrom unittest.mock import MagicMock, patch\n\nfrom {module_name} import *\n'
+        output_file = None
+        
+        existing_tests = set()
+        output_exists = bool(output_path) and Path(output_path).is_file()
+        if output_exists:
+            existing_code = Path(output_path).read_text(encoding='utf-8', errors='ignore')
+            existing_tests = {name.lower() for name in EXISTING_TEST_RE.findall(existing_code)}
+        
+        def already_tested(func: Dict[str, Any]) -> bool:
+            candidates = {
+                func['name'].strip('_').lower(),
+                func['qualified_name'].replace('.', '_').strip('_').lower()
+            }
+            return any(
+                test_name == candidate or test_name.startswith(f"{candidate}_")
+                for test_name in existing_tests for candidate in candidates
+            )
+        
+        targets = [func for func in functions if not func.get('trivial') and not already_tested(func)]
+        skipped_trivial = sum(1 for func in functions if func.get('trivial'))
+        skipped_tested = len(functions) - len(targets) - skipped_trivial
+        if skipped_trivial or skipped_tested:
+            self.logger.info(f"⏭️ BATCH TESTS: Skipping {skipped_trivial} trivial and {skipped_tested} already tested functions in {file_path}")
+        
+        async def write_output(data: str):
+            nonlocal output_file
+            # Header is written lazily so no file is left behind if nothing is
+            # generated; an existing test file is appended to
+            if output_file is None:
+                Path(output_path).parent.mkdir(parents=True, exist_ok=True)
+                mode = 'ab' if output_exists else 'wb'
+                if AIOFILES_AVAILABLE:
+                    output_file = await aiofiles.open(output_path, mode, buffering=1 << 20)
+                else:
+                    output_file = open(output_path, mode, buffering=1 << 20)
+                if not output_exists:
+                    data = header + data
+            
+            if AIOFILES_AVAILABLE:
+                await output_file.write(data.encode('utf-8'))
+            else:
+                output_file.write(data.encode('utf-8'))
+        
+        try:
+            pending = []
+            for func in targets:
+                cache_key = test_cache_key(func)
+                cached = self.test_cache.get(cache_key) if cache_key else None
+                if not (cached and time.time() - cached['timestamp'] < self.cache_ttl):
+                    pending.append(func)
+                    continue
+                
+                test_cases.append({
+                    'name': func['qualified_name'],
+                    'line_number': func['line_number'],
+                    'test_code': cached['test_code']
+                })
+                if output_path:
+                    await write_output(f"\n\n{cached['test_code']}\n")
+            
+            if len(pending) < len(targets):
+                self.logger.info(f"⚡ BATCH TESTS: Reusing cached tests for {len(targets) - len(pending)} unchanged functions in {file_path}")
+            
+            batches = [pending[i:i + batch_size] for i in range(0, len(pending), batch_size)]
+            
+            async def generate_batch(batch: List[Dict[str, Any]]) -> Dict[str, Any]:
+                prompt = self._create_batch_test_prompt(file_path, batch, imports, test_type)
+                try:
+                    return await self.vertex_client.generate_with_static_prefix(
+                        BATCH_TEST_INSTRUCTIONS, prompt, "batch test generation"
+                    )
+                except Exception as e:
+                    return {'success': False, 'error': str(e)}
+            
+            # Batches have no data dependency, so they run concurrently; awaiting
+            # them in order keeps the streamed output in source order
+            batch_tasks = [asyncio.ensure_future(generate_batch(batch)) for batch in batches]
+            
+            for index, (batch, task) in enumerate(zip(batches, batch_tasks), 1):
+                response = await task
+                
+                if not response.get('success'):
+                    failed_batches += 1
+                    self.logger.warning(f"⚠️ BATCH TESTS: Batch {index} failed for {file_path}: {response.get('error')}")
+                    continue
+                
+                generated = self._split_batch_test_response(response.get('text', ''))
+                for func in batch:
+                    test_code = generated.get(func['qualified_name'])
+                    if not test_code:
+                        continue
+                    
+                    cache_key = test_cache_key(func)
+                    if cache_key:
+                        self.test_cache[cache_key] = {
+                            'test_code': test_code,
+                            'timestamp': time.time()
+                        }
+                    
+                    test_cases.append({
+                        'name': func['qualified_name'],
+                        'line_number': func['line_number'],
+                        'test_code': test_code
+                    })
+                    
+                    if output_path:
+                        await write_output(f"\n\n{test_code}\n")
+        finally:
+            # Only has an effect if a write failed part way through
+            for task in batch_tasks:
+                task.cancel()
+            
+            if output_file is not None:
+                if AIOFILES_AVAILABLE:
+                    await output_file.close()
+                else:
+                    output_file.close()
+        
+        test_cases.sort(key=lambda case: case['line_number'])
+        if output_path:
+            test_code = ''
+        else:
+            test_code = header + ''.join(f"\n\n{case['test_code']}\n" for case in test_cases)
+        
+        # Nothing left to generate is not a failure
+        success = bool(test_cases) or not targets
+        
+        return TestGenerationResult(
+            operation_id=str(uuid.uuid4()),
+            file_path=file_path,
+            test_type=test_type,
+            test_code=test_code,
+            test_file_path=output_path if output_path and (test_cases or output_exists) else '',
+            test_cases=test_cases,
+            framework='pytest',
+            success=success,
+            error_message=None if success else "No tests could be generated",
+            execution_time=time.time() - start_time,
+            metadata={
+                'model_used': self.vertex_client.model_name,
+                'agent_integrated': False,
+                'functions_count': len(functions),
+                'model_requests': -(-len(pending) // batch_size),
+                'cached_functions': len(targets) - len(pending),
+                'skipped_trivial': skipped_trivial,
+                'skipped_tested': skipped_tested,
+                'failed_batches': failed_batches
+            }
+        )
+    
     async def _direct_ai_optimization(self, file_path: str, content: str, optimization_type: str) -> OptimizationResult:
         """Direct AI optimization."""
         prompt = self._create_optimization_prompt(file_path, content, optimization_type)
@@ -501,96 +1750,155 @@ class StreamlinedAIService:
         """Create prompt for code analysis."""
         file_ext = file_path.split('.')[-1] if '.' in file_path else 'unknown'
         
-        prompt = f"""
-Analyze the following {file_ext} code for {analysis_type} issues:
-
-File: {file_path}
-Code:
-```{file_ext}
-{content}
-```
-
-Please provide:
-1. Code quality issues with severity levels
-2. Security vulnerabilities if any
-3. Performance optimization opportunities
-4. Best practice recommendations
-5. Specific line-by-line suggestions
-
-Format the response as structured JSON with 'issues', 'suggestions', and 'metrics' sections.
-"""
-        return prompt
+        header = ANALYSIS_PROMPT_HEADER.format(
+            file_ext=file_ext, analysis_type=analysis_type, file_path=file_path
+        )
+        return ''.join((header, content, ANALYSIS_PROMPT_FOOTER))
     
     def _create_test_prompt(self, file_path: str, content: str, test_type: str) -> str:
         """Create prompt for test generation."""
         file_ext = file_path.split('.')[-1] if '.' in file_path else 'unknown'
         
-        prompt = f"""
-Generate {test_type} tests for the following {file_ext} code:
-
-File: {file_path}
-Code:
-```{file_ext}
-{content}
-```
-
-Please generate:
-1. Comprehensive test cases covering all functions/methods
-2. Edge case tests
-3. Error handling tests
-4. Mock data and setup code if needed
-5. Test assertions and expected outcomes
-
-Provide the complete test code that can be run immediately.
-"""
-        return prompt
+        return TEST_PROMPT_TEMPLATE.format(
+            test_type=test_type, file_ext=file_ext, file_path=file_path, content=content
+        )
+    
+    def _create_batch_test_prompt(
+        self,
+        file_path: str,
+        functions: List[Dict[str, Any]],
+        imports: List[str],
+        test_type: str
+    ) -> str:
+        """Create the per-batch part of a batched test prompt (see BATCH_TEST_INSTRUCTIONS)."""
+        sections = [
+            BATCH_TEST_FUNCTION_TEMPLATE.format(qualified_name=func['qualified_name'], source=func['source'])
+            for func in functions
+        ]
+        
+        return BATCH_TEST_PROMPT_TEMPLATE.format(
+            test_type=test_type,
+            file_path=file_path,
+            imports=', '.join(sorted(imports)) or 'none',
+            sections='\n'.join(sections)
+        )
+    
+    def _split_batch_test_response(self, response_text: str) -> Dict[str, str]:
+        """Split a batched test response into test code per function name."""
+        generated = {}
+        for match in BATCH_TEST_BLOCK_RE.finditer(response_text):
+            block = match.group(2).rstrip()
+            if block.endswith('```'):
+                block = block[:-3]
+            block = block.strip()
+            if block:
+                generated[match.group(1)] = block
+        
+        return generated
     
     def _create_optimization_prompt(self, file_path: str, content: str, optimization_type: str) -> str:
         """Create prompt for code optimization."""
         file_ext = file_path.split('.')[-1] if '.' in file_path else 'unknown'
         
-        prompt = f"""
-Optimize the following {file_ext} code for {optimization_type}:
-
-File: {file_path}
-Code:
-```{file_ext}
-{content}
-```
-
-Please provide:
-1. Optimized version of the code
-2. Explanation of changes made
-3. Performance improvements expected
-4. Any trade-offs or considerations
-5. Best practices applied
-
-Provide the complete optimized code that can be used as a direct replacement.
-"""
-        return prompt
+        return OPTIMIZATION_PROMPT_TEMPLATE.format(
+            file_ext=file_ext, optimization_type=optimization_type, file_path=file_path, content=content
+        )
     
     def _create_chat_prompt(self, message: str, file_path: Optional[str], content: Optional[str]) -> str:
         """Create prompt for chat interaction."""
         context_part = ""
         if file_path and content:
             file_ext = file_path.split('.')[-1] if '.' in file_path else 'unknown'
-            context_part = f"""
-Context - File: {file_path}
-```{file_ext}
-{content}
-```
-"""
+            context_part = CHAT_CONTEXT_TEMPLATE.format(file_path=file_path, file_ext=file_ext, content=content)
         
-        prompt = f"""
-You are an expert code assistant. Help the user with their question.
-
-{context_part}
-
-User Question: {message}
-
-Please provide a helpful, accurate response focused on code and development topics.
-"""
-        return prompt
+        return CHAT_PROMPT_TEMPLATE.format(context_part=context_part, message=message)
+    
+    def _extract_json_objects(self, text: str) -> Tuple[List[Dict[str, Any]], int]:
+        """
+        Parse the complete JSON objects in text with a single decoder scan.
+        
+        The scan jumps between candidate '{' / '[' positions and lets
+        raw_decode consume each value in place, so surrounding prose and code
+        fences are skipped without a regex pass or substring copies. Arrays
+        contribute the objects they contain.
+        
+        No regex walks the values themselves, so malformed output cannot
+        trigger backtracking; each candidate costs one C-level decode.
+        
+        Findings normally arrive one object per line; with orjson installed a
+        complete line that is exactly one object or array is parsed by orjson
+        instead, and anything else falls back to raw_decode.
+        
+        An array that is still incomplete is entered rather than waited for,
+        so its finished elements are emitted as they arrive and only the
+        element in progress is held back (like ijson's 'item' prefix). A
+        response that is one long array therefore streams in constant memory,
+        and a truncated one still yields its complete findings.
+        
+        A value that fails to decode on the last line of text, which has no
+        newline yet, is also treated as unfinished: the text may have been cut
+        inside a literal, a number or an escape, where the decoder reports an
+        error before the end. It is decided once its line is complete.
+        
+        Args:
+            text: Response text, possibly ending in an unfinished object
+            
+        Returns:
+            Tuple of (objects, consumed) where consumed is the length of the
+            prefix that is fully processed; an unfinished trailing object is
+            left unconsumed so it can be retried once more text has arrived.
+        """
+        objects = []
+        position = 0
+        
+        while True:
+            match = JSON_START_RE.search(text, position)
+            if not match:
+                return objects, len(text)
+            
+            if ORJSON_AVAILABLE:
+                line_end = text.find('\n', match.start())
+                # Lines that do not end in a closing bracket are prose with JSON
+                # inside (or an unfinished value); orjson would only raise on them
+                if line_end != -1 and text[line_end - 1] in '}]':
+                    try:
+                        value = orjson.loads(text[match.start():line_end])
+                    except orjson.JSONDecodeError:
+                        value = None
+                    if isinstance(value, dict):
+                        objects.append(value)
+                        position = line_end
+                        continue
+                    if isinstance(value, list):
+                        objects.extend(item for item in value if isinstance(item, dict))
+                        position = line_end
+                        continue
+            
+            try:
+                value, position = JSON_DECODER.raw_decode(text, match.start())
+            except json.JSONDecodeError as e:
+                # Ran out of text mid-value: wait for the rest of it, except
+                # inside an array whose finished elements can be taken now
+                if e.pos >= len(text) or e.msg.startswith('Unterminated string') or text.find('\n', e.pos) == -1:
+                    if text[match.start()] != '[':
+                        return objects, match.start()
+                    position = match.start() + 1
+                    continue
+                position = match.start() + 1
+                continue
+            except RecursionError:
+                # Pathologically nested brackets; retrying each nested start would
+                # recurse just as deep again, so drop the rest of the line
+                line_end = text.find('\n', match.start())
+                if line_end == -1:
+                    return objects, match.start()
+                position = line_end
+                continue
+            
+            if isinstance(value, dict):
+                objects.append(value)
+            elif isinstance(value, list):
+                objects.extend(item for item in value if isinstance(item, dict))
     
     def _parse_analysis_response(self, response: Dict[str, Any], file_path: str) -> AnalysisResult:
         """Parse AI response into AnalysisResult."""
@@ -599,15 +1907,104 @@ Please provide a helpful, accurate response focused on code and development topi
         from ..models.analysis_model import CodeIssue, CodeSuggestion, AnalysisMetrics
         import uuid
         
+        findings = response.get('findings')
+        if findings is None:
+            findings = self._extract_json_objects(response_text + '\n')[0] if response.get('success') else []
+        # Streamed findings were validated as they arrived, including every
+        # part of a part-wise analysis; anything else is checked here in one batch
+        if findings and not response.get('findings_validated'):
+            valid_findings = filter_valid_findings(findings)
+            if len(valid_findings) < len(findings):
+                self.logger.debug(f"Skipping {len(findings) - len(valid_findings)} malformed findings in {file_path}")
+            findings = valid_findings
+        
+        issues = []
+        suggestions = []
+        # 64-bit hashes of (line, category, description) instead of tuples of strings
+        seen_issues = set()
+        # Parts of a large file often yield the same suggestion reworded
+        seen_suggestions = NearDuplicateIndex(fuzzy=self.fuzzy_suggestion_dedup)
+        
+        for finding in findings:
+            # Validated fields are strings or None; read each one once
+            line_number = finding.get('line_number')
+            if not isinstance(line_number, int):
+                line_number = None
+            title = finding.get('title')
+            description = finding.get('description') or ''
+            
+            if finding.get('kind') == 'suggestion':
+                suggested_code = finding.get('suggested_code')
+                impact = finding.get('impact')
+                effort = finding.get('effort')
+                suggestion_text = suggested_code or description
+                if suggestion_text.strip() and not seen_suggestions.add(suggestion_text):
+                    continue
+                
+                suggestions.append(CodeSuggestion(
+                    title=title or 'Improvement Suggestion',
+                    description=description,
+                    line_number=line_number,
+                    suggested_code=suggested_code,
+                    impact=sys.intern(impact) if impact in SUGGESTION_LEVELS else 'medium',
+                    effort=sys.intern(effort) if effort in SUGGESTION_LEVELS else 'medium',
+                    confidence_score=0.7,
+                    source_agent='direct_ai'
+                ))
+                continue
+            
+            category = (finding.get('category') or 'general').lower()
+            key_text = f"{line_number}|{category}|{description.strip().lower()}"
+            issue_key = xxhash.xxh3_64_intdigest(key_text.encode('utf-8')) if XXHASH_AVAILABLE else hash(key_text)
+            if issue_key in seen_issues:
+                continue
+            seen_issues.add(issue_key)
+            
+            severity = (finding.get('severity') or 'medium').lower()
+            severity = IssueSeverity(severity) if severity in VALID_ISSUE_SEVERITIES else IssueSeverity.MEDIUM
+            if category in VALID_ISSUE_TYPES:
+                category = sys.intern(category)
+                issue_type = IssueType(category)
+            else:
+                inferred = infer_issue_category(f"{title or ''} {description}".lower())
+                issue_type = IssueType(inferred) if inferred else IssueType.BEST_PRACTICE
+            
+            issues.append(CodeIssue(
+                type=issue_type,
+                severity=severity,
+                title=title or 'Unknown Issue',
+                description=description,
+                line_number=line_number,
+                file_path=file_path,
+                category=category,
+                suggestion=finding.get('suggestion'),
+                fix_suggestion=finding.get('fix_code'),
+                confidence_score=0.8,
+                source_agent='direct_ai'
+            ))
+        
+        severity_counts = {severity: 0 for severity in IssueSeverity}
+        for issue in issues:
+            severity_counts[issue.severity] += 1
+        
         return AnalysisResult(
             operation_id=str(uuid.uuid4()),
             file_path=file_path,
             agent_type="direct_ai",
-            issues=[],
-            suggestions=[],
-            metrics=AnalysisMetrics(),
+            issues=issues,
+            suggestions=suggestions,
+            metrics=AnalysisMetrics(
+                total_issues=len(issues),
+                critical_issues=severity_counts[IssueSeverity.CRITICAL],
+                high_issues=severity_counts[IssueSeverity.HIGH],
+                medium_issues=severity_counts[IssueSeverity.MEDIUM],
+                low_issues=severity_counts[IssueSeverity.LOW],
+                info_issues=severity_counts[IssueSeverity.INFO]
+            ),
             confidence_score=0.8,
             execution_time=response.get('execution_time', 0.0),
+            success=response.get('success', True),
+            error_message=response.get('error'),
             metadata={
                 'model_used': self.vertex_client.model_name,
                 'agent_integrated': False,
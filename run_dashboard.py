@@ -21,6 +21,7 @@ sys.path.insert(0, str(project_root / 'web_dashboard'))
 # Import new SDK
 from ci_code_companion_sdk import CICodeCompanionSDK, SDKConfig
 from ci_code_companion_sdk.core.exceptions import CICodeCompanionError, ConfigurationError
+from ci_code_companion_sdk.core.utils import run_ai_task
 from web_dashboard.routes.api import api, init_database
 from web_dashboard.routes.gitlab_api import gitlab_bp, init_gitlab
 from web_dashboard.routes.gitlab_routes import gitlab_bp as gitlab_oauth_bp
@@ -99,8 +100,10 @@ def create_app():
     
     # Add AI analysis endpoint using new SDK
     @app.route('/api/ai-analyze', methods=['POST'])
-    async def ai_analyze():
+    def ai_analyze():
         """AI analysis endpoint using the new SDK."""
+        # The SDK's Vertex AI client is bound to one event loop, so calls run on the
+        # SDK's shared loop rather than the fresh loop Flask gives each async view
         app.logger.info(f"AI analysis request received for {request.path}")
         
         if not app.sdk:
@@ -135,7 +138,7 @@ def create_app():
             try:
                 if action == 'review':
                     app.logger.info(f"Starting SDK code analysis for: {file_path}")
-                    result = await app.sdk.analyze_file(file_path, content)
+                    result = run_ai_task(app.sdk.analyze_file(file_path, content))
                     response_payload = {
                         'action': action,
                         'file_path': file_path,
@@ -145,7 +148,7 @@ def create_app():
                     
                 elif action in ['test', 'test-generation']:
                     app.logger.info(f"Starting SDK test generation for: {file_path}")
-                    result = await app.sdk.generate_tests(file_path, content)
+                    result = run_ai_task(app.sdk.generate_tests(file_path, content))
                     response_payload = {
                         'action': action,
                         'file_path': file_path,
@@ -155,7 +158,7 @@ def create_app():
                     
                 elif action == 'improve':
                     app.logger.info(f"Starting SDK code optimization for: {file_path}")
-                    result = await app.sdk.optimize_code(file_path, content)
+                    result = run_ai_task(app.sdk.optimize_code(file_path, content))
                     response_payload = {
                         'action': action,
                         'file_path': file_path,
@@ -166,7 +169,7 @@ def create_app():
                 elif action == 'chat':
                     app.logger.info(f"Starting SDK chat for: {file_path}")
                     message = data.get('message', '')
-                    result = await app.sdk.chat(message, file_path, content)
+                    result = run_ai_task(app.sdk.chat(message, file_path, content))
                     response_payload = {
                         'action': action,
                         'file_path': file_path,
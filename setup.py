@@ -68,6 +68,17 @@ OPTIONAL_DEPENDENCIES = {
         "alembic>=1.8.0",
         "psycopg2-binary>=2.9.0",
     ],
+    "parsing": [
+        "tree-sitter-languages>=1.8.0",
+        # tree-sitter-languages' prebuilt grammars fail to load on tree-sitter 0.22+
+        "tree-sitter>=0.20.1,<0.22",
+        "tiktoken>=0.5.0",
+        "xxhash>=3.0.0",
+        "orjson>=3.9.0",
+        "pyahocorasick>=2.0.0",
+        "msgspec>=0.18.0",
+        "rapidfuzz>=3.0.0",
+    ],
     "monitoring": [
         "prometheus-client>=0.14.0",
         "sentry-sdk>=1.9.0",
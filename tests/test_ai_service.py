@@ -0,0 +1,259 @@
+"""
+Unit tests for StreamlinedAIService response parsing, code chunking and result caching
+"""
+
+import pytest
+import asyncio
+import sys
+from unittest.mock import Mock, AsyncMock
+from pathlib import Path
+
+# Add the CI Code Companion to Python path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from ci_code_companion_sdk.services import ai_service
+from ci_code_companion_sdk.services.ai_service import StreamlinedAIService
+
+
+@pytest.fixture
+def service():
+    """Service without a Vertex AI client; these helpers do not call the model."""
+    return StreamlinedAIService.__new__(StreamlinedAIService)
+
+
+class TestExtractJsonObjects:
+    """Test cases for StreamlinedAIService._extract_json_objects."""
+
+    @pytest.fixture(autouse=True, params=[True, False], ids=['orjson', 'json'])
+    def decoder(self, request, monkeypatch):
+        """Run every case with and without the orjson line fast path."""
+        if request.param and not ai_service.ORJSON_AVAILABLE:
+            pytest.skip("orjson not installed")
+        monkeypatch.setattr(ai_service, 'ORJSON_AVAILABLE', request.param)
+
+    def test_objects_between_prose_and_fences(self, service):
+        """Test that objects are found around prose and code fences."""
+        text = (
+            "Here are the findings:\n"
+            "```json\n"
+            '{"type": "bug", "line": 3}\n'
+            '{"type": "style", "line": 7}\n'
+            "```\n"
+            "Let me know if you need more.\n"
+        )
+
+        objects, consumed = service._extract_json_objects(text)
+
+        assert objects == [{"type": "bug", "line": 3}, {"type": "style", "line": 7}]
+        assert consumed == len(text)
+
+    def test_array_contributes_its_objects(self, service):
+        """Test that arrays yield the objects they contain and skip other values."""
+        text = '[{"type": "bug"}, 42, "note", {"type": "style"}]\n'
+
+        objects, _ = service._extract_json_objects(text)
+
+        assert objects == [{"type": "bug"}, {"type": "style"}]
+
+    def test_unfinished_object_is_left_unconsumed(self, service):
+        """Test that a trailing partial object is kept for the next chunk of text."""
+        text = '{"type": "bug"}\n{"type": "sty'
+
+        objects, consumed = service._extract_json_objects(text)
+
+        assert objects == [{"type": "bug"}]
+        assert text[consumed:] == '{"type": "sty'
+
+    def test_unfinished_array_yields_finished_elements(self, service):
+        """Test that complete elements of a truncated array are emitted."""
+        text = '[{"type": "bug"}, {"type": "style"}, {"type": "perf'
+
+        objects, consumed = service._extract_json_objects(text)
+
+        assert objects == [{"type": "bug"}, {"type": "style"}]
+        assert text[consumed:] == '{"type": "perf'
+
+    def test_streamed_text_parses_the_same_as_whole(self, service):
+        """Test that feeding text in pieces yields the same objects."""
+        text = '[{"type": "bug", "line": 1},\n {"type": "style", "line": 2}]\n{"type": "perf"}\n'
+        objects = []
+        pending = ''
+
+        for start in range(0, len(text), 5):
+            pending += text[start:start + 5]
+            found, consumed = service._extract_json_objects(pending)
+            objects.extend(found)
+            pending = pending[consumed:]
+
+        assert objects == service._extract_json_objects(text)[0]
+        assert len(objects) == 3
+
+    @pytest.mark.parametrize('text', [
+        '{"title": "a", "line": 1}\n{"title": "b", "auto_fix": true, "confidence": -1.5e2, "note": "caf\\u00e9", "fixed": null}\n',
+        '[{"title": "a", "auto_fix": false},\n {"title": "b", "score": 12.75}]\n',
+        '{\n  "title": "a",\n  "auto_fix": true,\n  "line": 10\n}\n',
+    ], ids=['lines', 'array', 'multiline'])
+    def test_cut_at_every_offset(self, service, text):
+        """Test that a stream cut at any offset yields the same objects as the whole text."""
+        expected = service._extract_json_objects(text + '\n')[0]
+
+        for cut in range(1, len(text)):
+            objects = []
+            pending = ''
+            for piece in (text[:cut], text[cut:]):
+                pending += piece
+                found, consumed = service._extract_json_objects(pending)
+                objects.extend(found)
+                pending = pending[consumed:]
+            objects.extend(service._extract_json_objects(pending + '\n')[0])
+
+            assert objects == expected, f"cut at {cut}: {text[:cut]!r}"
+
+    def test_malformed_last_line_is_skipped_once_complete(self, service):
+        """Test that a malformed line is held back only until its newline arrives."""
+        objects, consumed = service._extract_json_objects('{"title": "a"}\n{"title": tru')
+
+        assert objects == [{"title": "a"}]
+        assert consumed == len('{"title": "a"}\n')
+
+        objects, _ = service._extract_json_objects('{"title": trash}\n{"title": "b"}\n')
+
+        assert objects == [{"title": "b"}]
+
+    def test_malformed_and_deeply_nested_input(self, service):
+        """Test that broken and pathologically nested JSON is skipped without raising."""
+        text = '{not json}\n' + '[' * 5000 + '\n{"type": "bug"}\n'
+
+        objects, _ = service._extract_json_objects(text)
+
+        assert objects == [{"type": "bug"}]
+
+
+class TestSplitCodeChunks:
+    """Test cases for StreamlinedAIService._split_code_chunks."""
+
+    PYTHON_SOURCE = (
+        "import os\n"
+        "\n"
+        "def first():\n"
+        "    value = 1\n"
+        "    return value\n"
+        "\n"
+        "def second():\n"
+        "    value = 2\n"
+        "    return value\n"
+        "\n"
+        "def third():\n"
+        "    value = 3\n"
+        "    return value\n"
+    )
+
+    def test_parts_cover_content(self, service):
+        """Test that parts rejoin to the original text with correct start lines."""
+        chunks = service._split_code_chunks(self.PYTHON_SOURCE, 40, 'python')
+        lines = self.PYTHON_SOURCE.splitlines(keepends=True)
+
+        assert ''.join(text for _, text, _ in chunks) == self.PYTHON_SOURCE
+        for start_line, text, size in chunks:
+            assert text.startswith(lines[start_line - 1])
+            assert size == len(text)
+
+    def test_python_splits_before_definitions(self, service):
+        """Test that Python parts start at top-level definitions rather than mid-function."""
+        chunks = service._split_code_chunks(self.PYTHON_SOURCE, 50, 'python')
+
+        assert len(chunks) > 1
+        for start_line, text, size in chunks[1:]:
+            assert text.startswith("def ")
+            assert size <= 50
+
+    def test_splits_after_blank_lines_without_language(self, service):
+        """Test that other text prefers to split after a blank line."""
+        content = "a = 1\nb = 2\n\nc = 3\nd = 4\n\ne = 5\nf = 6\n"
+
+        chunks = service._split_code_chunks(content, 14)
+
+        assert [text for _, text, _ in chunks] == ["a = 1\nb = 2\n\n", "c = 3\nd = 4\n\n", "e = 5\nf = 6\n"]
+        assert [start_line for start_line, _, _ in chunks] == [1, 4, 7]
+
+    def test_oversized_line_is_its_own_part(self, service):
+        """Test that a single line longer than chunk_size is not split."""
+        content = "short\n" + "x" * 100 + "\nshort\n"
+
+        chunks = service._split_code_chunks(content, 20)
+
+        assert [text for _, text, _ in chunks] == ["short\n", "x" * 100 + "\n", "short\n"]
+
+    def test_custom_measure(self, service):
+        """Test that parts are sized with the given measure."""
+        content = "one\ntwo\nthree\nfour\n"
+
+        chunks = service._split_code_chunks(content, 2, measure=lambda line: 1)
+
+        assert [(start_line, size) for start_line, _, size in chunks] == [(1, 2), (3, 2)]
+
+    def test_empty_content(self, service):
+        """Test that empty content has no parts."""
+        assert service._split_code_chunks("", 100) == []
+
+
+class TestAnalysisCache:
+    """Test cases for the direct analysis result cache."""
+
+    @pytest.fixture
+    def analysis_service(self, monkeypatch):
+        """Service with a mocked Vertex AI client and one-file requests."""
+        monkeypatch.setattr(ai_service, 'VertexAIClient', Mock())
+        return StreamlinedAIService({'analysis_batch_size': 1})
+
+    def analyze_twice(self, service, metadata):
+        """Analyze the same file twice against a fixed model response."""
+        response = {
+            'success': True,
+            'text': '{"title": "a", "line_number": 1}',
+            'findings': [{'title': 'a', 'line_number': 1}],
+            'metadata': metadata
+        }
+        service._stream_analysis = AsyncMock(side_effect=lambda *args, **kwargs: dict(response))
+
+        for _ in range(2):
+            asyncio.run(service._direct_ai_analysis('notes.txt', 'first line\n', 'review'))
+        return service._stream_analysis.await_count
+
+    def test_complete_response_is_reused(self, analysis_service):
+        """Test that a complete analysis of equivalent code is served from the cache."""
+        assert self.analyze_twice(analysis_service, {'finish_reason': 'STOP'}) == 1
+        assert len(analysis_service.analysis_cache) == 1
+
+    @pytest.mark.parametrize('metadata', [
+        {'finish_reason': 'MAX_TOKENS', 'partial_response': True},
+        {'finish_reason': 'MAX_TOKENS'},
+        {'partial_response': True},
+    ], ids=['partial-max-tokens', 'max-tokens', 'partial'])
+    def test_truncated_response_is_not_cached(self, analysis_service, metadata):
+        """Test that a response cut off at the output limit is analyzed again."""
+        assert self.analyze_twice(analysis_service, metadata) == 2
+        assert len(analysis_service.analysis_cache) == 0
+
+    @pytest.mark.parametrize('finish_reason, expected_calls', [('STOP', 3), ('MAX_TOKENS', 6)])
+    def test_truncated_parts_are_not_cached(self, monkeypatch, finish_reason, expected_calls):
+        """Test that parts of a large file cut off at the output limit are analyzed again."""
+        monkeypatch.setattr(ai_service, 'VertexAIClient', Mock())
+        service = StreamlinedAIService({
+            'analysis_batch_size': 1,
+            'analysis_chunk_tokens': 20,
+            'analysis_chunk_overlap_tokens': 0
+        })
+        response = {
+            'success': True,
+            'text': '',
+            'findings': [],
+            'metadata': {'finish_reason': finish_reason}
+        }
+        service._stream_analysis = AsyncMock(side_effect=lambda *args, **kwargs: dict(response))
+        content = ''.join(f"paragraph {index} " + "word " * 12 + "\n\n" for index in range(3))
+
+        for _ in range(2):
+            asyncio.run(service._direct_ai_analysis('notes.txt', content, 'review'))
+
+        assert service._stream_analysis.await_count == expected_calls
@@ -0,0 +1,138 @@
+"""
+Unit tests for the dashboard API's database helpers
+"""
+
+import pytest
+import sys
+from pathlib import Path
+
+# The API routes are imported relative to web_dashboard
+sys.path.insert(0, str(Path(__file__).parent.parent))
+sys.path.insert(0, str(Path(__file__).parent.parent / 'web_dashboard'))
+
+from flask import Flask
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from routes import api
+
+
+class TestMakeEngine:
+    """Test cases for make_engine."""
+
+    @pytest.fixture
+    def engine_kwargs(self, monkeypatch):
+        """Record the keyword arguments passed to create_engine."""
+        calls = []
+
+        def fake_create_engine(url, **kwargs):
+            calls.append(kwargs)
+            return kwargs
+
+        monkeypatch.setattr(api, 'create_engine', fake_create_engine)
+        return calls
+
+    @pytest.mark.parametrize('sqlalchemy_2', [True, False], ids=['2.x', '1.4'])
+    def test_sqlite_kwargs(self, monkeypatch, engine_kwargs, sqlalchemy_2):
+        """Test that SQLite only gets insertmanyvalues_page_size on SQLAlchemy 2.0."""
+        monkeypatch.setattr(api, 'SQLALCHEMY_2', sqlalchemy_2)
+
+        kwargs = api.make_engine('sqlite://')
+
+        expected = {'pool_pre_ping': True}
+        if sqlalchemy_2:
+            expected['insertmanyvalues_page_size'] = 1000
+        assert kwargs == expected
+
+    @pytest.mark.parametrize('sqlalchemy_2', [True, False], ids=['2.x', '1.4'])
+    def test_postgresql_page_size_by_version(self, monkeypatch, engine_kwargs, sqlalchemy_2):
+        """Test that PostgreSQL gets the page size option its SQLAlchemy version accepts."""
+        monkeypatch.setattr(api, 'SQLALCHEMY_2', sqlalchemy_2)
+
+        kwargs = api.make_engine('postgresql://user@localhost/db', analytics_only=True)
+
+        assert kwargs['executemany_mode'] == 'values_plus_batch'
+        assert kwargs['connect_args'] == {'options': '-c synchronous_commit=off'}
+        assert ('insertmanyvalues_page_size' in kwargs) is sqlalchemy_2
+        assert ('executemany_values_page_size' in kwargs) is not sqlalchemy_2
+
+    def test_installed_sqlalchemy_accepts_sqlite_kwargs(self):
+        """Test that the installed SQLAlchemy builds a working SQLite engine."""
+        engine = api.make_engine('sqlite://')
+
+        with engine.connect() as conn:
+            assert conn.execute(text("SELECT 1")).scalar() == 1
+        engine.dispose()
+
+
+class TestGetFileStats:
+    """Test cases for get_file_stats."""
+
+    @pytest.fixture
+    def session(self):
+        """Session on an in-memory SQLite database with a code_files table."""
+        engine = api.make_engine('sqlite://')
+        session = Session(engine)
+        session.execute(text(
+            "CREATE TABLE code_files ("
+            "id INTEGER PRIMARY KEY, repository_id INTEGER, language TEXT, "
+            "lines_of_code INTEGER, complexity_score REAL, content TEXT)"
+        ))
+        yield session
+        session.close()
+        engine.dispose()
+
+    def add_files(self, session, rows):
+        session.execute(
+            text(
+                "INSERT INTO code_files (repository_id, language, lines_of_code, complexity_score, content) "
+                "VALUES (:repository_id, :language, :lines_of_code, :complexity_score, 'x')"
+            ),
+            [
+                dict(zip(('repository_id', 'language', 'lines_of_code', 'complexity_score'), row))
+                for row in rows
+            ]
+        )
+
+    def test_aggregates_across_batches(self, session):
+        """Test that aggregates over more rows than one fetch batch match a direct count."""
+        self.add_files(session, [
+            (1, ('python', 'javascript', None)[index % 3], index % 50, (index % 7) / 2)
+            for index in range(2500)
+        ])
+        self.add_files(session, [(2, 'go', 1000, 9.0)])
+
+        stats = api.get_file_stats(session, 1)
+
+        assert stats == {
+            'total_files': 2500,
+            'total_lines': sum(index % 50 for index in range(2500)),
+            'average_complexity': round(sum((index % 7) / 2 for index in range(2500)) / 2500, 2),
+            'languages': ['javascript', 'python']
+        }
+
+    def test_null_columns_count_as_zero(self, session):
+        """Test that missing line counts and complexity scores are treated as zero."""
+        self.add_files(session, [(1, 'python', None, None), (1, 'python', 10, 3.0)])
+
+        stats = api.get_file_stats(session, 1)
+
+        assert stats['total_lines'] == 10
+        assert stats['average_complexity'] == 1.5
+
+    def test_repository_without_files(self, session):
+        """Test that an unknown repository yields empty statistics."""
+        assert api.get_file_stats(session, 99) == {
+            'total_files': 0,
+            'total_lines': 0,
+            'average_complexity': 0,
+            'languages': []
+        }
+
+    def test_query_error_returns_none(self):
+        """Test that a database error is logged and reported as None."""
+        engine = api.make_engine('sqlite://')
+
+        with Flask(__name__).app_context(), Session(engine) as session:
+            assert api.get_file_stats(session, 1) is None
+        engine.dispose()
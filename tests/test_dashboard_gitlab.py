@@ -0,0 +1,130 @@
+"""
+Unit tests for the dashboard's cached GitLab clients
+"""
+
+import pytest
+import sys
+from pathlib import Path
+from types import SimpleNamespace
+
+# The dashboard imports its routes relative to web_dashboard
+sys.path.insert(0, str(Path(__file__).parent.parent))
+sys.path.insert(0, str(Path(__file__).parent.parent / 'web_dashboard'))
+
+import gitlab
+
+import app as dashboard
+
+
+class FakeGitlab:
+    """Stand-in for gitlab.Gitlab that accepts tokens from a shared set."""
+
+    instances = []
+    valid_tokens = set()
+
+    def __init__(self, url, oauth_token=None, session=None):
+        self.oauth_token = oauth_token
+        self.auth_calls = 0
+        self.user = None
+        FakeGitlab.instances.append(self)
+
+    def auth(self):
+        self.auth_calls += 1
+        if self.oauth_token not in FakeGitlab.valid_tokens:
+            raise gitlab.exceptions.GitlabAuthenticationError("401 Unauthorized")
+        self.user = SimpleNamespace(username='dev', name='Dev', avatar_url='https://example.com/a.png')
+
+
+@pytest.fixture(autouse=True)
+def fake_gitlab(monkeypatch):
+    """Fresh client caches and a fake GitLab for every test."""
+    FakeGitlab.instances = []
+    FakeGitlab.valid_tokens = {'good-token'}
+    monkeypatch.setattr(gitlab, 'Gitlab', FakeGitlab)
+    monkeypatch.setattr(dashboard, '_gitlab_clients', {})
+    monkeypatch.setattr(dashboard, '_rejected_gitlab_tokens', {})
+    return FakeGitlab
+
+
+def expire_validity(token):
+    """Age a cached client's last token check past the validity TTL."""
+    entry = dashboard._gitlab_clients[dashboard._gitlab_token_key(token)]
+    entry['validated'] -= dashboard.GITLAB_TOKEN_VALIDITY_TTL + 1
+
+
+class TestGetGitlabClient:
+    """Test cases for get_gitlab_client."""
+
+    def test_valid_token_is_reused(self, fake_gitlab):
+        """Test that a valid token authenticates once and the client is reused."""
+        first = dashboard.get_gitlab_client('good-token')
+        second = dashboard.get_gitlab_client('good-token')
+
+        assert first is second
+        assert len(fake_gitlab.instances) == 1
+        assert first.auth_calls == 1
+
+    def test_valid_token_is_checked_again_after_validity_ttl(self, fake_gitlab):
+        """Test that the token is re-authenticated on the same client after the validity TTL."""
+        client = dashboard.get_gitlab_client('good-token')
+        expire_validity('good-token')
+
+        assert dashboard.get_gitlab_client('good-token') is client
+        assert client.auth_calls == 2
+        assert dashboard.get_gitlab_client('good-token') is client
+        assert client.auth_calls == 2
+
+    def test_rejected_token(self, fake_gitlab):
+        """Test that a rejected token raises and is refused again without a round trip."""
+        with pytest.raises(gitlab.exceptions.GitlabAuthenticationError):
+            dashboard.get_gitlab_client('bad-token')
+        with pytest.raises(gitlab.exceptions.GitlabAuthenticationError):
+            dashboard.get_gitlab_client('bad-token')
+
+        assert len(fake_gitlab.instances) == 1
+        assert dashboard._gitlab_clients == {}
+
+    def test_revoked_token_is_noticed_after_validity_ttl(self, fake_gitlab):
+        """Test that a token revoked after caching is rejected once the validity TTL passes."""
+        dashboard.get_gitlab_client('good-token')
+        fake_gitlab.valid_tokens.clear()
+
+        # Still within the validity TTL
+        dashboard.get_gitlab_client('good-token')
+
+        expire_validity('good-token')
+        with pytest.raises(gitlab.exceptions.GitlabAuthenticationError):
+            dashboard.get_gitlab_client('good-token')
+        assert dashboard._gitlab_clients == {}
+
+
+class TestGitlabStatus:
+    """Test cases for the /api/gitlab/status endpoint."""
+
+    @pytest.fixture
+    def client(self):
+        """Flask test client for the dashboard app."""
+        dashboard.app.config['TESTING'] = True
+        return dashboard.app.test_client()
+
+    def status(self, client, token):
+        """Request the status endpoint with token in the session."""
+        with client.session_transaction() as session:
+            session['gitlab_token'] = token
+        return client.get('/api/gitlab/status').get_json()
+
+    def test_valid_token_is_connected(self, client):
+        """Test that a valid token reports the connected user."""
+        result = self.status(client, 'good-token')
+
+        assert result['connected'] is True
+        assert result['user']['username'] == 'dev'
+
+    def test_rejected_token_is_disconnected(self, client):
+        """Test that a rejected token is reported and cleared from the session."""
+        result = self.status(client, 'bad-token')
+
+        assert result['connected'] is False
+        assert result['error']
+        with client.session_transaction() as session:
+            assert 'gitlab_token' not in session
@@ -0,0 +1,76 @@
+"""
+Unit tests for multi-agent result aggregation
+"""
+
+import sys
+from pathlib import Path
+
+# Add the CI Code Companion to Python path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from ci_code_companion_sdk.core.config import SDKConfig
+from ci_code_companion_sdk.core.engine import CICodeCompanionEngine
+
+
+def make_engine(**config):
+    """Engine with only the configuration aggregation reads."""
+    engine = CICodeCompanionEngine.__new__(CICodeCompanionEngine)
+    engine.config = SDKConfig(config)
+    return engine
+
+
+def agent_result(*suggestions):
+    return {
+        'issues': [],
+        'suggestions': [{'type': suggestion_type, 'description': description} for suggestion_type, description in suggestions],
+        'confidence_score': 0.8,
+        'execution_time': 1.0
+    }
+
+
+RESULTS = {
+    'python': agent_result(
+        ('refactor', "Extract the repeated validation logic into a helper function to reduce duplication."),
+        ('docs', "Document the return value of parse_config."),
+    ),
+    'security': agent_result(
+        ('refactor', "Extract the repeated validation logic into a helper function to reduce duplications."),
+        ('docs', "Document the return value of parse_config."),
+        ('refactor', "Replace the string concatenation in the SQL query with bound parameters."),
+    ),
+}
+
+
+class TestAggregateAgentResults:
+    """Test cases for CICodeCompanionEngine._aggregate_agent_results."""
+
+    def suggestions(self, engine):
+        aggregated = engine._aggregate_agent_results(RESULTS, {})
+        return [(s['source_agent'], s['type'], s['description'].split()[0]) for s in aggregated['suggestions']]
+
+    def test_reworded_suggestions_are_merged_by_default(self):
+        """Test that a reworded suggestion of the same type from another agent is dropped."""
+        assert self.suggestions(make_engine()) == [
+            ('python', 'refactor', "Extract"),
+            ('python', 'docs', "Document"),
+            ('security', 'refactor', "Replace"),
+        ]
+
+    def test_exact_dedup_when_fuzzy_is_off(self):
+        """Test that with fuzzy_suggestion_dedup off only exact repeats are dropped."""
+        assert self.suggestions(make_engine(fuzzy_suggestion_dedup=False)) == [
+            ('python', 'refactor', "Extract"),
+            ('python', 'docs', "Document"),
+            ('security', 'refactor', "Extract"),
+            ('security', 'refactor', "Replace"),
+        ]
+
+    def test_same_text_of_different_types_is_kept(self):
+        """Test that suggestions are only compared within their type."""
+        engine = make_engine()
+        results = {
+            'python': agent_result(('refactor', "Cache the parsed configuration.")),
+            'performance': agent_result(('performance', "Cache the parsed configuration.")),
+        }
+
+        assert len(engine._aggregate_agent_results(results, {})['suggestions']) == 2
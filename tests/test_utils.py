@@ -0,0 +1,298 @@
+"""
+Unit tests for core utilities
+"""
+
+import pytest
+import os
+import sys
+from pathlib import Path
+
+# Add the CI Code Companion to Python path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from ci_code_companion_sdk.core import utils
+from ci_code_companion_sdk.core.utils import (
+    NearDuplicateIndex, simhash64, walk_source_files, extract_python_definitions
+)
+
+
+SUGGESTION = "Consider extracting the repeated validation logic into a helper function to reduce duplication."
+REWORDED_SUGGESTION = "Consider extracting the repeated validation logic into a helper function to reduce duplications."
+OTHER_SUGGESTION = "Add type hints to the public functions so callers can rely on static checking."
+
+
+class TestNearDuplicateIndex:
+    """Test cases for NearDuplicateIndex."""
+
+    @pytest.fixture(autouse=True, params=['installed', 'simhash'])
+    def backend(self, request, monkeypatch):
+        """Run every case with the available sketch and with the SimHash fallback."""
+        if request.param == 'simhash':
+            monkeypatch.setattr(utils, 'DATASKETCH_AVAILABLE', False)
+
+    def test_distinct_texts_are_added(self):
+        """Test that unrelated texts are all kept."""
+        index = NearDuplicateIndex()
+
+        assert index.add(SUGGESTION) is True
+        assert index.add(OTHER_SUGGESTION) is True
+
+    def test_exact_repeat_is_rejected(self):
+        """Test that repeats differing only in case and whitespace are duplicates."""
+        index = NearDuplicateIndex()
+        index.add(SUGGESTION)
+
+        assert index.add(SUGGESTION) is False
+        assert index.add("  " + SUGGESTION.upper().replace(" ", "\n ")) is False
+
+    def test_near_duplicate_is_rejected(self):
+        """Test that a slightly reworded text is a duplicate."""
+        index = NearDuplicateIndex()
+        index.add(SUGGESTION)
+
+        assert index.add(REWORDED_SUGGESTION) is False
+        assert index.add(OTHER_SUGGESTION) is True
+
+    def test_exact_only_mode(self):
+        """Test that with fuzzy=False only exact repeats are duplicates."""
+        index = NearDuplicateIndex(fuzzy=False)
+        index.add(SUGGESTION)
+
+        assert index.add(SUGGESTION.upper()) is False
+        assert index.add(REWORDED_SUGGESTION) is True
+
+    def test_indexes_are_independent(self):
+        """Test that texts in one index do not affect another."""
+        first = NearDuplicateIndex()
+        second = NearDuplicateIndex()
+        first.add(SUGGESTION)
+
+        assert second.add(SUGGESTION) is True
+
+    @pytest.mark.skipif(not utils.RAPIDFUZZ_AVAILABLE, reason="rapidfuzz not installed")
+    def test_short_texts_sharing_words_are_kept(self):
+        """Test that edit similarity rejects sketch matches between different short texts."""
+        index = NearDuplicateIndex()
+        index.add("Use a set here")
+
+        assert index.add("Use a dict here") is True
+
+
+class TestSimhash:
+    """Test cases for simhash64."""
+
+    def test_identical_texts(self):
+        """Test that normalized-equal texts share a fingerprint."""
+        assert simhash64(SUGGESTION) == simhash64("  " + SUGGESTION.upper())
+
+    def test_similar_texts_are_close(self):
+        """Test that similar texts differ in fewer bits than unrelated ones."""
+        near = bin(simhash64(SUGGESTION) ^ simhash64(REWORDED_SUGGESTION)).count('1')
+        far = bin(simhash64(SUGGESTION) ^ simhash64(OTHER_SUGGESTION)).count('1')
+
+        assert near <= NearDuplicateIndex().max_distance
+        assert near < far
+
+    def test_fingerprint_is_64_bits(self):
+        """Test that fingerprints fit in 64 bits."""
+        assert 0 <= simhash64(SUGGESTION) < 2 ** 64
+        assert simhash64("") == 0
+
+
+class TestWalkSourceFiles:
+    """Test cases for walk_source_files."""
+
+    @pytest.fixture
+    def tree(self, tmp_path):
+        """Small project tree with sources, tests and a blocked directory."""
+        for relative_path in [
+            "app.py",
+            "README.md",
+            "pkg/module.py",
+            "pkg/test_module.py",
+            "pkg/sub/helpers.py",
+            "node_modules/lib/index.py",
+            ".git/hooks/hook.py",
+        ]:
+            path = tmp_path / relative_path
+            path.parent.mkdir(parents=True, exist_ok=True)
+            path.write_text("")
+        return tmp_path
+
+    def relative(self, root, paths):
+        """Paths relative to root, with '/' separators."""
+        return [os.path.relpath(path, root).replace(os.sep, '/') for path in paths]
+
+    def test_name_patterns_and_blocked_dirs(self, tree):
+        """Test that name globs match at any depth and blocked subtrees are skipped."""
+        files = walk_source_files(str(tree), ["*.py"], blocked_dirs={"node_modules", ".git"})
+
+        assert self.relative(tree, files) == [
+            "app.py", "pkg/module.py", "pkg/sub/helpers.py", "pkg/test_module.py"
+        ]
+
+    def test_exclude_patterns(self, tree):
+        """Test that excluded names and paths are left out."""
+        files = walk_source_files(
+            str(tree), ["*.py"],
+            exclude_patterns=["test_*.py", "pkg/sub/*"],
+            blocked_dirs={"node_modules", ".git"}
+        )
+
+        assert self.relative(tree, files) == ["app.py", "pkg/module.py"]
+
+    def test_path_patterns_match_relative_path(self, tree):
+        """Test that patterns with a '/' match the path relative to root."""
+        files = walk_source_files(str(tree), ["pkg/*.py"])
+
+        assert self.relative(tree, files) == ["pkg/module.py", "pkg/sub/helpers.py", "pkg/test_module.py"]
+
+    def test_result_is_sorted(self, tree):
+        """Test that results come back sorted regardless of listing order."""
+        files = walk_source_files(str(tree), ["*.py", "*.md"], blocked_dirs={"node_modules", ".git"})
+
+        assert files == sorted(files)
+        assert "README.md" in self.relative(tree, files)
+
+    def test_missing_root(self, tmp_path):
+        """Test that a missing root yields no files instead of raising."""
+        assert walk_source_files(str(tmp_path / "missing"), ["*.py"]) == []
+
+    @pytest.mark.skipif(not hasattr(os, 'symlink'), reason="symlinks not supported")
+    def test_directory_symlinks_are_not_followed(self, tree):
+        """Test that symlinked directories are not walked into."""
+        try:
+            os.symlink(tree / "pkg", tree / "link", target_is_directory=True)
+        except OSError:
+            pytest.skip("symlinks not permitted")
+
+        files = walk_source_files(str(tree), ["*.py"], blocked_dirs={"node_modules", ".git"})
+
+        assert not any(path.startswith("link/") for path in self.relative(tree, files))
+
+
+PYTHON_SOURCE = """import os
+import json as js
+from pathlib import Path
+from . import sibling
+
+
+def public(value):
+    '''Double a value.'''
+    def helper():
+        return value
+    return helper() * 2
+
+
+def stub():
+    '''Not implemented yet.'''
+    ...
+
+
+def _private():
+    pass
+
+
+@decorator
+def decorated(path):
+    # only a comment and a pass
+    pass
+
+
+class Service:
+    import logging
+
+    def __init__(self):
+        self.ready = True
+
+    @property
+    def name(self):
+        return "service"
+
+    def _hidden(self):
+        return 1
+
+    def run(self, items):
+        for item in items:
+            print(item)
+        return len(items)
+
+    class Nested:
+        def inner(self):
+            raise NotImplementedError
+"""
+
+
+def definition_summary(functions):
+    """Fields of extracted functions that both implementations must agree on."""
+    return [
+        (func['qualified_name'], func['class_name'], func['line_number'], func['trivial'], func['source'])
+        for func in functions
+    ]
+
+
+class TestExtractPythonDefinitions:
+    """Test cases for extract_python_definitions."""
+
+    @pytest.fixture
+    def ast_only(self, monkeypatch):
+        """Force the ast implementation."""
+        monkeypatch.setattr(utils, '_python_parser', None)
+        monkeypatch.setattr(utils, '_python_parser_failed', True)
+
+    def test_ast_definitions(self, ast_only):
+        """Test the functions, imports and trivial flags found by the ast path."""
+        functions, imports = extract_python_definitions(PYTHON_SOURCE)
+
+        assert [(name, trivial) for name, _, _, trivial, _ in definition_summary(functions)] == [
+            ('public', False),
+            ('stub', True),
+            ('decorated', True),
+            ('Service.__init__', False),
+            ('Service.name', True),
+            ('Service.run', False),
+            ('Nested.inner', True),
+        ]
+        assert imports == ['json', 'logging', 'os', 'pathlib']
+
+    def test_unparseable_source(self, ast_only):
+        """Test that syntax errors yield no definitions."""
+        assert extract_python_definitions("def broken(:\n    pass\n") == ([], [])
+
+    @pytest.mark.skipif(not utils.TREE_SITTER_AVAILABLE, reason="tree_sitter_languages not installed")
+    def test_tree_sitter_matches_ast(self, monkeypatch):
+        """Test that the tree-sitter path agrees with the ast path."""
+        parser = utils._get_python_parser()
+        if parser is None:
+            pytest.skip("tree-sitter Python parser could not be built")
+
+        functions, imports = utils._extract_python_definitions_tree_sitter(parser, PYTHON_SOURCE)
+        monkeypatch.setattr(utils, '_python_parser', None)
+        monkeypatch.setattr(utils, '_python_parser_failed', True)
+        ast_functions, ast_imports = extract_python_definitions(PYTHON_SOURCE)
+
+        assert definition_summary(functions) == definition_summary(ast_functions)
+        assert imports == ast_imports
+
+    @pytest.mark.skipif(not utils.TREE_SITTER_AVAILABLE, reason="tree_sitter_languages not installed")
+    def test_tree_sitter_rejects_syntax_errors(self):
+        """Test that the tree-sitter path yields nothing for unparseable source, like ast."""
+        parser = utils._get_python_parser()
+        if parser is None:
+            pytest.skip("tree-sitter Python parser could not be built")
+
+        assert utils._extract_python_definitions_tree_sitter(parser, "def broken(:\n    pass\n") == ([], [])
+
+    def test_parser_failure_falls_back_to_ast(self, monkeypatch, ast_only):
+        """Test that a tree-sitter parser that cannot be built falls back to ast."""
+        expected = extract_python_definitions(PYTHON_SOURCE)
+
+        def broken_parser(language):
+            raise TypeError("__init__() takes exactly 1 argument (2 given)")
+
+        monkeypatch.setattr(utils, 'TREE_SITTER_AVAILABLE', True)
+        monkeypatch.setattr(utils, 'get_tree_sitter_parser', broken_parser, raising=False)
+        monkeypatch.setattr(utils, '_python_parser_failed', False)
+
+        assert extract_python_definitions(PYTHON_SOURCE) == expected
+        assert utils._python_parser_failed is True
@@ -3,244 +3,316 @@ Unit tests for VertexAIClient
 """
 
 import pytest
+import asyncio
 import os
-from unittest.mock import Mock, patch, MagicMock
+import threading
+import time
+from unittest.mock import Mock, AsyncMock
 import sys
 from pathlib import Path
+from types import SimpleNamespace
 
 # Add the CI Code Companion to Python path
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
-from src.ci_code_companion.vertex_ai_client import VertexAIClient
+from ci_code_companion_sdk.core.exceptions import ConfigurationError
+from ci_code_companion_sdk.integrations import vertex_ai_client
+from ci_code_companion_sdk.integrations.vertex_ai_client import VertexAIClient, RateLimiter
+
+
+def make_response(text, finish_reason="STOP"):
+    """Build a Gemini-style response with a single text part."""
+    candidate = SimpleNamespace(
+        finish_reason=SimpleNamespace(name=finish_reason),
+        content=SimpleNamespace(parts=[SimpleNamespace(text=text)])
+    )
+    return SimpleNamespace(candidates=[candidate], text=text)
 
 
 class TestVertexAIClient:
     """Test cases for VertexAIClient."""
-    
+
+    @pytest.fixture(autouse=True)
+    def vertex_mocks(self, monkeypatch):
+        """Patch the lazily imported Vertex AI SDK for every test."""
+        mocks = SimpleNamespace(
+            vertexai=Mock(),
+            generative_model=Mock(),
+            model=Mock()
+        )
+        mocks.generative_model.return_value = mocks.model
+        mocks.model.generate_content_async = AsyncMock()
+
+        monkeypatch.setattr(vertex_ai_client, 'VERTEX_AI_AVAILABLE', True)
+        monkeypatch.setattr(vertex_ai_client, 'vertexai', mocks.vertexai)
+        monkeypatch.setattr(vertex_ai_client, 'GenerativeModel', mocks.generative_model)
+        monkeypatch.setattr(vertex_ai_client, 'GenerationConfig', Mock())
+        monkeypatch.delenv('VERTEX_AI_CACHE_PATH', raising=False)
+        vertex_ai_client._build_generation_config.cache_clear()
+        return mocks
+
+    @pytest.fixture
+    def client(self, vertex_mocks):
+        """Client built against the patched SDK."""
+        return VertexAIClient(self.project_id, self.location, model_name=self.model_name)
+
     def setup_method(self):
         """Set up test fixtures."""
         self.project_id = "test-project"
         self.location = "us-central1"
-    
-    @patch('src.ci_code_companion.vertex_ai_client.aiplatform')
-    @patch('src.ci_code_companion.vertex_ai_client.CodeGenerationModel')
-    @patch('src.ci_code_companion.vertex_ai_client.CodeChatModel')
-    def test_client_initialization(self, mock_chat_model, mock_gen_model, mock_aiplatform):
+        self.model_name = "gemini-test"
+
+    def test_client_initialization(self, vertex_mocks, client):
         """Test client initialization."""
-        # Mock the model instances
-        mock_gen_instance = Mock()
-        mock_chat_instance = Mock()
-        mock_gen_model.from_pretrained.return_value = mock_gen_instance
-        mock_chat_model.from_pretrained.return_value = mock_chat_instance
-        
-        # Initialize client
-        client = VertexAIClient(self.project_id, self.location)
-        
         # Verify initialization
         assert client.project_id == self.project_id
         assert client.location == self.location
-        mock_aiplatform.init.assert_called_once_with(
-            project=self.project_id, 
-            location=self.location
+        assert client.model_name == self.model_name
+        vertex_mocks.vertexai.init.assert_called_once_with(
+            project=self.project_id,
+            location=self.location,
+            credentials=None
         )
-    
-    @patch('src.ci_code_companion.vertex_ai_client.aiplatform')
-    @patch('src.ci_code_companion.vertex_ai_client.CodeGenerationModel')
-    @patch('src.ci_code_companion.vertex_ai_client.CodeChatModel')
-    def test_generate_code_success(self, mock_chat_model, mock_gen_model, mock_aiplatform):
-        """Test successful code generation."""
-        # Mock the model response
-        mock_response = Mock()
-        mock_response.text = "def hello():\n    return 'Hello, World!'"
-        
-        mock_gen_instance = Mock()
-        mock_gen_instance.predict.return_value = mock_response
-        mock_gen_model.from_pretrained.return_value = mock_gen_instance
-        mock_chat_model.from_pretrained.return_value = Mock()
-        
-        # Initialize client and generate code
+        vertex_mocks.generative_model.assert_called_once_with(self.model_name)
+
+    def test_initialization_without_model_name(self, monkeypatch):
+        """Test that initialization fails without a model name."""
+        monkeypatch.delenv('GEMINI_MODEL', raising=False)
+
+        with pytest.raises(ConfigurationError):
+            VertexAIClient(self.project_id, self.location)
+
+    def test_initialization_model_from_environment(self, monkeypatch, vertex_mocks):
+        """Test that the model name is read from GEMINI_MODEL."""
+        monkeypatch.setenv('GEMINI_MODEL', 'gemini-from-env')
+
         client = VertexAIClient(self.project_id, self.location)
-        result = client.generate_code("Generate a hello function")
-        
-        # Verify result
-        assert result == "def hello():\n    return 'Hello, World!'"
-        mock_gen_instance.predict.assert_called_once()
-    
-    @patch('src.ci_code_companion.vertex_ai_client.aiplatform')
-    @patch('src.ci_code_companion.vertex_ai_client.CodeGenerationModel')
-    @patch('src.ci_code_companion.vertex_ai_client.CodeChatModel')
-    def test_analyze_code_success(self, mock_chat_model, mock_gen_model, mock_aiplatform):
+
+        assert client.model_name == 'gemini-from-env'
+        vertex_mocks.generative_model.assert_called_once_with('gemini-from-env')
+
+    def test_initialization_with_credentials_path(self, monkeypatch, tmp_path):
+        """Test initialization with credentials path."""
+        monkeypatch.setenv('GOOGLE_APPLICATION_CREDENTIALS', '/path/to/creds.json')
+        credentials_file = tmp_path / "service-account.json"
+        credentials_file.write_text("{}")
+
+        # Initialize with credentials path
+        VertexAIClient(
+            self.project_id,
+            self.location,
+            model_name=self.model_name,
+            credentials_path=str(credentials_file)
+        )
+
+        # Verify environment variable was set
+        assert os.environ['GOOGLE_APPLICATION_CREDENTIALS'] == str(credentials_file)
+
+    def test_initialization_failure_raises_configuration_error(self, vertex_mocks):
+        """Test that SDK initialization errors are wrapped."""
+        vertex_mocks.vertexai.init.side_effect = Exception("Permission denied")
+
+        with pytest.raises(ConfigurationError):
+            VertexAIClient(self.project_id, self.location, model_name=self.model_name)
+
+    def test_analyze_with_enhanced_prompt_success(self, vertex_mocks, client):
         """Test successful code analysis."""
-        # Mock the chat model and session
-        mock_response = Mock()
-        mock_response.text = "The code looks good but could use better error handling."
-        
-        mock_session = Mock()
-        mock_session.send_message.return_value = mock_response
-        
-        mock_chat_instance = Mock()
-        mock_chat_instance.start_chat.return_value = mock_session
-        mock_chat_model.from_pretrained.return_value = mock_chat_instance
-        mock_gen_model.from_pretrained.return_value = Mock()
-        
-        # Initialize client and analyze code
-        client = VertexAIClient(self.project_id, self.location)
-        result = client.analyze_code("def test(): pass", "review")
-        
-        # Verify result
-        assert "error handling" in result
-        mock_chat_instance.start_chat.assert_called_once()
-        mock_session.send_message.assert_called_once()
-    
-    @patch('src.ci_code_companion.vertex_ai_client.aiplatform')
-    @patch('src.ci_code_companion.vertex_ai_client.CodeGenerationModel')
-    @patch('src.ci_code_companion.vertex_ai_client.CodeChatModel')
-    def test_generate_unit_tests(self, mock_chat_model, mock_gen_model, mock_aiplatform):
-        """Test unit test generation."""
-        # Mock the model response
-        mock_response = Mock()
-        mock_response.text = "def test_add():\n    assert add(2, 3) == 5"
-        
-        mock_gen_instance = Mock()
-        mock_gen_instance.predict.return_value = mock_response
-        mock_gen_model.from_pretrained.return_value = mock_gen_instance
-        mock_chat_model.from_pretrained.return_value = Mock()
-        
-        # Initialize client and generate tests
-        client = VertexAIClient(self.project_id, self.location)
-        result = client.generate_unit_tests("def add(a, b): return a + b")
-        
+        vertex_mocks.model.generate_content_async.return_value = make_response(
+            "The code looks good but could use better error handling."
+        )
+
+        result = asyncio.run(client.analyze_with_enhanced_prompt("Review this code", {}))
+
         # Verify result
-        assert "test_add" in result
-        assert "assert" in result
-        mock_gen_instance.predict.assert_called_once()
-    
-    @patch('src.ci_code_companion.vertex_ai_client.aiplatform')
-    @patch('src.ci_code_companion.vertex_ai_client.CodeGenerationModel')
-    @patch('src.ci_code_companion.vertex_ai_client.CodeChatModel')
-    def test_health_check_healthy(self, mock_chat_model, mock_gen_model, mock_aiplatform):
+        assert result['success'] is True
+        assert "error handling" in result['text']
+        assert result['metadata']['model_used'] == self.model_name
+        assert result['metadata']['cache_hit'] is False
+        vertex_mocks.model.generate_content_async.assert_awaited_once()
+
+    def test_analyze_with_enhanced_prompt_served_from_cache(self, vertex_mocks, client):
+        """Test that an identical prompt is answered from the response cache."""
+        vertex_mocks.model.generate_content_async.return_value = make_response("Analysis result")
+
+        asyncio.run(client.analyze_with_enhanced_prompt("Review this code", {}))
+        result = asyncio.run(client.analyze_with_enhanced_prompt("Review this code", {}))
+
+        assert result['success'] is True
+        assert result['text'] == "Analysis result"
+        assert result['metadata']['cache_hit'] is True
+        assert client.cache_stats['hits'] == 1
+        vertex_mocks.model.generate_content_async.assert_awaited_once()
+
+    def test_analyze_without_cache_sends_every_request(self, vertex_mocks, client):
+        """Test that use_cache=False bypasses the response cache."""
+        vertex_mocks.model.generate_content_async.return_value = make_response("Analysis result")
+
+        asyncio.run(client.analyze_with_enhanced_prompt("Review this code", {}, use_cache=False))
+        asyncio.run(client.analyze_with_enhanced_prompt("Review this code", {}, use_cache=False))
+
+        assert vertex_mocks.model.generate_content_async.await_count == 2
+
+    @pytest.mark.parametrize('finish_reason', ['SAFETY', 'RECITATION', 'OTHER'])
+    def test_analyze_with_enhanced_prompt_blocked(self, vertex_mocks, client, finish_reason):
+        """Test that blocked or stopped responses fail and are not cached."""
+        vertex_mocks.model.generate_content_async.return_value = make_response("", finish_reason)
+
+        result = asyncio.run(client.analyze_with_enhanced_prompt("Review this code", {}))
+
+        # Verify result and that nothing was cached
+        assert result['success'] is False
+        assert result['metadata']['finish_reason'] == finish_reason
+        assert len(client.response_cache) == 0
+
+    def test_analyze_prompt_too_large(self, monkeypatch, vertex_mocks, client):
+        """Test that a prompt over the context budget is rejected without a request."""
+        monkeypatch.setattr(vertex_ai_client, 'PROMPT_TOKEN_BUDGET', 10)
+
+        result = asyncio.run(client.analyze_with_enhanced_prompt("Review this code", {}))
+
+        assert result['success'] is False
+        assert result['metadata']['finish_reason'] == 'PROMPT_TOO_LARGE'
+        vertex_mocks.model.generate_content_async.assert_not_awaited()
+
+    def test_clear_cache(self, vertex_mocks, client):
+        """Test that clearing the cache forces a new request."""
+        vertex_mocks.model.generate_content_async.return_value = make_response("Analysis result")
+
+        asyncio.run(client.analyze_with_enhanced_prompt("Review this code", {}))
+        client.clear_cache()
+        asyncio.run(client.analyze_with_enhanced_prompt("Review this code", {}))
+
+        assert len(client.response_cache) == 1
+        assert vertex_mocks.model.generate_content_async.await_count == 2
+
+    def test_health_check_healthy(self, vertex_mocks, client):
         """Test health check when service is healthy."""
         # Mock successful response
-        mock_response = Mock()
-        mock_response.text = "def hello(): return 'Hello'"
-        
-        mock_gen_instance = Mock()
-        mock_gen_instance.predict.return_value = mock_response
-        mock_gen_model.from_pretrained.return_value = mock_gen_instance
-        mock_chat_model.from_pretrained.return_value = Mock()
-        
-        # Initialize client and check health
-        client = VertexAIClient(self.project_id, self.location)
+        vertex_mocks.model.generate_content.return_value = make_response("Hello")
+
         health = client.health_check()
-        
+
         # Verify health status
         assert health['status'] == 'healthy'
         assert health['project_id'] == self.project_id
         assert health['location'] == self.location
-        assert 'test_response_length' in health
-        assert health['models_available']['code_generation'] is True
-    
-    @patch('src.ci_code_companion.vertex_ai_client.aiplatform')
-    @patch('src.ci_code_companion.vertex_ai_client.CodeGenerationModel')
-    @patch('src.ci_code_companion.vertex_ai_client.CodeChatModel')
-    def test_health_check_unhealthy(self, mock_chat_model, mock_gen_model, mock_aiplatform):
+        assert health['model'] == self.model_name
+        assert health['test_response'] == "Hello"
+
+    def test_health_check_unhealthy(self, vertex_mocks, client):
         """Test health check when service is unhealthy."""
         # Mock exception during health check
-        mock_gen_instance = Mock()
-        mock_gen_instance.predict.side_effect = Exception("API Error")
-        mock_gen_model.from_pretrained.return_value = mock_gen_instance
-        mock_chat_model.from_pretrained.return_value = Mock()
-        
-        # Initialize client and check health
-        client = VertexAIClient(self.project_id, self.location)
+        vertex_mocks.model.generate_content.side_effect = Exception("API Error")
+
         health = client.health_check()
-        
+
         # Verify unhealthy status
         assert health['status'] == 'unhealthy'
         assert 'error' in health
         assert health['project_id'] == self.project_id
-    
-    def test_initialization_without_project_id(self):
-        """Test that initialization fails without project ID."""
-        with pytest.raises(Exception):
-            # This should fail because aiplatform.init will be called
-            # In real usage, this would be caught by the aiplatform library
-            pass
-    
-    @patch.dict(os.environ, {'GOOGLE_APPLICATION_CREDENTIALS': '/path/to/creds.json'})
-    @patch('src.ci_code_companion.vertex_ai_client.aiplatform')
-    @patch('src.ci_code_companion.vertex_ai_client.CodeGenerationModel')
-    @patch('src.ci_code_companion.vertex_ai_client.CodeChatModel')
-    def test_initialization_with_credentials_path(self, mock_chat_model, mock_gen_model, mock_aiplatform):
-        """Test initialization with credentials path."""
-        mock_gen_model.from_pretrained.return_value = Mock()
-        mock_chat_model.from_pretrained.return_value = Mock()
-        
-        # Initialize with credentials path
-        client = VertexAIClient(
-            self.project_id, 
-            self.location, 
-            credentials_path="/path/to/service-account.json"
-        )
-        
-        # Verify environment variable was set
-        assert os.environ['GOOGLE_APPLICATION_CREDENTIALS'] == "/path/to/service-account.json"
-    
-    @patch('src.ci_code_companion.vertex_ai_client.aiplatform')
-    @patch('src.ci_code_companion.vertex_ai_client.CodeGenerationModel')
-    @patch('src.ci_code_companion.vertex_ai_client.CodeChatModel')
-    def test_generate_code_with_parameters(self, mock_chat_model, mock_gen_model, mock_aiplatform):
-        """Test code generation with custom parameters."""
-        mock_response = Mock()
-        mock_response.text = "generated code"
-        
-        mock_gen_instance = Mock()
-        mock_gen_instance.predict.return_value = mock_response
-        mock_gen_model.from_pretrained.return_value = mock_gen_instance
-        mock_chat_model.from_pretrained.return_value = Mock()
-        
-        # Initialize client
-        client = VertexAIClient(self.project_id, self.location)
-        
-        # Generate code with custom parameters
-        result = client.generate_code(
-            prompt="test prompt",
-            max_output_tokens=512,
-            temperature=0.5,
-            candidate_count=2
-        )
-        
-        # Verify the predict method was called with correct parameters
-        mock_gen_instance.predict.assert_called_once_with(
-            prompt="test prompt",
-            max_output_tokens=512,
-            temperature=0.5,
-            candidate_count=2
-        )
-        assert result == "generated code"
-    
-    @patch('src.ci_code_companion.vertex_ai_client.aiplatform')
-    @patch('src.ci_code_companion.vertex_ai_client.CodeGenerationModel')
-    @patch('src.ci_code_companion.vertex_ai_client.CodeChatModel')
-    def test_analyze_code_different_types(self, mock_chat_model, mock_gen_model, mock_aiplatform):
-        """Test different analysis types."""
-        mock_response = Mock()
-        mock_response.text = "Analysis result"
-        
-        mock_session = Mock()
-        mock_session.send_message.return_value = mock_response
-        
-        mock_chat_instance = Mock()
-        mock_chat_instance.start_chat.return_value = mock_session
-        mock_chat_model.from_pretrained.return_value = mock_chat_instance
-        mock_gen_model.from_pretrained.return_value = Mock()
-        
-        client = VertexAIClient(self.project_id, self.location)
-        
-        # Test different analysis types
-        for analysis_type in ["review", "security", "performance"]:
-            result = client.analyze_code("test code", analysis_type)
-            assert result == "Analysis result"
-            
-        # Verify calls were made
-        assert mock_session.send_message.call_count == 3 
\ No newline at end of file
+
+    def test_health_check_result_is_reused(self, vertex_mocks, client):
+        """Test that health checks within the TTL do not call the model again."""
+        vertex_mocks.model.generate_content.return_value = make_response("Hello")
+
+        client.health_check()
+        client.health_check()
+
+        vertex_mocks.model.generate_content.assert_called_once()
+
+
+class TestRateLimiter:
+    """Test cases for RateLimiter."""
+
+    def test_acquire_and_release(self):
+        """Test that a slot is held between acquire and release."""
+        limiter = RateLimiter(max_concurrency=2)
+
+        async def run():
+            await limiter.acquire(100)
+            assert limiter.in_flight == 1
+            assert limiter.tokens_in_window == 100
+            await limiter.release(0.1)
+
+        asyncio.run(run())
+        assert limiter.in_flight == 0
+
+    def test_waits_for_free_slot(self):
+        """Test that acquire blocks at max concurrency until a slot is released."""
+        limiter = RateLimiter(max_concurrency=1)
+        order = []
+
+        async def worker(name):
+            await limiter.acquire(1)
+            order.append(f"start {name}")
+            await asyncio.sleep(0.05)
+            order.append(f"end {name}")
+            await limiter.release(0.05)
+
+        async def run():
+            await asyncio.gather(worker('a'), worker('b'))
+
+        asyncio.run(run())
+        assert order == ['start a', 'end a', 'start b', 'end b']
+        assert limiter._waiters == []
+
+    def test_waits_for_request_window(self):
+        """Test that acquire waits for the oldest request to leave a full window."""
+        limiter = RateLimiter(requests_per_minute=1)
+        limiter.WINDOW_SECONDS = 0.2
+
+        async def run():
+            await limiter.acquire(1)
+            await limiter.release(0.01)
+            start = time.monotonic()
+            await limiter.acquire(1)
+            return time.monotonic() - start
+
+        assert asyncio.run(run()) >= 0.15
+
+    def test_concurrency_adapts(self):
+        """Test that throttling halves concurrency and fast requests grow it back."""
+        limiter = RateLimiter(max_concurrency=8, target_latency=1.0)
+
+        async def run(latency, throttled):
+            await limiter.acquire(1)
+            await limiter.release(latency, throttled=throttled)
+
+        asyncio.run(run(0.1, True))
+        assert limiter.concurrency == 4.0
+        asyncio.run(run(0.1, False))
+        assert limiter.concurrency == pytest.approx(4.1)
+        asyncio.run(run(5.0, False))
+        assert limiter.concurrency == pytest.approx(4.1)
+
+        for _ in range(4):
+            asyncio.run(run(0.1, True))
+        assert limiter.concurrency == 1.0
+
+    def test_shared_across_event_loops(self):
+        """Test that a release on one loop wakes a waiter on another thread's loop."""
+        limiter = RateLimiter(max_concurrency=1)
+        acquired = threading.Event()
+        finished = []
+
+        async def holder():
+            await limiter.acquire(1)
+            acquired.set()
+            await asyncio.sleep(0.1)
+            await limiter.release(0.1)
+
+        async def waiter():
+            await limiter.acquire(1)
+            finished.append(time.monotonic())
+            await limiter.release(0.01)
+
+        thread = threading.Thread(target=lambda: asyncio.run(holder()))
+        thread.start()
+        acquired.wait()
+        start = time.monotonic()
+        asyncio.run(asyncio.wait_for(waiter(), timeout=5))
+        thread.join()
+
+        assert finished and finished[0] - start < 1.0
+        assert limiter.in_flight == 0
+        assert limiter._waiters == []
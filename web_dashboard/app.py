@@ -5,14 +5,19 @@ Visualizes AI-powered code analysis results
 
 from flask import Flask, render_template, jsonify, session, redirect, url_for, request
 from flask_cors import CORS
+from http.cookiejar import DefaultCookiePolicy
 import json
+import hashlib
 import os
 import logging
-import asyncio
 from datetime import datetime
+from functools import lru_cache
 from routes.gitlab_api import gitlab_bp, init_gitlab
-from config.gitlab_config import GitLabConfig
+from config.gitlab_config import get_gitlab_config
 from dotenv import load_dotenv
+import requests
+from requests.adapters import HTTPAdapter
+import threading
 import time
 
 # Configure logging
@@ -56,7 +61,7 @@ app.config.update(
 )
 
 # Initialize GitLab connection
-gitlab_config = GitLabConfig()
+gitlab_config = get_gitlab_config()
 if gitlab_config.is_configured:
     init_success = init_gitlab(gitlab_config.url, gitlab_config.token)
     if init_success:
@@ -79,6 +84,7 @@ try:
     
     from ci_code_companion_sdk import CICodeCompanionSDK, SDKConfig
     from ci_code_companion_sdk.core.exceptions import SDKError, AnalysisError, ConfigurationError
+    from ci_code_companion_sdk.core.utils import run_ai_task
     
     # Initialize SDK with streamlined configuration
     sdk_config = SDKConfig({
@@ -103,15 +109,81 @@ except Exception as e:
     logger.error(f"Failed to initialize CI Code Companion SDK: {e}")
     ci_sdk = None
 
-def run_async(coro):
-    """Helper function to run async functions in Flask routes"""
+# Authenticated GitLab clients by OAuth token digest. Authenticating is an HTTP
+# round trip, and the dashboard and status endpoint check the session token on
+# every load; a client is reused until shortly before GitLab OAuth tokens expire,
+# and its token is checked again once GITLAB_TOKEN_VALIDITY_TTL has passed, so a
+# revoked token stops showing as connected within that time.
+# Rejected tokens are remembered briefly so repeated hits fail without a round trip.
+GITLAB_CLIENT_TTL = 55 * 60
+GITLAB_TOKEN_VALIDITY_TTL = 300
+GITLAB_REJECTED_TOKEN_TTL = 10
+_gitlab_clients = {}
+_rejected_gitlab_tokens = {}
+_gitlab_clients_lock = threading.Lock()
+
+# One connection pool to gitlab.com shared by all clients, so new clients skip
+# the TCP and TLS handshake. Tokens travel in per-client headers; cookies are
+# refused so nothing set for one user is sent on behalf of another.
+_gitlab_session = requests.Session()
+_gitlab_session.mount('https://', HTTPAdapter(pool_connections=10, pool_maxsize=20))
+_gitlab_session.cookies.set_policy(DefaultCookiePolicy(allowed_domains=[]))
+
+def _gitlab_token_key(token):
+    """Cache key for an OAuth token, so raw tokens are not kept in memory"""
+    return hashlib.sha256(token.encode('utf-8')).hexdigest()
+
+def get_gitlab_client(token):
+    """Return an authenticated GitLab client for an OAuth token, reusing a recent one"""
+    import gitlab
+    
+    now = time.time()
+    token_key = _gitlab_token_key(token)
+    entry = _gitlab_clients.get(token_key)
+    if entry and now - entry['timestamp'] < GITLAB_CLIENT_TTL:
+        if now - entry['validated'] < GITLAB_TOKEN_VALIDITY_TTL:
+            return entry['client']
+        # Keep the client, but confirm the token is still accepted
+        gl = entry['client']
+        created = entry['timestamp']
+    else:
+        rejected_at = _rejected_gitlab_tokens.get(token_key)
+        if rejected_at and now - rejected_at < GITLAB_REJECTED_TOKEN_TTL:
+            raise gitlab.exceptions.GitlabAuthenticationError("GitLab token was rejected")
+        gl = gitlab.Gitlab('https://gitlab.com', oauth_token=token, session=_gitlab_session)
+        created = now
+    
     try:
-        loop = asyncio.get_event_loop()
-    except RuntimeError:
-        loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(loop)
+        gl.auth()
+    except gitlab.exceptions.GitlabAuthenticationError:
+        with _gitlab_clients_lock:
+            _gitlab_clients.pop(token_key, None)
+            _rejected_gitlab_tokens[token_key] = now
+        raise
     
-    return loop.run_until_complete(coro)
+    with _gitlab_clients_lock:
+        expired = [key for key, cached in _gitlab_clients.items() if now - cached['timestamp'] >= GITLAB_CLIENT_TTL]
+        for key in expired:
+            del _gitlab_clients[key]
+        expired = [key for key, rejected in _rejected_gitlab_tokens.items() if now - rejected >= GITLAB_REJECTED_TOKEN_TTL]
+        for key in expired:
+            del _rejected_gitlab_tokens[key]
+        _gitlab_clients[token_key] = {'client': gl, 'timestamp': created, 'validated': now}
+        _rejected_gitlab_tokens.pop(token_key, None)
+    return gl
+
+def forget_gitlab_client(token):
+    """Drop the cached client for a token that GitLab no longer accepts"""
+    if not token:
+        return
+    with _gitlab_clients_lock:
+        _gitlab_clients.pop(_gitlab_token_key(token), None)
+
+def run_async(coro):
+    """Helper function to run async functions in Flask routes"""
+    # ci_sdk's Vertex AI client is bound to one event loop, so every request
+    # runs on the SDK's shared loop instead of a loop per worker thread
+    return run_ai_task(coro)
 
 @app.route('/app-test-route')
 def app_test_route():
@@ -125,15 +197,13 @@ def dashboard():
     # Clear any stale session data if GitLab token exists but is invalid
     if 'gitlab_token' in session:
         try:
-            import gitlab
-            gl = gitlab.Gitlab('https://gitlab.com', oauth_token=session['gitlab_token'])
-            gl.auth()
+            gl = get_gitlab_client(session['gitlab_token'])
             # Get current user info
             current_user = gl.user
             logger.debug(f"GitLab token is valid for user: {current_user.username}")
         except Exception as e:
             logger.warning(f"Found invalid GitLab token in session, clearing it: {str(e)}")
-            session.pop('gitlab_token', None)
+            forget_gitlab_client(session.pop('gitlab_token', None))
     
     gitlab_connected = 'gitlab_token' in session
     logger.info(f"GitLab connection status: {'Connected' if gitlab_connected else 'Not connected'}")
@@ -148,35 +218,78 @@ def dashboard():
         sdk_status=sdk_status
     )
 
-@app.route('/api/recent-analyses')
-def recent_analyses():
-    """API endpoint for recent AI analyses."""
-    # This would normally fetch from database
-    sample_data = [
+# Sample analysis data served until results are read from the database. The
+# payloads never change, so they are encoded once instead of on every request.
+SAMPLE_RECENT_ANALYSES = [
+    {
+        "id": 1,
+        "project": "user-auth-service",
+        "commit": "a1b2c3d",
+        "timestamp": "2024-01-20 14:30:00",
+        "code_quality": 8.5,
+        "security_score": 7.2,
+        "tests_generated": 12,
+        "issues_found": 3,
+        "status": "completed"
+    },
+    {
+        "id": 2,
+        "project": "payment-processor",
+        "commit": "e4f5g6h",
+        "timestamp": "2024-01-20 13:15:00",
+        "code_quality": 9.1,
+        "security_score": 9.5,
+        "tests_generated": 8,
+        "issues_found": 1,
+        "status": "completed"
+    }
+]
+
+SAMPLE_ANALYSIS_DETAIL = {
+    "id": None,
+    "project": "user-auth-service",
+    "commit": "a1b2c3d",
+    "timestamp": "2024-01-20 14:30:00",
+    "overall_score": 8.5,
+    "metrics": {
+        "code_quality": 8.5,
+        "security_score": 7.2,
+        "performance_score": 8.0,
+        "maintainability": 9.0
+    },
+    "issues": [
         {
             "id": 1,
-            "project": "user-auth-service",
-            "commit": "a1b2c3d",
-            "timestamp": "2024-01-20 14:30:00",
-            "code_quality": 8.5,
-            "security_score": 7.2,
-            "tests_generated": 12,
-            "issues_found": 3,
-            "status": "completed"
-        },
+            "type": "Security",
+            "severity": "High",
+            "description": "Potential SQL injection vulnerability in user query",
+            "file": "auth/models.py",
+            "line": 45,
+            "suggestion": "Use parameterized queries instead of string concatenation"
+        }
+    ],
+    "tests_generated": [
         {
-            "id": 2,
-            "project": "payment-processor",
-            "commit": "e4f5g6h",
-            "timestamp": "2024-01-20 13:15:00",
-            "code_quality": 9.1,
-            "security_score": 9.5,
-            "tests_generated": 8,
-            "issues_found": 1,
-            "status": "completed"
+            "file": "auth/test_models.py",
+            "framework": "pytest",
+            "test_cases": 8,
+            "coverage_area": "User authentication logic"
         }
     ]
-    return jsonify(sample_data)
+}
+
+_recent_analyses_json = json.dumps(SAMPLE_RECENT_ANALYSES, sort_keys=True, separators=(',', ':'))
+
+@lru_cache(maxsize=256)
+def _analysis_detail_json(analysis_id):
+    """Encoded sample detail payload for an analysis ID"""
+    return json.dumps({**SAMPLE_ANALYSIS_DETAIL, 'id': analysis_id}, sort_keys=True, separators=(',', ':'))
+
+@app.route('/api/recent-analyses')
+def recent_analyses():
+    """API endpoint for recent AI analyses."""
+    # This would normally fetch from database
+    return app.response_class(_recent_analyses_json, mimetype='application/json')
 
 @app.route('/analysis/<int:analysis_id>')
 def analysis_detail(analysis_id):
@@ -186,40 +299,7 @@ def analysis_detail(analysis_id):
 @app.route('/api/analysis/<int:analysis_id>')
 def analysis_data(analysis_id):
     """API endpoint for detailed analysis data."""
-    # Sample detailed analysis data
-    sample_detail = {
-        "id": analysis_id,
-        "project": "user-auth-service",
-        "commit": "a1b2c3d",
-        "timestamp": "2024-01-20 14:30:00",
-        "overall_score": 8.5,
-        "metrics": {
-            "code_quality": 8.5,
-            "security_score": 7.2,
-            "performance_score": 8.0,
-            "maintainability": 9.0
-        },
-        "issues": [
-            {
-                "id": 1,
-                "type": "Security",
-                "severity": "High",
-                "description": "Potential SQL injection vulnerability in user query",
-                "file": "auth/models.py",
-                "line": 45,
-                "suggestion": "Use parameterized queries instead of string concatenation"
-            }
-        ],
-        "tests_generated": [
-            {
-                "file": "auth/test_models.py",
-                "framework": "pytest",
-                "test_cases": 8,
-                "coverage_area": "User authentication logic"
-            }
-        ]
-    }
-    return jsonify(sample_detail)
+    return app.response_class(_analysis_detail_json(analysis_id), mimetype='application/json')
 
 @app.route('/api/connected-projects')
 def connected_projects():
@@ -228,8 +308,7 @@ def connected_projects():
         return jsonify([])
     
     try:
-        import gitlab
-        gl = gitlab.Gitlab('https://gitlab.com', oauth_token=session['gitlab_token'])
+        gl = get_gitlab_client(session['gitlab_token'])
         projects = gl.projects.list(owned=True, all=True)
         
         project_list = []
@@ -244,6 +323,7 @@ def connected_projects():
         return jsonify(project_list)
     except Exception as e:
         logger.error(f"Error fetching GitLab projects: {str(e)}")
+        forget_gitlab_client(session['gitlab_token'])
         return jsonify([])
 
 @app.route('/api/gitlab/status')
@@ -257,9 +337,7 @@ def gitlab_status():
         })
     
     try:
-        import gitlab
-        gl = gitlab.Gitlab('https://gitlab.com', oauth_token=session['gitlab_token'])
-        gl.auth()
+        gl = get_gitlab_client(session['gitlab_token'])
         current_user = gl.user
         
         return jsonify({
@@ -274,7 +352,7 @@ def gitlab_status():
     except Exception as e:
         logger.error(f"GitLab status check failed: {str(e)}")
         # Clear invalid token
-        session.pop('gitlab_token', None)
+        forget_gitlab_client(session.pop('gitlab_token', None))
         return jsonify({
             'connected': False,
             'user': None,
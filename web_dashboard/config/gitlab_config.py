@@ -5,6 +5,7 @@ GitLab Integration Configuration for CI Code Companion Dashboard
 import os
 import logging
 import re
+from functools import lru_cache
 from typing import Dict, Optional
 from urllib.parse import quote
 
@@ -77,4 +78,15 @@ class GitLabConfig:
             'app_id': self.app_id,
             'redirect_uri': self.redirect_uri,
             'scope': self.scope
-        } 
\ No newline at end of file
+        }
+
+
+@lru_cache(maxsize=1)
+def get_gitlab_config() -> GitLabConfig:
+    """
+    Return the process-wide GitLab configuration.
+    
+    The environment is read, validated and logged once, however many
+    modules need the configuration.
+    """
+    return GitLabConfig() 
\ No newline at end of file
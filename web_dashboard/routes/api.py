@@ -7,15 +7,16 @@ Enhanced with PromptLoader integration for Cursor-style prompting and Gemini 2.5
 
 import os
 import sys
-import asyncio
 from datetime import datetime, timedelta
 from pathlib import Path
 from flask import Blueprint, jsonify, request, current_app
+import sqlalchemy
 from sqlalchemy import create_engine, text
 from sqlalchemy.orm import sessionmaker
 import logging
 import json
 import random
+import threading
 from typing import Dict, Any, List
 
 # Add SDK to path for imports
@@ -27,6 +28,7 @@ try:
     from ci_code_companion_sdk.core.config import SDKConfig
     from ci_code_companion_sdk.agents.specialized.code.react_code_agent import ReactCodeAgent
     from ci_code_companion_sdk.integrations.vertex_ai_client import VertexAIClient
+    from ci_code_companion_sdk.core.utils import run_ai_task
     SDK_AVAILABLE = True
 except ImportError as e:
     current_app.logger.warning(f"SDK import failed: {e}")
@@ -47,7 +49,65 @@ api = Blueprint('api', __name__, url_prefix='/api/v2')
 # Note: AI system initialization is handled by ai_service.py
 # This file contains only pure API request handlers
 
+# The AI service, and the Vertex AI client and model it holds, is built once per
+# process instead of once per request. Its calls run through run_ai_task on the
+# SDK's process-wide event loop, which the model's async client is bound to.
+_ai_service = None
+_ai_service_lock = threading.Lock()
+
+def get_ai_service():
+    """Return the process-wide AI service, creating it on first use"""
+    global _ai_service
+    if _ai_service is None:
+        with _ai_service_lock:
+            if _ai_service is None:
+                from ci_code_companion_sdk.services.ai_service import StreamlinedAIService
+                from ci_code_companion_sdk.core.config import SDKConfig
+                
+                _ai_service = StreamlinedAIService(SDKConfig(), current_app.logger)
+    return _ai_service
+
+# insertmanyvalues_page_size only exists from SQLAlchemy 2.0; 1.4 pages
+# psycopg2's execute_values through executemany_values_page_size instead
+SQLALCHEMY_2 = int(sqlalchemy.__version__.split('.')[0]) >= 2
+
 # Database setup
+def make_engine(url, analytics_only=False):
+    """Create a SQLAlchemy engine tuned for the write-heavy analysis pipeline.
+    
+    The pool is sized from the CPU count instead of SQLAlchemy's default of 5.
+    On PostgreSQL, psycopg2's batched executemany is enabled so ORM add_all()
+    and bulk inserts are sent in pages of 1000 rows. The page size option is
+    picked by SQLAlchemy version, since the 2.0 insertmanyvalues setting is
+    rejected by 1.4.
+    
+    Args:
+        url: Database URL
+        analytics_only: Disable synchronous commit for fire-and-forget telemetry writes
+        
+    Returns:
+        Configured SQLAlchemy engine
+    """
+    engine_kwargs = {
+        'pool_pre_ping': True
+    }
+    if SQLALCHEMY_2:
+        engine_kwargs['insertmanyvalues_page_size'] = 1000
+    
+    if url.startswith('postgresql'):
+        engine_kwargs.update({
+            'pool_size': (os.cpu_count() or 1) * 2,
+            'max_overflow': 0,
+            'executemany_mode': 'values_plus_batch',
+            'executemany_batch_page_size': 500
+        })
+        if not SQLALCHEMY_2:
+            engine_kwargs['executemany_values_page_size'] = 1000
+        if analytics_only:
+            engine_kwargs['connect_args'] = {'options': '-c synchronous_commit=off'}
+    
+    return create_engine(url, **engine_kwargs)
+
 def init_database():
     """Initialize database connection and create tables if they don't exist"""
     # Placeholder function since old models are commented out
@@ -55,7 +115,7 @@ def init_database():
     return None
     
     # Original code commented out until models are updated
-    # engine = create_engine(current_app.config['DATABASE_URL'])
+    # engine = make_engine(current_app.config['DATABASE_URL'])
     # Session = sessionmaker(bind=engine)
     # return Session()
 
@@ -189,6 +249,43 @@ def get_trend_data(session, days=30):
         current_app.logger.error(f"Error getting trend data: {str(e)}")
         return None
 
+def get_file_stats(session, repository_id):
+    """Aggregate file statistics for a repository without loading file content.
+
+    Only the columns needed for the aggregates are selected, and rows are
+    streamed through a server-side cursor in batches of 1000 so memory stays
+    flat regardless of repository size.
+    """
+    try:
+        result = session.execute(
+            text(
+                "SELECT language, lines_of_code, complexity_score "
+                "FROM code_files WHERE repository_id = :repository_id"
+            ).execution_options(stream_results=True, yield_per=1000),
+            {'repository_id': repository_id}
+        )
+        
+        total_files = 0
+        total_lines = 0
+        complexity_sum = 0.0
+        languages = set()
+        for language, lines_of_code, complexity_score in result:
+            total_files += 1
+            total_lines += lines_of_code or 0
+            complexity_sum += complexity_score or 0.0
+            if language:
+                languages.add(language)
+        
+        return {
+            'total_files': total_files,
+            'total_lines': total_lines,
+            'average_complexity': round(complexity_sum / total_files, 2) if total_files else 0,
+            'languages': sorted(languages)
+        }
+    except Exception as e:
+        current_app.logger.error(f"Error getting file stats: {str(e)}")
+        return None
+
 # API Routes
 
 @api.route('/metrics')
@@ -390,16 +487,25 @@ def gitlab_disconnect():
 def get_repository_context(repo_id):
     """Get comprehensive repository context including file relationships"""
     # Placeholder implementation
+    context = {
+        'repository_id': repo_id,
+        'file_relationships': {},
+        'architecture_context': {},
+        'historical_patterns': {},
+        'security_context': {},
+        'performance_context': {}
+    }
+    
+    session = init_database()
+    if session:
+        try:
+            context['file_stats'] = get_file_stats(session, repo_id)
+        finally:
+            session.close()
+    
     return jsonify({
         'success': True,
-        'context': {
-            'repository_id': repo_id,
-            'file_relationships': {},
-            'architecture_context': {},
-            'historical_patterns': {},
-            'security_context': {},
-            'performance_context': {}
-        }
+        'context': context
     })
 
 @api.route('/repository/<int:repo_id>/file-relationships', methods=['GET'])
@@ -474,22 +580,18 @@ def ai_chat():
         
         # Import and use AI service
         try:
-            from ci_code_companion_sdk.services.ai_service import StreamlinedAIService
-            from ci_code_companion_sdk.core.config import SDKConfig
-            
-            # Initialize AI service
-            config = SDKConfig()
-            ai_service = StreamlinedAIService(config, current_app.logger)
+            # Reuse the process-wide AI service
+            ai_service = get_ai_service()
             
             # Delegate to AI service based on mode
             if mode == 'code':
-                result = asyncio.run(ai_service.handle_code_analysis(message, context, model))
+                result = run_ai_task(ai_service.handle_code_analysis(message, context, model))
             elif mode == 'test':
-                result = asyncio.run(ai_service.handle_test_generation(message, context, model))
+                result = run_ai_task(ai_service.handle_test_generation(message, context, model))
             elif mode == 'security':
-                result = asyncio.run(ai_service.handle_security_analysis(message, context, model))
+                result = run_ai_task(ai_service.handle_security_analysis(message, context, model))
             else:
-                result = asyncio.run(ai_service.handle_general_chat(message, context, model))
+                result = run_ai_task(ai_service.handle_general_chat(message, context, model))
             
             current_app.logger.info(f"✅ API HANDLER: AI service completed, returning result")
             return jsonify(result)
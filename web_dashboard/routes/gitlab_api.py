@@ -1,5 +1,4 @@
 from flask import Blueprint, request, jsonify
-import gitlab
 import base64
 import ast
 import re
@@ -17,6 +16,7 @@ gl = None
 def init_gitlab(gitlab_url, gitlab_token):
     global gl
     try:
+        import gitlab
         gl = gitlab.Gitlab(gitlab_url, private_token=gitlab_token)
         gl.auth()
         return True
@@ -3,12 +3,11 @@ GitLab Integration Routes for CI Code Companion Dashboard
 """
 
 from flask import Blueprint, request, redirect, url_for, jsonify, session, current_app
-import gitlab
 import requests
 import logging
 import os
 from urllib.parse import quote
-from config.gitlab_config import GitLabConfig
+from config.gitlab_config import get_gitlab_config
 import json
 from functools import wraps # Import wraps for creating decorators
 
@@ -17,10 +16,12 @@ logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 gitlab_bp = Blueprint('gitlab_oauth', __name__)
-gitlab_config = GitLabConfig()
+gitlab_config = get_gitlab_config()
 
 def get_gitlab_instance():
     """Helper function to get a GitLab API instance from session token."""
+    import gitlab
+    
     if 'gitlab_token' not in session:
         return None
     try:
@@ -70,6 +71,8 @@ def connect_gitlab():
 @gitlab_bp.route('/callback')
 def gitlab_callback():
     """Handle GitLab OAuth callback."""
+    import gitlab
+    
     logger.info("Received GitLab callback")
     logger.debug("Current session data at start of callback: %s", dict(session))
     logger.debug(f"Full callback URL: {request.url}")
@@ -158,6 +161,8 @@ def gitlab_callback():
 @gitlab_bp.route('/projects')
 def list_projects():
     """List user's GitLab projects."""
+    import gitlab
+    
     if 'gitlab_token' not in session:
         return jsonify({'error': 'Not authenticated with GitLab'}), 401
     
@@ -214,6 +219,8 @@ def gitlab_webhook():
 
 def analyze_commit(project_id: int, commit_id: str, branch: str):
     """Analyze a specific commit."""
+    import gitlab
+    
     # Import analysis modules
     from src.ci_code_companion.code_reviewer import CodeReviewer
     from src.ci_code_companion.test_generator import TestGenerator
@@ -293,6 +300,8 @@ def analyze_merge_request(project_id: int, mr_id: int, source_branch: str):
 @gitlab_bp.route('/repository/<int:project_id>/tree')
 def get_repository_tree(project_id):
     """Get repository file tree structure."""
+    import gitlab
+    
     if 'gitlab_token' not in session:
         return jsonify({'error': 'Not authenticated with GitLab'}), 401
     
@@ -335,6 +344,8 @@ def get_repository_tree(project_id):
 @gitlab_bp.route('/repository/<int:project_id>/file')
 def get_file_content(project_id):
     """Get file content from repository."""
+    import gitlab
+    
     if 'gitlab_token' not in session:
         return jsonify({'error': 'Not authenticated with GitLab'}), 401
     
@@ -378,6 +389,8 @@ def get_file_content(project_id):
 @gitlab_bp.route('/repository/<int:project_id>/commits')
 def get_commits(project_id):
     """Get recent commits for a repository."""
+    import gitlab
+    
     if 'gitlab_token' not in session:
         return jsonify({'error': 'Not authenticated with GitLab'}), 401
     
@@ -425,6 +438,8 @@ def get_commits(project_id):
 @gitlab_bp.route('/repository/<int:project_id>/branches')
 def get_branches(project_id):
     """Get repository branches."""
+    import gitlab
+    
     if 'gitlab_token' not in session:
         return jsonify({'error': 'Not authenticated with GitLab'}), 401
     
@@ -473,6 +488,8 @@ def get_branches(project_id):
 @gitlab_auth_required
 def commit_file_changes(project_id: int):
     """Commit file changes to the GitLab repository."""
+    import gitlab
+    
     gl = get_gitlab_instance()
     if not gl:
         return jsonify({"error": "GitLab authentication failed or not configured"}), 500